@@ -1,16 +1,68 @@
 #!/usr/bin/env python3
-import argparse, pandas as pd, matplotlib.pyplot as plt, os, re
+import argparse, pandas as pd, matplotlib.pyplot as plt, os, sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
 
 # Plot FCT percentiles vs K for a fixed (L,N,scenario) across seeds.
-# Expects fct_summary.csv style rows: file,count,p50_ms,p95_ms,p99_ms
-# Filenames encode K,L,N,scenario,seed like: fixk_K30_L0.6_N8_sym_s1_vectors.csv
+# Source is either the run catalog (scripts/catalog.py, indexed SQL query per K) or
+# a fct_summary.csv style file: file,count,p50_ms,p95_ms,p99_ms
+# Summary filenames encode K,L,N,scenario,seed like: fixk_K30_L0.6_N8_sym_s1_vectors.csv
 # We'll group by K and aggregate p95/p99 across seeds (mean or median selectable).
+# With --ci (scripts/bootstrap.py output) the lines are the pooled-flow percentiles
+# and the bootstrap confidence intervals are drawn as error bands.
+
+PATTERN = r'fixk_K(?P<K>\d+)_L(?P<L>\d+\.\d+)_N(?P<N>\d+)_?(?P<scen>sym|asym)?_s(?P<seed>\d+)'
+
+def from_catalog(db_path, L, N, scenario, metric):
+    import catalog
+    conn = catalog.connect(db_path)
+    agg = 'avg' if metric == 'mean' else 'median'
+    cols = {}
+    for m in ('p95', 'p99'):
+        rows = catalog.query(conn, f'{m}_ms', L, N, scenario, agg)
+        cols[m] = pd.Series({k: v for k, v, _ in rows}, dtype=float)
+    return pd.DataFrame(cols).rename_axis('K')
+
+def from_ci(path, L, N, scenario):
+    df = pd.read_csv(path)
+    df = df[(df['L'] == float(L)) & (df['N'] == int(N)) & (df['scenario'] == scenario) & df['q'].isin([95, 99])]
+    wide = df.pivot_table(index='K', columns='q', values=['estimate', 'ci_lo', 'ci_hi'])
+    out = pd.DataFrame(index=wide.index)
+    for q in (95, 99):
+        if ('estimate', q) in wide.columns:
+            out[f'p{q}'] = wide[('estimate', q)]
+            out[f'p{q}_lo'] = wide[('ci_lo', q)]
+            out[f'p{q}_hi'] = wide[('ci_hi', q)]
+    return out
 
-PATTERN = re.compile(r'fixk_K(?P<K>\d+)_L(?P<L>\d+\.\d+)_N(?P<N>\d+)_?(?P<scen>sym|asym)?_s(?P<seed>\d+)')
+def from_summary(path, L, N, scenario, metric):
+    df = pd.read_csv(path)
+    # Extract params from filename
+    p = df['file'].astype(str).str.extract(PATTERN)
+    keep = p['K'].notna() & (p['L'] == L) & (p['N'] == N) & (p['scen'] == scenario)
+    dff = pd.DataFrame({'K': p.loc[keep, 'K'].astype(int), 'seed': p.loc[keep, 'seed'].astype(int),
+                        'p95': df.loc[keep, 'p95_ms'], 'p99': df.loc[keep, 'p99_ms']})
+    g = dff.groupby('K')[['p95', 'p99']]
+    return g.mean() if metric == 'mean' else g.median()
+
+def draw(ax, agg, L, N, scenario, label):
+    """P95/P99 lines (and CI bands when present) of an aggregated per-K table onto ax."""
+    for q, marker in (('p95', 'o'), ('p99', 's')):
+        line, = ax.plot(agg.index, agg[q], marker=marker, label=f'{q.upper()} FCT')
+        if f'{q}_lo' in agg.columns:
+            ax.fill_between(agg.index, agg[f'{q}_lo'], agg[f'{q}_hi'], color=line.get_color(), alpha=0.2, linewidth=0)
+    ax.set_xlabel('K (packets)')
+    ax.set_ylabel('FCT (ms)')
+    ax.set_title(f'FCT vs K (L={L}, N={N}, {scenario}, {label})')
+    ax.grid(alpha=0.3)
+    ax.legend()
 
 if __name__ == '__main__':
     ap = argparse.ArgumentParser()
-    ap.add_argument('--summary', required=True, help='FCT summary CSV produced by fct_extract.py')
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument('--summary', help='FCT summary CSV produced by fct_extract.py')
+    src.add_argument('--catalog', help='Run catalog (results/catalog.sqlite) filled by scripts/grid.py or scripts/catalog.py add')
+    src.add_argument('--ci', help='Bootstrap CI table from scripts/bootstrap.py (draws error bands)')
     ap.add_argument('--L', required=True, help='Load e.g. 0.6')
     ap.add_argument('--N', required=True, help='Incast fan-in e.g. 8')
     ap.add_argument('--scenario', choices=['sym','asym'], required=True)
@@ -18,32 +70,18 @@ if __name__ == '__main__':
     ap.add_argument('--output', required=True)
     args = ap.parse_args()
 
-    df = pd.read_csv(args.summary)
-    # Extract params from filename
-    rows = []
-    for _, r in df.iterrows():
-        fname = r['file']
-        m = PATTERN.search(fname)
-        if not m: continue
-        K = int(m.group('K'))
-        L = m.group('L'); N = m.group('N'); scen = m.group('scen'); seed = int(m.group('seed'))
-        if L != args.L or N != args.N or scen != args.scenario: continue
-        rows.append({'K':K,'seed':seed,'p95':r.get('p95_ms'), 'p99':r.get('p99_ms')})
-    if not rows:
+    if args.ci:
+        agg = from_ci(args.ci, args.L, args.N, args.scenario)
+    elif args.catalog:
+        agg = from_catalog(args.catalog, args.L, args.N, args.scenario, args.metric)
+    else:
+        agg = from_summary(args.summary, args.L, args.N, args.scenario, args.metric)
+    if agg.empty:
         print('No matching rows for filter')
         raise SystemExit(1)
-    dff = pd.DataFrame(rows)
-    agg_func = {'mean':dff.groupby('K').mean, 'median':dff.groupby('K').median}[args.metric]
-    agg = agg_func()
 
     fig, ax = plt.subplots(figsize=(6,4))
-    ax.plot(agg.index, agg['p95'], marker='o', label='P95 FCT')
-    ax.plot(agg.index, agg['p99'], marker='s', label='P99 FCT')
-    ax.set_xlabel('K (packets)')
-    ax.set_ylabel('FCT (ms)')
-    ax.set_title(f'FCT vs K (L={args.L}, N={args.N}, {args.scenario}, {args.metric})')
-    ax.grid(alpha=0.3)
-    ax.legend()
+    draw(ax, agg, args.L, args.N, args.scenario, 'pooled, bootstrap CI' if args.ci else args.metric)
     out = os.path.abspath(args.output)
     fig.tight_layout()
     fig.savefig(out, dpi=120)
@@ -1,8 +1,15 @@
 #!/usr/bin/env python3
 import argparse, pandas as pd, matplotlib.pyplot as plt, os, sys
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+from vecstore import open_vectors
+from downsample import minmax_downsample, MAX_POINTS
+from queue_stats import MSS
+import topo
+
 # Side-by-side queue comparison (sym vs asym) for a single (K,L,N,seed)
 # Usage: python analysis/plot_queue_compare.py --sym results/fixk_K10_L0.6_N8_sym_s1_vectors.csv --asym results/fixk_K10_L0.6_N8_asym_s1_vectors.csv --output figs/compare_K10_L0.6_N8_s1.png --module leaf[0].ppp[2].queue --name queueBitLength --k 10 --unit KB
+# --k is in packets (RED minth/maxth), drawn at K * --mss bytes in the plotted unit
 
 def extract_queue(df, module_sub, name_sub):
     # Find first matching vector row
@@ -23,54 +30,76 @@ def extract_queue(df, module_sub, name_sub):
     t, v = None, None
     return t, v
 
+def extract_queue_source(src, module_sub, name_sub):
+    # Vector store / native .vec: pick the first matching vector and read only that one
+    infos = src.select(module_sub, name_sub)
+    if not infos:
+        return None, None
+    return src.read(infos[0])
+
+def load_queue(path, module_sub, name_sub):
+    src = open_vectors(path)
+    if src is not None:
+        return extract_queue_source(src, module_sub, name_sub)
+    return extract_queue(pd.read_csv(path), module_sub, name_sub)
+
+# Unit conversion (assume bit length -> bytes -> target unit if not packets)
+def convert(values, unit):
+    if unit == 'packets':
+        return values  # if already packet length counts
+    # assume bits -> bytes
+    vals = values / 8.0
+    if unit == 'KB':
+        return vals / 1024.0
+    if unit == 'MB':
+        return vals / (1024.0*1024.0)
+    return vals
+
+def k_line(k, unit, mss_bytes=MSS):
+    # K packets -> K * MSS bytes -> plotted unit (convert takes bits)
+    return k if unit == 'packets' else convert(k * mss_bytes * 8.0, unit)
+
+def draw(fig, axes, sym, asym, unit='KB', k=None, max_points=MAX_POINTS, mss_bytes=MSS):
+    """Sym / asym (t, q) traces side by side on a 1x2 shared-y axes pair; k in packets."""
+    # keep peaks: per-bucket min/max instead of plotting millions of raw points
+    t_sym, q_sym = minmax_downsample(*sym, max_points)
+    t_asym, q_asym = minmax_downsample(*asym, max_points)
+    axes[0].plot(t_sym, convert(q_sym, unit), color='steelblue')
+    axes[0].set_title(f'Symmetric')
+    axes[1].plot(t_asym, convert(q_asym, unit), color='darkorange')
+    axes[1].set_title('Asymmetric (5Gbps link)')
+    for ax in axes:
+        ax.set_xlabel('Time (s)')
+    axes[0].set_ylabel(f'Queue ({unit})')
+    if k is not None:
+        for ax in axes:
+            ax.axhline(k_line(k, unit, mss_bytes), color='red', linestyle='--', linewidth=1.0)
+    fig.suptitle(f'Queue Comparison K={k} N/Ax')
+
 if __name__ == '__main__':
     ap = argparse.ArgumentParser()
-    ap.add_argument('--sym', required=True)
-    ap.add_argument('--asym', required=True)
+    ap.add_argument('--sym', required=True, help='vectors CSV, native .vec or .vstore dir')
+    ap.add_argument('--asym', required=True, help='vectors CSV, native .vec or .vstore dir')
     ap.add_argument('--output', required=True)
-    ap.add_argument('--module', default='leaf[0].ppp[2].queue')
+    ap.add_argument('--module', help='Queue module (default: ToR egress towards host[0] in the port map, leaf[0].ppp[2].queue)')
+    ap.add_argument('--topo', help='Port map (scripts/topo.py) for the default --module')
     ap.add_argument('--name', default='queueBitLength')
-    ap.add_argument('--k', type=float, default=None)
+    ap.add_argument('--k', type=float, default=None, help='K in packets')
+    ap.add_argument('--mss', type=int, default=MSS, help='Bytes per packet for the K line (default %(default)s)')
     ap.add_argument('--unit', choices=['B','KB','MB','packets'], default='KB')
+    ap.add_argument('--max-points', type=int, default=MAX_POINTS, help='Min/max downsample each trace to about this many points (0 = raw)')
     args = ap.parse_args()
 
-    sym_df = pd.read_csv(args.sym)
-    asym_df = pd.read_csv(args.asym)
-
-    t_sym, q_sym = extract_queue(sym_df, args.module, args.name)
-    t_asym, q_asym = extract_queue(asym_df, args.module, args.name)
+    module = args.module or topo.load(args.topo).rx_queue(0)
+    t_sym, q_sym = load_queue(args.sym, module, args.name)
+    t_asym, q_asym = load_queue(args.asym, module, args.name)
 
     if t_sym is None or t_asym is None:
         print('Queue vectors not found')
         sys.exit(1)
 
-    # Unit conversion (assume bit length -> bytes -> target unit if not packets)
-    def convert(values):
-        if args.unit == 'packets':
-            return values  # if already packet length counts
-        # assume bits -> bytes
-        vals = values / 8.0
-        if args.unit == 'KB':
-            return vals / 1024.0
-        if args.unit == 'MB':
-            return vals / (1024.0*1024.0)
-        return vals
-
-    q_sym_c = convert(q_sym)
-    q_asym_c = convert(q_asym)
-
     fig, axes = plt.subplots(1,2, figsize=(12,4), sharey=True)
-    axes[0].plot(t_sym, q_sym_c, color='steelblue')
-    axes[0].set_title(f'Symmetric')
-    axes[1].plot(t_asym, q_asym_c, color='darkorange')
-    axes[1].set_title('Asymmetric (5Gbps link)')
-    for ax in axes:
-        ax.set_xlabel('Time (s)')
-    axes[0].set_ylabel(f'Queue ({args.unit})')
-    if args.k is not None and args.unit != 'packets':
-        for ax in axes:
-            ax.axhline(args.k, color='red', linestyle='--', linewidth=1.0)
-    fig.suptitle(f'Queue Comparison K={args.k} N/Ax')
+    draw(fig, axes, (t_sym, q_sym), (t_asym, q_asym), args.unit, args.k, args.max_points, args.mss)
     fig.tight_layout(rect=[0,0,1,0.95])
     out=os.path.abspath(args.output)
     fig.savefig(out, dpi=100)
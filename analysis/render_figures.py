@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+import argparse, json, os, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+# Render a whole grid's figure set in a process pool.
+# A figure spec is a dict with 'kind' and 'out':
+#   sanity    {source, module, name, k}         queue sanity plot of one run (plot_sanity.draw_sanity)
+#   fct_vs_k  {L, N, scenario, label, data}     P95/P99 vs K of one slice (plot_fct_vs_k.draw); data = {K, p95, p99[, *_lo, *_hi]}
+#   compare   {sym, asym, module, name, k}      sym vs asym queue of one (K, L, N, seed) (plot_queue_compare.draw)
+# k is the catalog's K in packets (RED minth/maxth); its line is drawn at K * queue_stats.MSS bytes.
+# Specs come from the run catalog (every done run, every (L, N, scenario) slice, every
+# sym/asym pair) or from a JSON list (--specs).
+# - each worker keeps one figure per kind and clears its axes between plots instead of
+#   building a new figure per PNG
+# - vector sources are opened through the run's .vstore (or the .vec index), so only the
+#   vectors a figure draws are read
+# - a figure is skipped when its key (spec, input file size/mtime, drawing code) matches
+#   the one recorded in <fig-dir>/render_manifest.json and the PNG exists
+# Usage:
+#   python analysis/render_figures.py -j 8                        # everything in results/catalog.sqlite
+#   python analysis/render_figures.py --kinds fct_vs_k --ci results/fct_ci.csv
+#   python analysis/render_figures.py --specs figs.json --force
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+ANALYSIS = os.path.join(ROOT_DIR, 'analysis')
+SCRIPTS = os.path.join(ROOT_DIR, 'scripts')
+FIG_DIR = os.path.join(ROOT_DIR, 'figs')
+KINDS = ('sanity', 'fct_vs_k', 'compare')
+FIGSIZE = {'sanity': (8, 4.2), 'fct_vs_k': (6, 4), 'compare': (12, 4)}
+DPI = {'sanity': 240, 'fct_vs_k': 120, 'compare': 100}   # same as the single-figure scripts
+# drawing and loading code: a change in any of these re-renders every figure
+CODE = [os.path.join(SCRIPTS, 'plot_sanity.py'), os.path.join(SCRIPTS, 'downsample.py'),
+        os.path.join(SCRIPTS, 'vecstore.py'), os.path.join(SCRIPTS, 'vecfile.py'), os.path.join(SCRIPTS, 'queue_stats.py'),
+        os.path.join(ANALYSIS, 'plot_fct_vs_k.py'), os.path.join(ANALYSIS, 'plot_queue_compare.py'),
+        os.path.abspath(__file__)]
+QUEUE_NAME = 'queueBitLength'
+
+def best_source(row):
+    """Cheapest vector source of a catalog row: .vstore, then the indexed .vec, then the CSV."""
+    for col in ('vstore', 'vec_path', 'vectors_csv'):
+        p = row.get(col)
+        if isinstance(p, str) and os.path.exists(p):
+            return p
+    return None
+
+def specs_from_catalog(db_path, fig_dir, kinds=KINDS, ci=None, metric='median', module=None):
+    import pandas as pd
+    import catalog
+    from plot_fct_vs_k import from_catalog, from_ci
+    # ToR egress towards host[0] in the port map (leaf[0].ppp[2].queue)
+    module = module or catalog.QUEUE_MODULE
+    conn = catalog.connect(db_path)
+    runs = pd.read_sql_query("SELECT * FROM runs WHERE status = 'done'", conn)
+    conn.close()
+    runs['source'] = [best_source(r) for r in runs.to_dict('records')]
+    specs = []
+    if 'sanity' in kinds:
+        for r in runs[runs['source'].notna()].itertuples():
+            specs.append({'kind': 'sanity', 'out': os.path.join(fig_dir, f'{r.case_name}_queue.png'), 'source': r.source,
+                          'module': module, 'name': QUEUE_NAME, 'k': float(r.K)})
+    if 'fct_vs_k' in kinds:
+        for (L, N, scen), _ in runs.groupby(['L', 'N', 'scenario']):
+            agg = from_ci(ci, L, N, scen) if ci else from_catalog(db_path, L, N, scen, metric)
+            agg = agg.dropna(subset=[c for c in ('p95', 'p99') if c in agg.columns])
+            if agg.empty:
+                continue
+            specs.append({'kind': 'fct_vs_k', 'out': os.path.join(fig_dir, f'fct_vs_k_L{L:g}_N{N}_{scen}.png'),
+                          'L': f'{L:g}', 'N': int(N), 'scenario': scen,
+                          'label': 'pooled, bootstrap CI' if ci else metric,
+                          'data': {'K': [int(k) for k in agg.index], **{c: agg[c].tolist() for c in agg.columns}}})
+    if 'compare' in kinds:
+        have = runs[runs['source'].notna()]
+        for (K, L, N, seed), g in have.groupby(['K', 'L', 'N', 'seed']):
+            src = dict(zip(g['scenario'], g['source']))
+            if 'sym' in src and 'asym' in src:
+                specs.append({'kind': 'compare', 'out': os.path.join(fig_dir, f'compare_K{K}_L{L:g}_N{N}_s{seed}.png'),
+                              'sym': src['sym'], 'asym': src['asym'], 'module': module, 'name': QUEUE_NAME,
+                              'k': float(K)})
+    return specs
+
+def _stamp(path):
+    # a vector store changes through its index/meta files; anything else by size and mtime
+    if os.path.isdir(path):
+        return [_stamp(os.path.join(path, f)) for f in ('meta.json', 'index.json')]
+    try:
+        st = os.stat(path)
+        return [os.path.abspath(path), st.st_size, st.st_mtime_ns]
+    except OSError:
+        return [os.path.abspath(path), None, None]
+
+def spec_key(spec, code):
+    from resultcache import digest
+    inputs = [spec[k] for k in ('source', 'sym', 'asym') if k in spec]
+    return digest({'spec': spec, 'inputs': [_stamp(p) for p in inputs], 'code': code})
+
+# ---- worker -------------------------------------------------------------
+
+_FIGS = {}
+
+def _figure(kind):
+    """This worker's figure for `kind`, axes cleared for the next plot."""
+    if kind not in _FIGS:
+        from plot_sanity import pyplot
+        plt = pyplot()
+        if kind == 'compare':
+            fig, axes = plt.subplots(1, 2, figsize=FIGSIZE[kind], sharey=True)
+        else:
+            fig, ax = plt.subplots(figsize=FIGSIZE[kind])
+            axes = [ax]
+        _FIGS[kind] = (fig, list(axes))
+    fig, axes = _FIGS[kind]
+    for ax in axes:
+        ax.cla()
+    if kind == 'compare':
+        # cla() brings back the shared y tick labels
+        axes[1].tick_params(labelleft=False)
+    return fig, axes
+
+def render(spec):
+    """Draw one spec into its PNG; returns (out, error or None, seconds)."""
+    t0 = time.perf_counter()
+    kind, out = spec['kind'], spec['out']
+    try:
+        fig, axes = _figure(kind)
+        if kind == 'sanity':
+            from plot_sanity import load_source, pick_vector, draw_sanity
+            from queue_stats import MSS
+            df, vf = load_source(spec['source'])
+            cand, picked = pick_vector(df, vf, spec.get('module'), spec.get('name'))
+            if cand is None:
+                raise ValueError('no usable queue or drop vector')
+            draw_sanity(axes[0], cand, picked, spec.get('k'), 'packets', MSS, y_unit='KB')
+            fig.tight_layout()
+        elif kind == 'fct_vs_k':
+            import pandas as pd
+            from plot_fct_vs_k import draw
+            agg = pd.DataFrame(spec['data']).set_index('K')
+            draw(axes[0], agg, spec['L'], spec['N'], spec['scenario'], spec['label'])
+            fig.tight_layout()
+        elif kind == 'compare':
+            from plot_queue_compare import load_queue, draw
+            sym = load_queue(spec['sym'], spec['module'], spec['name'])
+            asym = load_queue(spec['asym'], spec['module'], spec['name'])
+            if sym[0] is None or asym[0] is None:
+                raise ValueError('queue vectors not found')
+            draw(fig, axes, sym, asym, spec.get('unit', 'KB'), spec.get('k'))
+            fig.tight_layout(rect=[0, 0, 1, 0.95])
+        else:
+            raise ValueError(f'unknown kind {kind!r}')
+        os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+        fig.savefig(out, dpi=DPI[kind])
+        return out, None, time.perf_counter() - t0
+    except Exception as e:
+        return out, repr(e), time.perf_counter() - t0
+
+def render_all(specs, manifest_path, jobs=1, force=False):
+    """Render the specs whose key changed; returns (rendered, skipped, failed) counts."""
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    from resultcache import sha256_file
+    code = [sha256_file(p) for p in CODE]
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    keys = {s['out']: spec_key(s, code) for s in specs}
+    todo = [s for s in specs if force or manifest.get(s['out']) != keys[s['out']] or not os.path.exists(s['out'])]
+    done = failed = 0
+    if todo:
+        with ProcessPoolExecutor(max_workers=max(1, min(jobs, len(todo)))) as pool:
+            futs = [pool.submit(render, s) for s in todo]
+            for fut in as_completed(futs):
+                out, err, dt = fut.result()
+                if err:
+                    failed += 1
+                    manifest.pop(out, None)
+                    print(f'[warn] {out}: {err}', file=sys.stderr)
+                else:
+                    done += 1
+                    manifest[out] = keys[out]
+    os.makedirs(os.path.dirname(os.path.abspath(manifest_path)), exist_ok=True)
+    tmp = manifest_path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, manifest_path)
+    return done, len(specs) - len(todo), failed
+
+if __name__ == '__main__':
+    import catalog
+    ap = argparse.ArgumentParser(description='Render a grid figure set in parallel, skipping unchanged figures')
+    ap.add_argument('--catalog', default=catalog.CATALOG_PATH, help='Run catalog to derive specs from (default results/catalog.sqlite)')
+    ap.add_argument('--specs', help='JSON list of figure specs instead of the catalog')
+    ap.add_argument('--kinds', nargs='+', choices=KINDS, default=list(KINDS))
+    ap.add_argument('--ci', help='Bootstrap CI table (scripts/bootstrap.py) for the FCT-vs-K bands')
+    ap.add_argument('--metric', choices=['mean', 'median'], default='median', help='Aggregate across seeds (catalog FCT-vs-K)')
+    ap.add_argument('--fig-dir', default=FIG_DIR)
+    ap.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1)
+    ap.add_argument('--force', action='store_true', help='Render every figure, changed or not')
+    ap.add_argument('--dry-run', action='store_true', help='List the specs and exit')
+    ap.add_argument('--topo', help='Port map (scripts/topo.py) of the runs, for the queue module')
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    if args.specs:
+        with open(args.specs) as f:
+            specs = [s for s in json.load(f) if s.get('kind') in args.kinds]
+    elif os.path.exists(args.catalog):
+        import topo
+        module = topo.load(args.topo).rx_queue(0) if args.topo else None
+        specs = specs_from_catalog(args.catalog, args.fig_dir, args.kinds, args.ci, args.metric, module)
+    else:
+        sys.exit(f'[ERR] no catalog at {args.catalog} (run the grid or pass --specs)')
+    if args.dry_run:
+        for s in specs:
+            print(s['kind'], s['out'])
+        sys.exit(0)
+    if not specs:
+        sys.exit('[ERR] no figures to render')
+    done, skipped, failed = render_all(specs, os.path.join(args.fig_dir, 'render_manifest.json'), args.jobs, args.force)
+    print(f'[ok] {len(specs)} figures: {done} rendered, {skipped} unchanged, {failed} failed '
+          f'in {time.perf_counter() - t0:.1f}s ({args.jobs} workers)')
+    sys.exit(1 if failed else 0)
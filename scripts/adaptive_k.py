@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Adaptive K sweep for one (L, N, scenario) slice.
+
+Starts from a coarse set of K values, runs every seed for each, then keeps
+placing new K values only where they can move the answer:
+- inside the bracket around the current best median-of-seeds P99 (the knee);
+- in intervals whose far endpoint's seed-to-seed CI overlaps the best one.
+An interval is split at its geometric midpoint. It is left alone once it is
+narrower than --k-tol packets, or once its endpoints differ by less than
+--rtol of the best P99. The sweep stops when no interval qualifies or when
+--max-runs is reached.
+
+K values without an `incast{N}_kXX` section in omnetpp.ini run through
+runtime minth/maxth overrides (grid.k_overrides). Cases run through
+grid.run_case with the same work dirs, manifest, cache and catalog as
+scripts/grid.py, so the coarse K values hit the cache of earlier grids.
+--stub swaps the simulator for a synthetic U-shaped P99(K) to exercise the
+search without OMNeT++.
+
+Usage:
+    python scripts/adaptive_k.py --L 0.6 --N 8 --scenario asym --Ks "10 30 60 120" --Seeds "1 2 3" -j 8
+    python scripts/adaptive_k.py --L 0.6 --N 8 --scenario sym --stub      # dry run of the search
+"""
+
+import os, sys, argparse
+import numpy as np
+import pandas as pd
+
+# two-sided 95% Student t quantiles by degrees of freedom (few seeds per K)
+T95 = {1: 12.71, 2: 4.30, 3: 3.18, 4: 2.78, 5: 2.57, 6: 2.45, 7: 2.36, 8: 2.31, 9: 2.26, 10: 2.23}
+
+
+def k_stats(runs):
+    """Per K: median and mean P99 over seeds, 95% t-interval of the mean, seed count."""
+    g = runs.groupby("K")["p99_ms"]
+    st = pd.DataFrame({"median": g.median(), "mean": g.mean(), "sd": g.std(ddof=1).fillna(0.0), "n": g.count()})
+    half = st["sd"] / np.sqrt(st["n"]) * st["n"].map(lambda n: T95.get(n - 1, 2.0))
+    st["lo"] = st["mean"] - half.where(st["n"] > 1, np.inf)
+    st["hi"] = st["mean"] + half.where(st["n"] > 1, np.inf)
+    return st.sort_index()
+
+
+def next_ks(stats, k_tol=5, rtol=0.02, per_round=2):
+    """New K values for the next round (empty when the tolerances are met)."""
+    Ks = stats.index.to_numpy()
+    med = stats["median"].to_numpy()
+    b = int(np.argmin(med))
+    overlap = (stats["lo"].to_numpy() <= stats["hi"].iloc[b]) & (stats["hi"].to_numpy() >= stats["lo"].iloc[b])
+    cand = []
+    for j in range(len(Ks) - 1):
+        lo_k, hi_k = int(Ks[j]), int(Ks[j + 1])
+        if hi_k - lo_k <= k_tol:
+            continue
+        score = abs(med[j + 1] - med[j]) / max(med[b], 1e-12)
+        bracket = j in (b - 1, b)
+        far = j + 1 if j >= b else j
+        if score < rtol or not (bracket or overlap[far]):
+            continue
+        mid = int(round(np.sqrt(lo_k * hi_k))) if lo_k > 0 else (lo_k + hi_k) // 2
+        if not lo_k < mid < hi_k:
+            mid = (lo_k + hi_k) // 2
+        cand.append((bracket, score, mid))
+    cand.sort(reverse=True)
+    return sorted(m for _, _, m in cand[:per_round])
+
+
+def stub_p99(c):
+    """Synthetic P99 (ms) with a knee: throughput loss below k0, queueing delay above, seeded noise."""
+    k0 = 20.0 * c["N"] / 8.0 * (1.0 + float(c["L"])) * (1.3 if c["scenario"] == "asym" else 1.0)
+    rng = np.random.default_rng([int(c["K"]), int(c["seed"])])
+    return (1.0 + (k0 / c["K"]) ** 2 + c["K"] / k0) * float(np.exp(rng.normal(0.0, 0.03)))
+
+
+def sweep(evaluate, L, N, scenario, coarse, seeds, k_tol=5, rtol=0.02, per_round=2, max_runs=60):
+    """Run the adaptive search; evaluate(cases) -> P99 ms per case. Returns (runs DataFrame, stats)."""
+    runs = pd.DataFrame(columns=["round", "K", "seed", "p99_ms"])
+    Ks, rnd = sorted(set(int(k) for k in coarse)), 0
+    while Ks:
+        cases = [{"K": K, "L": L, "N": int(N), "seed": int(s), "scenario": scenario} for K in Ks for s in seeds]
+        cases = cases[:max(0, max_runs - len(runs))]
+        if not cases:
+            break
+        p99 = evaluate(cases)
+        new = pd.DataFrame({"round": rnd, "K": [c["K"] for c in cases], "seed": [c["seed"] for c in cases], "p99_ms": p99})
+        new = new.dropna(subset=["p99_ms"])
+        runs = pd.concat([runs, new], ignore_index=True) if len(runs) else new
+        if runs.empty:
+            break
+        stats = k_stats(runs.astype({"K": int, "p99_ms": float}))
+        print(f"==> round {rnd}: K={Ks} -> best K={stats['median'].idxmin()} ({len(runs)} runs)")
+        Ks = [k for k in next_ks(stats, k_tol, rtol, per_round) if k not in stats.index]
+        rnd += 1
+    runs = runs.astype({"K": int, "seed": int, "p99_ms": float})
+    return runs, (k_stats(runs) if len(runs) else pd.DataFrame())
+
+
+def grid_evaluator(args):
+    """evaluate(cases) through grid.run_case, reusing finished cases of the manifest."""
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    import grid, catalog, topo
+    from resultcache import ResultCache
+    hosts = topo.load().hosts
+    if not 0 < int(args.N) < hosts:
+        sys.exit(f"[ERR] N={args.N} needs 1..{hosts - 1} senders on this {hosts}-host network")
+    env = grid.resolve_env()
+    if not env["opp_run"] or not env["scavetool"]:
+        sys.exit("ERROR: Set OMNETPP_BIN and SCAVE_BIN environment variables (or use --stub).")
+    for d in (grid.RES_DIR, grid.FIG_DIR, args.work_dir):
+        os.makedirs(d, exist_ok=True)
+    cache = None if args.no_cache else ResultCache(args.cache_dir, auto_gc=False)
+    db = None if args.no_catalog else catalog.connect(args.catalog)
+    manifest_path = os.path.join(args.work_dir, "manifest.json")
+
+    def evaluate(cases):
+        manifest = grid.load_manifest(manifest_path)
+        recs = {}
+        todo = []
+        for c in cases:
+            rec = manifest.get(grid.case_name(c), {})
+            if rec.get("status") == "done" and rec.get("metrics", {}).get("p99_ms") is not None:
+                recs[grid.case_name(c)] = rec
+            else:
+                todo.append(c)
+        with ProcessPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+            futs = {pool.submit(grid.run_case, c, env, args.work_dir, not args.no_plot, cache): c for c in todo}
+            for fut in as_completed(futs):
+                c = futs[fut]
+                try:
+                    rec = fut.result()
+                except Exception as e:
+                    rec = {"case": grid.case_name(c), "params": c, "status": "failed", "error": repr(e)}
+                manifest[rec["case"]] = recs[rec["case"]] = rec
+                grid.save_manifest(manifest_path, manifest)
+                if db is not None:
+                    catalog.upsert(db, grid.catalog_row(rec))
+                print(f"==> Case {rec['case']}: {rec['status']}{' (cached)' if rec.get('cached') else ''}")
+        if cache is not None:
+            cache.gc()
+        return [recs[grid.case_name(c)].get("metrics", {}).get("p99_ms") if recs[grid.case_name(c)]["status"] == "done"
+                else None for c in cases]
+
+    return evaluate
+
+
+if __name__ == "__main__":
+    from grid import split_axis, WORK_DIR, RES_DIR
+    from resultcache import CACHE_DIR
+    import catalog
+    ap = argparse.ArgumentParser(description="Adaptive K sweep around the P99 FCT knee for one (L, N, scenario)")
+    ap.add_argument("--L", required=True, help="Load e.g. 0.6")
+    ap.add_argument("--N", required=True, type=int, help="Incast fan-in e.g. 8")
+    ap.add_argument("--scenario", choices=["sym", "asym"], required=True)
+    ap.add_argument("--Ks", default="10 30 60 120", help="Coarse K values (packets)")
+    ap.add_argument("--Seeds", default="1 2 3")
+    ap.add_argument("--k-tol", type=int, default=5, help="Stop splitting intervals narrower than this (packets)")
+    ap.add_argument("--rtol", type=float, default=0.02, help="...or whose P99 differs by less than this fraction of the best")
+    ap.add_argument("--per-round", type=int, default=2, help="New K values per round")
+    ap.add_argument("--max-runs", type=int, default=60, help="Simulation budget (cases incl. seeds)")
+    ap.add_argument("--stub", action="store_true", help="Synthetic P99(K) instead of OMNeT++")
+    ap.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--work-dir", default=WORK_DIR)
+    ap.add_argument("--no-plot", action="store_true")
+    ap.add_argument("--cache-dir", default=CACHE_DIR)
+    ap.add_argument("--no-cache", action="store_true")
+    ap.add_argument("--catalog", default=catalog.CATALOG_PATH)
+    ap.add_argument("--no-catalog", action="store_true")
+    ap.add_argument("--out", help="Runs CSV (default results/adaptive_L{L}_N{N}_{scenario}.csv)")
+    args = ap.parse_args()
+
+    seeds = [int(s) for s in split_axis(args.Seeds)]
+    evaluate = (lambda cases: [stub_p99(c) for c in cases]) if args.stub else grid_evaluator(args)
+    runs, stats = sweep(evaluate, args.L, args.N, args.scenario, split_axis(args.Ks), seeds,
+                        args.k_tol, args.rtol, args.per_round, args.max_runs)
+    if runs.empty:
+        sys.exit("[ERR] no finished runs")
+    out = os.path.abspath(args.out or os.path.join(RES_DIR, f"adaptive_L{args.L}_N{args.N}_{args.scenario}.csv"))
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    runs.to_csv(out, index=False)
+    best = stats["median"].idxmin()
+    ks = [int(k) for k in split_axis(args.Ks)]
+    dense = ((max(ks) - min(ks)) // max(args.k_tol, 1) + 1) * len(seeds)
+    print(stats[["median", "mean", "lo", "hi", "n"]].to_string(float_format=lambda v: f"{v:.4g}"))
+    print(f"[ok] best K={best} (median P99 {stats.loc[best, 'median']:.4g} ms) after {len(runs)} runs "
+          f"(uniform step-{args.k_tol} grid: {dense}) -> {out}")
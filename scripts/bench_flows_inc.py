@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark: full vs compact flows.inc as the flow count grows.
+
+For each flow count, writes both variants with the batched generator and
+reports file size and line count. When OMNETPP_BIN (opp_run) is available, it
+also times network setup: `opp_run -u Cmdenv -c sym` with a zero sim-time
+limit, in a scratch dir holding an omnetpp.ini copy and the variant's flows.inc.
+
+Usage:
+    python scripts/bench_flows_inc.py --flows 1000 10000 100000
+    OMNETPP_BIN=~/omnetpp-6.2.0/bin INET_NED=~/inet/src python scripts/bench_flows_inc.py
+"""
+
+import os, sys, time, shutil, tempfile, argparse, subprocess as sp
+import traffic
+from grid import resolve_env, SIM_DIR
+
+
+def write_variant(path, nflows, compact, total_hosts):
+    # duration sized so the Poisson stream yields ~nflows arrivals
+    duration = nflows * traffic.flow_gap(traffic.LOAD)
+    batches = traffic.gen_flows_batched(traffic.LOAD, duration, total_hosts, traffic.SEED)
+    return traffic.write_inc_streaming(batches, path, total_hosts, compact)
+
+
+def setup_time(env, workdir, repeats):
+    cmd = [env["opp_run"], "-u", "Cmdenv", "-n", env["ned_path"], *env["libs"],
+           "-f", "omnetpp.ini", "-c", "sym", "--sim-time-limit=0s", "--cmdenv-express-mode=true",
+           f"--result-dir={os.path.join(workdir, 'results')}"]
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        rc = sp.run(cmd, cwd=workdir, stdout=sp.DEVNULL, stderr=sp.DEVNULL).returncode
+        if rc != 0:
+            return None
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Compare full vs compact flows.inc size and opp_run setup time")
+    ap.add_argument("--flows", nargs="+", type=int, default=[1000, 10000, 100000])
+    ap.add_argument("--hosts-per-leaf", type=int, default=traffic.HOSTS_PER_LEAF)
+    ap.add_argument("--leaves", type=int, default=traffic.LEAVES)
+    ap.add_argument("--repeats", type=int, default=3, help="opp_run repetitions (best of)")
+    args = ap.parse_args()
+
+    env = resolve_env()
+    have_opp = bool(env["opp_run"]) and os.path.exists(env["opp_run"])
+    total_hosts = args.hosts_per_leaf * args.leaves
+    print(f"{'flows':>9} {'mode':>8} {'lines':>10} {'MB':>9} {'gen_s':>7} {'setup_s':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for nflows in args.flows:
+            for compact in (False, True):
+                work = os.path.join(tmp, f"{nflows}_{int(compact)}")
+                os.makedirs(work)
+                shutil.copyfile(os.path.join(SIM_DIR, "omnetpp.ini"), os.path.join(work, "omnetpp.ini"))
+                inc = os.path.join(work, "flows.inc")
+                t0 = time.perf_counter()
+                n = write_variant(inc, nflows, compact, total_hosts)
+                gen_s = time.perf_counter() - t0
+                with open(inc, "rb") as f:
+                    lines = sum(buf.count(b"\n") for buf in iter(lambda: f.read(1 << 20), b""))
+                size_mb = os.path.getsize(inc) / 1e6
+                st = setup_time(env, work, args.repeats) if have_opp else None
+                st_s = f"{st:8.2f}" if st is not None else f"{'n/a':>8}"
+                print(f"{n:>9} {'compact' if compact else 'full':>8} {lines:>10} {size_mb:>9.2f} {gen_s:>7.2f} {st_s}")
+                shutil.rmtree(work)
+    if not have_opp:
+        print("[info] opp_run not found (set OMNETPP_BIN); setup time not measured", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
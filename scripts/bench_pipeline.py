@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark of the analysis pipeline on synthetic OMNeT++ exports.
+
+Fixtures are generated in a scratch dir, scaled by --hosts, --apps (receive
+apps per host) and --samples (samples per vector):
+- rows.csv      row-wise vectors (one sample per row, opp_scavetool -T v)
+- wide.csv      CSV-R vectors (vectime/vecvalue list cells, one row per vector)
+- scalars.csv   per-queue and per-app scalars
+- flows.inc     sendBytes of every receiving app
+Each host[h].app[a] gets rcvdPk:vector(packetBytes), rcvdBytes:vector and
+endToEndDelay:vector; every leaf and spine port gets queueLength and
+queueBitLength.
+
+Every stage runs in a fresh worker process (--stage, internal), so the peak RSS
+is per stage. The time is the best of --repeats, around the stage call only;
+input loading shared by several stages is done before the timer.
+--save-baseline stores the results, --baseline compares against them and exits
+with status 1 when a stage is slower, or uses more memory, by more than
+--threshold. Keys include the fixture scale, so only matching scales are compared.
+No OMNeT++ needed.
+
+Usage:
+    python scripts/bench_pipeline.py --save-baseline results/bench_baseline.json
+    python scripts/bench_pipeline.py --baseline results/bench_baseline.json --threshold 0.25
+    python scripts/bench_pipeline.py --hosts 24 --apps 8 --samples 2000 --stages fct_engine_wide plot_sanity_wide
+"""
+
+import os, sys, json, time, runpy, argparse, resource, tempfile, subprocess as sp
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SCRIPTS = os.path.join(ROOT_DIR, "scripts")
+ANALYSIS = os.path.join(ROOT_DIR, "analysis")
+
+NET = "SmallLeafSpine"
+MSS = 1460
+HOSTS_PER_LEAF = 3
+SPINES = 2
+THRESHOLD = 0.25
+
+
+# ---- fixtures ----------------------------------------------------------------
+
+def synth_vectors(hosts, apps, samples, seed=1):
+    """[(module, name, t, v)] of a synthetic run (see module docstring)."""
+    rng = np.random.default_rng(seed)
+    out = []
+    for h in range(hosts):
+        for a in range(apps):
+            mod = f"{NET}.host[{h}].app[{a}]"
+            t = np.sort(rng.uniform(0.0, 0.05, samples)) + 0.1 * a
+            pk = np.full(samples, float(MSS))
+            out.append((mod, "rcvdPk:vector(packetBytes)", t, pk))
+            out.append((mod, "rcvdBytes:vector", t, np.cumsum(pk)))
+            out.append((mod, "endToEndDelay:vector", t, rng.uniform(1e-5, 1e-3, samples)))
+    leaves = max(1, -(-hosts // HOSTS_PER_LEAF))
+    ports = [(f"leaf[{l}]", p) for l in range(leaves) for p in range(SPINES + HOSTS_PER_LEAF)]
+    ports += [(f"spine[{s}]", p) for s in range(SPINES) for p in range(leaves)]
+    for node, p in ports:
+        mod = f"{NET}.{node}.ppp[{p}].queue"
+        t = np.sort(rng.uniform(0.0, 0.1 * apps, samples))
+        q = np.abs(np.cumsum(rng.normal(0.0, 3.0, samples))).round()
+        out.append((mod, "queueLength", t, q))
+        out.append((mod, "queueBitLength", t, q * MSS * 8))
+    return out
+
+
+def _join(a):
+    return " ".join(np.char.mod("%.9g", a))
+
+
+def write_fixtures(d, hosts, apps, samples, seed=1):
+    vecs = synth_vectors(hosts, apps, samples, seed)
+    lens = [len(t) for _, _, t, _ in vecs]
+    pd.DataFrame({"run": "bench-0", "type": "vector",
+                  "module": np.repeat([m for m, _, _, _ in vecs], lens),
+                  "name": np.repeat([n for _, n, _, _ in vecs], lens),
+                  "vectime": np.concatenate([t for _, _, t, _ in vecs]),
+                  "vecvalue": np.concatenate([v for _, _, _, v in vecs])}).to_csv(os.path.join(d, "rows.csv"), index=False)
+    pd.DataFrame({"run": "bench-0", "type": "vector", "module": [m for m, _, _, _ in vecs],
+                  "name": [n for _, n, _, _ in vecs], "attrname": "", "attrvalue": "",
+                  "vectime": [_join(t) for _, _, t, _ in vecs],
+                  "vecvalue": [_join(v) for _, _, _, v in vecs]}).to_csv(os.path.join(d, "wide.csv"), index=False)
+    rows = [(m, s, float(np.sum(v)) if s == "packetReceived:sum" else float(len(v)))
+            for m, n, t, v in vecs if n in ("rcvdPk:vector(packetBytes)", "queueLength")
+            for s in (("packetReceived:sum", "packetReceived:count") if "app" in m else ("packetDropped:count", "packetPushed:count"))]
+    pd.DataFrame({"run": "bench-0", "type": "scalar", "module": [r[0] for r in rows], "name": [r[1] for r in rows],
+                  "attrname": "", "attrvalue": "", "value": [r[2] for r in rows]}).to_csv(os.path.join(d, "scalars.csv"), index=False)
+    with open(os.path.join(d, "flows.inc"), "w") as f:
+        for m, n, t, v in vecs:
+            if n == "rcvdPk:vector(packetBytes)":
+                f.write(f"**.{m.split('.', 1)[1]}.sendBytes = {int(v.sum())}B\n")
+    return {"vectors": len(vecs), "samples": int(sum(lens)),
+            "rows_mb": os.path.getsize(os.path.join(d, "rows.csv")) / 1e6,
+            "wide_mb": os.path.getsize(os.path.join(d, "wide.csv")) / 1e6}
+
+
+# ---- stages: setup(d) -> state (untimed), run(d, state) (timed) ---------------
+
+def _script(path, *argv):
+    old = sys.argv
+    sys.argv = [path, *argv]
+    try:
+        runpy.run_path(path, run_name="__main__")
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            raise RuntimeError(f"{os.path.basename(path)} exited with {e.code}")
+    finally:
+        sys.argv = old
+
+
+def _traffic(d, hosts, apps):
+    import traffic
+    nflows = hosts * apps * 10
+    batches = traffic.gen_flows_batched(traffic.LOAD, nflows * traffic.flow_gap(traffic.LOAD), hosts, traffic.SEED)
+    traffic.write_inc_streaming(batches, os.path.join(d, "traffic.inc"), hosts)
+
+
+def _fct_groups(df, name, fn):
+    # same selection and per-vector loop as scripts/fct_extract.py (in-memory mode)
+    from fct_extract import pick_vectors
+    rx = pick_vectors(df, None)
+    return [fn(g) for _, g in rx[rx["name"].eq(name)].groupby(["module", "name"], sort=False)]
+
+
+def _load_rows(d):
+    from fct_extract import load_vectors
+    return load_vectors(os.path.join(d, "rows.csv"))
+
+
+def _engine(path, d):
+    from fct_engine import fct_engine, iter_app_vectors, load_send_map
+    return fct_engine(iter_app_vectors(path, None), load_send_map(os.path.join(d, "flows.inc")))
+
+
+def _sanity(d, src):
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    _script(os.path.join(SCRIPTS, "plot_sanity.py"), "--source_csv", os.path.join(d, src),
+            "--module", "leaf[0].ppp[2].queue", "--name", "queueBitLength", "--output", os.path.join(d, "sanity.png"))
+
+
+def _rows_tv(d):
+    # plot_sanity.py reads row-wise exports by their time/value columns
+    path = os.path.join(d, "rows_tv.csv")
+    pd.read_csv(os.path.join(d, "rows.csv")).rename(columns={"vectime": "time", "vecvalue": "value"}).to_csv(path, index=False)
+    return path
+
+
+def _store(d):
+    # separate store dir, so the CSV stages keep parsing text instead of picking it up
+    from vecstore import ingest
+    return ingest(os.path.join(d, "wide.csv"), os.path.join(d, "bench.vstore"))
+
+
+def _compare(d, store):
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    p = store
+    _script(os.path.join(ANALYSIS, "plot_queue_compare.py"), "--sym", p, "--asym", p, "--k", "30",
+            "--output", os.path.join(d, "compare.png"))
+
+
+def _fct_bytes(d, df):
+    from fct_extract import fct_from_bytes_series, KEY_BYTES, KEY_PKBYTES
+    _fct_groups(df, KEY_BYTES, lambda g: fct_from_bytes_series(g["vectime"], g["vecvalue"]))
+    _fct_groups(df, KEY_PKBYTES, lambda g: fct_from_bytes_series(g["vectime"], g["vecvalue"], is_pkt_bytes=True))
+
+
+def _fct_e2e(d, df):
+    from fct_extract import fct_from_e2e_times, KEY_E2E
+    _fct_groups(df, KEY_E2E, lambda g: fct_from_e2e_times(g["vectime"]))
+
+
+STAGES = {
+    "traffic_gen": (None, lambda d, s, sc: _traffic(d, sc["hosts"], sc["apps"])),
+    "traffic_incast": (None, lambda d, s, sc: _script(os.path.join(SCRIPTS, "traffic_incast.py"), "8", "0.6", "1",
+                                                      os.path.join(d, "incast.inc"))),
+    "load_vectors": (None, lambda d, s, sc: _load_rows(d)),
+    "fct_from_bytes": (_load_rows, lambda d, s, sc: _fct_bytes(d, s)),
+    "fct_from_e2e": (_load_rows, lambda d, s, sc: _fct_e2e(d, s)),
+    "fct_engine_rows": (None, lambda d, s, sc: _engine(os.path.join(d, "rows.csv"), d)),
+    "fct_engine_wide": (None, lambda d, s, sc: _engine(os.path.join(d, "wide.csv"), d)),
+    "load_scalars": (None, lambda d, s, sc: pd.read_csv(os.path.join(d, "scalars.csv"))
+                     .pivot_table(index="module", columns="name", values="value")),
+    "plot_sanity_rows": (_rows_tv, lambda d, s, sc: _sanity(d, s)),
+    "plot_sanity_wide": (None, lambda d, s, sc: _sanity(d, "wide.csv")),
+    "plot_queue_compare": (_store, lambda d, s, sc: _compare(d, s)),
+}
+
+
+def run_stage(name, d, scale):
+    """Worker side: setup, time one call, report seconds and peak RSS (MB) as JSON."""
+    setup, fn = STAGES[name]
+    state = setup(d) if setup else None
+    t0 = time.perf_counter()
+    fn(d, state, scale)
+    sec = time.perf_counter() - t0
+    print(json.dumps({"stage": name, "seconds": sec, "peak_mb": peak_rss_mb()}))
+
+
+def peak_rss_mb():
+    # VmHWM belongs to this process image; Linux ru_maxrss also counts the forking parent
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return rss / (1 << 20) if sys.platform == "darwin" else rss / 1024.0
+
+
+def measure(name, d, scale, repeats):
+    best = None
+    for _ in range(repeats):
+        p = sp.run([sys.executable, os.path.abspath(__file__), "--stage", name, "--fixture-dir", d,
+                    "--hosts", str(scale["hosts"]), "--apps", str(scale["apps"]), "--samples", str(scale["samples"])],
+                   capture_output=True, text=True, cwd=d)
+        if p.returncode != 0:
+            print(f"[warn] stage {name} failed:\n{p.stderr.strip()[-2000:]}", file=sys.stderr)
+            return None
+        r = json.loads(p.stdout.strip().splitlines()[-1])
+        best = r if best is None else {"stage": name, "seconds": min(best["seconds"], r["seconds"]),
+                                       "peak_mb": min(best["peak_mb"], r["peak_mb"])}
+    return best
+
+
+def compare(results, baseline, threshold):
+    """Rows of (key, metric, base, now, ratio, regressed) for keys present in both."""
+    out = []
+    for key, r in results.items():
+        b = baseline.get(key)
+        if not b:
+            continue
+        for m in ("seconds", "peak_mb"):
+            ratio = r[m] / b[m] if b[m] > 0 else float("nan")
+            out.append((key, m, b[m], r[m], ratio, ratio > 1.0 + threshold))
+    return out
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Benchmark the analysis pipeline on synthetic exports (offline)")
+    ap.add_argument("--hosts", type=int, default=12)
+    ap.add_argument("--apps", type=int, default=4, help="Receive apps per host")
+    ap.add_argument("--samples", type=int, default=1000, help="Samples per vector")
+    ap.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES))
+    ap.add_argument("--repeats", type=int, default=3, help="Worker runs per stage (best of)")
+    ap.add_argument("--baseline", help="Compare with this baseline JSON")
+    ap.add_argument("--save-baseline", metavar="JSON", help="Write (merge) the results into this baseline JSON")
+    ap.add_argument("--threshold", type=float, default=THRESHOLD, help="Allowed slowdown / memory growth (0.25 = +25%%)")
+    ap.add_argument("--keep", metavar="DIR", help="Write fixtures to DIR and keep them")
+    ap.add_argument("--stage", help=argparse.SUPPRESS)
+    ap.add_argument("--fixture-dir", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    scale = {"hosts": args.hosts, "apps": args.apps, "samples": args.samples}
+
+    if args.stage:
+        run_stage(args.stage, args.fixture_dir, scale)
+        sys.exit(0)
+
+    tag = f"h{args.hosts}_a{args.apps}_s{args.samples}"
+    with tempfile.TemporaryDirectory() as tmp:
+        d = args.keep or tmp
+        os.makedirs(d, exist_ok=True)
+        t0 = time.perf_counter()
+        info = write_fixtures(d, args.hosts, args.apps, args.samples)
+        print(f"[info] fixtures {tag}: {info['vectors']} vectors, {info['samples']} samples, "
+              f"rows.csv {info['rows_mb']:.1f} MB, wide.csv {info['wide_mb']:.1f} MB ({time.perf_counter() - t0:.1f}s)")
+        results = {}
+        print(f"{'stage':<20} {'seconds':>9} {'peak_MB':>9}")
+        for name in args.stages:
+            r = measure(name, d, scale, max(1, args.repeats))
+            if r is None:
+                continue
+            results[f"{name}@{tag}"] = {"seconds": r["seconds"], "peak_mb": r["peak_mb"]}
+            print(f"{name:<20} {r['seconds']:>9.3f} {r['peak_mb']:>9.1f}")
+
+    status = 0
+    if args.baseline:
+        if not os.path.exists(args.baseline):
+            sys.exit(f"[ERR] baseline not found: {args.baseline}")
+        with open(args.baseline) as f:
+            rows = compare(results, json.load(f), args.threshold)
+        if not rows:
+            print(f"[warn] no stages at scale {tag} in {args.baseline}", file=sys.stderr)
+        for key, m, b, now, ratio, bad in rows:
+            if bad:
+                print(f"[REGRESSION] {key} {m}: {b:.3f} -> {now:.3f} (x{ratio:.2f} > x{1 + args.threshold:.2f})")
+        status = int(any(r[5] for r in rows))
+        print(f"[{'FAIL' if status else 'ok'}] {sum(r[5] for r in rows)} regressions in {len(rows)} comparisons")
+    if args.save_baseline:
+        base = {}
+        if os.path.exists(args.save_baseline):
+            with open(args.save_baseline) as f:
+                base = json.load(f)
+        base.update(results)
+        os.makedirs(os.path.dirname(os.path.abspath(args.save_baseline)), exist_ok=True)
+        with open(args.save_baseline, "w") as f:
+            json.dump(base, f, indent=1, sort_keys=True)
+        print(f"[ok] saved {len(results)} stages to {args.save_baseline}")
+    sys.exit(status)
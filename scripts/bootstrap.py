@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Bootstrap confidence intervals for FCT percentiles, all groups at once.
+
+Completed-flow FCTs of every run are pooled per (K, L, N, scenario) across
+seeds. For each group, resamples draw n_g flows with replacement. Every
+resample of every group is computed in one batch:
+- one (resamples x flows) index matrix per chunk, each column drawing inside its own group;
+- bincount of the index matrix gives per-flow multiplicities;
+- a cumsum along the rows turns them into resample ranks, monotone over the
+  whole chunk once each row is shifted by row * flows;
+- the order statistic at rank k of group g is the first sorted flow whose
+  cumulative multiplicity exceeds off_g + k: one searchsorted for all
+  resamples, groups and percentiles of the chunk.
+Percentiles use linear interpolation between order statistics (numpy's
+default method), so every resample equals np.percentile of the resampled
+flows, without sorting. Chunks of resamples bound memory (--max-mb).
+
+Usage:
+    python scripts/bootstrap.py                                  # all runs in results/catalog.sqlite
+    python scripts/bootstrap.py --flows results/fct_flows.csv    # analysis/fct_extract.py output
+    python scripts/bootstrap.py --resamples 10000 --level 95 --out results/fct_ci.csv
+"""
+
+import os, sys, argparse
+import numpy as np
+import pandas as pd
+
+GROUP_COLS = ["K", "L", "N", "scenario"]
+QS = (50, 95, 99)
+RESAMPLES = 10000
+MAX_MB = 256
+
+
+def bootstrap_percentiles(values, groups, qs=QS, resamples=RESAMPLES, seed=0, max_bytes=MAX_MB << 20):
+    """Bootstrap distribution of per-group percentiles.
+
+    values: 1-D samples; groups: integer group id per sample (0..G-1, none empty).
+    Returns an array of shape (resamples, G, len(qs)).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    groups = np.asarray(groups, dtype=np.int64)
+    order = np.lexsort((values, groups))
+    x, g = values[order], groups[order]
+    n = np.bincount(g)
+    off = np.concatenate(([0], np.cumsum(n)[:-1]))
+    total = len(x)
+
+    # order-statistic ranks bracketing each percentile, per (group, q)
+    pos = np.outer(n - 1, np.asarray(qs, dtype=np.float64) / 100.0)
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.minimum(lo + 1, (n - 1)[:, None])
+    frac = pos - lo
+
+    rng = np.random.default_rng(seed)
+    n_g = n[g].astype(np.uint64)
+    out = np.empty((resamples, len(n), len(qs)))
+    # index matrix and counts/cumsum (8 bytes each) live at the same time
+    rows = max(1, int(max_bytes // (total * 16)))
+    for start in range(0, resamples, rows):
+        r = min(rows, resamples - start)
+        base = np.arange(r, dtype=np.int64) * total
+        # uniform draw in [0, n_g) by 32-bit multiply-shift (bias < n_g / 2**32)
+        idx = rng.integers(0, 1 << 32, size=(r, total), dtype=np.uint32) * n_g
+        idx >>= np.uint64(32)
+        idx += (base[:, None] + off[g]).astype(np.uint64)
+        # each group draws exactly n_g flows, so within a row group g's ranks start at off_g
+        cum = np.bincount(idx.ravel(), minlength=r * total)
+        del idx
+        np.cumsum(cum, out=cum)
+        ranks = base[:, None, None] + off[None, :, None] + np.stack((lo, hi))[:, None]   # (2, r, G, Q)
+        k = np.searchsorted(cum, ranks, side="right") - base[:, None, None]
+        v = x[k]
+        out[start:start + r] = v[0] + (v[1] - v[0]) * frac
+    return out
+
+
+def confidence_table(df, qs=QS, resamples=RESAMPLES, level=95.0, seed=0, max_bytes=MAX_MB << 20):
+    """Per (group, q): point estimate, bootstrap CI bounds, flow and seed counts.
+
+    df: one row per completed flow with GROUP_COLS, 'seed' and 'fct_ms'.
+    """
+    codes, keys = pd.factorize(pd.MultiIndex.from_frame(df[GROUP_COLS]))
+    dist = bootstrap_percentiles(df["fct_ms"].to_numpy(), codes, qs, resamples, seed, max_bytes)
+    alpha = (100.0 - level) / 2.0
+    ci_lo, ci_hi = np.percentile(dist, [alpha, 100.0 - alpha], axis=0)
+    rows = []
+    for gi, key in enumerate(keys):
+        sel = df["fct_ms"].to_numpy()[codes == gi]
+        est = np.percentile(sel, qs)
+        seeds = df["seed"][codes == gi].nunique()
+        for qi, q in enumerate(qs):
+            rows.append({**dict(zip(GROUP_COLS, key)), "q": q, "estimate": est[qi],
+                         "ci_lo": ci_lo[gi, qi], "ci_hi": ci_hi[gi, qi], "flows": len(sel), "seeds": seeds})
+    return pd.DataFrame(rows)
+
+
+def flows_from_catalog(db_path):
+    """Completed-flow FCTs (ms) of every cataloged run, with the run parameters."""
+    import catalog
+    from fct_engine import fct_engine, iter_app_vectors, load_send_map
+    conn = catalog.connect(db_path)
+    cur = conn.execute("SELECT K, L, N, scenario, seed, vectors_csv, vec_path, flows_inc, work_dir FROM runs WHERE status = 'done'")
+    parts = []
+    for K, L, N, scen, seed, vcsv, vec, inc, work in cur.fetchall():
+        src = next((p for p in (vcsv, vec) if p and os.path.exists(p)), None)
+        if src is None:
+            continue
+        # runs cataloged before the flows_inc column only have their grid work dir
+        if not inc and work:
+            inc = os.path.join(work, "flows.inc")
+        if not inc or not os.path.exists(inc):
+            # no sendBytes to compare against: every flow would be incomplete
+            print(f"[warn] K={K} L={L} N={N} {scen} s{seed}: no flows.inc, run skipped", file=sys.stderr)
+            continue
+        flows = fct_engine(iter_app_vectors(src), load_send_map(inc))
+        done = flows[flows["complete"]]
+        parts.append(pd.DataFrame({"K": K, "L": L, "N": N, "scenario": scen, "seed": seed,
+                                   "fct_ms": done["fct_s"].to_numpy() * 1000.0}))
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=GROUP_COLS + ["seed", "fct_ms"])
+
+
+def flows_from_csv(path):
+    """Completed flows of an analysis/fct_extract.py flows CSV; parameters from the `file` column."""
+    from catalog import params_from_name
+    df = pd.read_csv(path)
+    if "complete" in df.columns:
+        df = df[df["complete"].astype(bool)]
+    params = pd.DataFrame([params_from_name(f) or {} for f in df["file"].astype(str)], index=df.index)
+    if params.empty or params.isna().any(axis=None):
+        sys.exit(f"[ERR] {path}: 'file' values without fixk_K.._L.._N.._s.. parameters")
+    return pd.concat([params, df["fct_ms"]], axis=1)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Bootstrap CIs of FCT P50/P95/P99 per (K, L, N, scenario)")
+    src = ap.add_mutually_exclusive_group()
+    src.add_argument("--catalog", help="Run catalog (default results/catalog.sqlite)")
+    src.add_argument("--flows", help="Per-flow CSV from analysis/fct_extract.py")
+    ap.add_argument("--resamples", type=int, default=RESAMPLES)
+    ap.add_argument("--level", type=float, default=95.0, help="Confidence level in percent")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--max-mb", type=int, default=MAX_MB, help="Memory bound per resample chunk")
+    ap.add_argument("--out", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "results", "fct_ci.csv"))
+    args = ap.parse_args()
+
+    if args.flows:
+        flows = flows_from_csv(args.flows)
+    else:
+        import catalog
+        flows = flows_from_catalog(args.catalog or catalog.CATALOG_PATH)
+    if flows.empty:
+        sys.exit("[ERR] no completed flows to resample")
+    table = confidence_table(flows, QS, args.resamples, args.level, args.seed, args.max_mb << 20)
+    out = os.path.abspath(args.out)
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    table.to_csv(out, index=False)
+    print(f"[ok] wrote {out}: {table[GROUP_COLS].drop_duplicates().shape[0]} groups, {len(flows)} flows, {args.resamples} resamples")
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Experiment catalog: one SQLite row per grid run.
+
+Each row holds the run parameters (K, L, N, scenario, seed), paths to its
+workload and its raw and derived artifacts (flows.inc, .vec, exported CSVs,
+vector store, figure), FCT
+percentiles over completed flows, queue statistics of the ToR->RX queue and
+fabric-wide drop / ECN-mark counts from the scalars (scripts/scalars.py).
+The grid axes are indexed, so plots and reports are indexed queries instead
+of filename regexes over summary CSVs:
+
+    SELECT K, median(p99_ms) FROM runs WHERE L=0.6 AND N=16 AND scenario='asym' GROUP BY K
+
+scripts/grid.py upserts a row as each case finishes. run_grid.sh calls `add` per
+run, and `add` also backfills results exported earlier (parameters come from the
+fixk_K.._L.._N.._{scen}_s.. file name at ingest time only).
+
+Usage:
+    python scripts/catalog.py add results/*_vectors.csv
+    python scripts/catalog.py query --metric p99_ms --L 0.6 --N 16 --scenario asym
+    python scripts/catalog.py stats
+"""
+
+import os, re, sys, time, sqlite3, argparse
+import topo
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+CATALOG_PATH = os.environ.get("DCN_CATALOG", os.path.join(ROOT_DIR, "results", "catalog.sqlite"))
+
+QUEUE_MODULE = topo.load().rx_queue(0)   # ToR egress towards host[0] (leaf[0].ppp[2].queue)
+QUEUE_NAME = "queueBitLength"
+
+CASE_RE = re.compile(r"fixk_K(?P<K>\d+)_L(?P<L>\d+(?:\.\d+)?)_N(?P<N>\d+)_?(?P<scenario>sym|asym)?_s(?P<seed>\d+)")
+
+COLUMNS = {
+    "case_name": "TEXT PRIMARY KEY",
+    "K": "INTEGER", "L": "REAL", "N": "INTEGER", "scenario": "TEXT", "seed": "INTEGER",
+    "status": "TEXT", "cache_key": "TEXT", "work_dir": "TEXT",
+    "flows_inc": "TEXT", "vec_path": "TEXT", "vectors_csv": "TEXT", "scalars_csv": "TEXT", "vstore": "TEXT", "figure": "TEXT",
+    "flows": "INTEGER", "incomplete": "INTEGER",
+    "p50_ms": "REAL", "p95_ms": "REAL", "p99_ms": "REAL",
+    "q_samples": "INTEGER", "q_mean_B": "REAL", "q_p99_B": "REAL", "q_max_B": "REAL",
+    "drops": "INTEGER", "marks": "INTEGER", "forwarded": "INTEGER",
+    "updated": "REAL",
+}
+METRICS = ["p50_ms", "p95_ms", "p99_ms", "q_mean_B", "q_p99_B", "q_max_B", "flows", "incomplete",
+           "drops", "marks", "forwarded"]
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS runs (" + ", ".join(f"{c} {t}" for c, t in COLUMNS.items()) + ")",
+    "CREATE INDEX IF NOT EXISTS runs_axes ON runs (L, N, scenario, K)",
+    "CREATE INDEX IF NOT EXISTS runs_k ON runs (K)",
+    "CREATE INDEX IF NOT EXISTS runs_seed ON runs (seed)",
+]
+
+
+class _Median:
+    def __init__(self):
+        self.vals = []
+
+    def step(self, v):
+        if v is not None:
+            self.vals.append(v)
+
+    def finalize(self):
+        import numpy as np
+        return float(np.median(self.vals)) if self.vals else None
+
+
+def connect(path=CATALOG_PATH):
+    """Open (and create) the catalog; adds a `median` SQL aggregate."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(SCHEMA[0])
+    # catalogs created before a column was added get it as NULL
+    have = {r[1] for r in conn.execute("PRAGMA table_info(runs)")}
+    for c, t in COLUMNS.items():
+        if c not in have:
+            conn.execute(f"ALTER TABLE runs ADD COLUMN {c} {t}")
+    for stmt in SCHEMA[1:]:
+        conn.execute(stmt)
+    conn.create_aggregate("median", 1, _Median)
+    return conn
+
+
+def upsert(conn, row):
+    """Insert or update one run; columns absent from `row` keep their stored value."""
+    row = {k: v for k, v in row.items() if k in COLUMNS}
+    row["updated"] = time.time()
+    cols = list(row)
+    sets = ", ".join(f"{c}=excluded.{c}" for c in cols if c != "case_name")
+    conn.execute(f"INSERT INTO runs ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))}) "
+                 f"ON CONFLICT(case_name) DO UPDATE SET {sets}", [row[c] for c in cols])
+    conn.commit()
+
+
+def params_from_name(name):
+    m = CASE_RE.search(os.path.basename(name))
+    if not m:
+        return None
+    d = m.groupdict()
+    return {"K": int(d["K"]), "L": float(d["L"]), "N": int(d["N"]),
+            "scenario": d["scenario"] or "sym", "seed": int(d["seed"])}
+
+
+def queue_stats(source, module=QUEUE_MODULE, name=QUEUE_NAME):
+    """Time-weighted mean / p99 and peak of the first matching queue vector, in bytes."""
+    from queue_stats import queue_table
+    from vecstore import open_vectors, iter_csv_vectors
+    src = open_vectors(source)
+    if src is not None:
+        infos = src.select(module, name)
+        tv = src.read(infos[0]) if infos else None
+    else:
+        tv = next(((t, v) for _, _, t, v in iter_csv_vectors(source, lambda m, n: module in m and name in n)), None)
+    if tv is None or len(tv[0]) == 0:
+        return {}
+    row = queue_table([(module, name, *tv)]).iloc[0]
+    return {"q_samples": int(row["samples"]), "q_mean_B": float(row["mean"]),
+            "q_p99_B": float(row["p99"]), "q_max_B": float(row["peak"])}
+
+
+def run_metrics(source, flows_inc=None, queue_module=QUEUE_MODULE, last_byte=False):
+    """FCT percentiles (completed flows, all receivers) and queue statistics of one run.
+
+    Without flows_inc no flow has a sendBytes, so all are incomplete unless last_byte.
+    """
+    import numpy as np
+    from fct_engine import fct_engine, iter_app_vectors, percentiles, load_send_map
+    flows = fct_engine(iter_app_vectors(source), load_send_map(flows_inc) if flows_inc else None, last_byte)
+    done = flows[flows["complete"]]
+    pct = percentiles(done["fct_s"])
+    out = {"flows": len(flows), "incomplete": int((~flows["complete"]).sum()),
+           "p50_ms": pct[50] * 1000.0, "p95_ms": pct[95] * 1000.0, "p99_ms": pct[99] * 1000.0}
+    out.update(queue_stats(source, queue_module))
+    # NULL, not NaN, for "no completed flows" so SQL aggregates skip it
+    return {k: (None if isinstance(v, float) and np.isnan(v) else v) for k, v in out.items()}
+
+
+def add_vectors(conn, vectors_csv, flows_inc=None, queue_module=QUEUE_MODULE, last_byte=False, **extra):
+    """Catalog an exported run by its vectors CSV (parameters from the file name)."""
+    from vecstore import store_path_for
+    from scalars import scalar_metrics
+    name = os.path.basename(vectors_csv)
+    for suffix in ("_vectors.csv", ".csv", ".vec"):
+        if name.endswith(suffix):
+            name = name[: -len(suffix)]
+            break
+    params = params_from_name(name)
+    if params is None:
+        return None
+    res_dir = os.path.dirname(os.path.abspath(vectors_csv))
+    scalars = os.path.join(res_dir, f"{name}_scalars.csv")
+    store = store_path_for(vectors_csv)
+    row = {"case_name": name, **params, "status": "done", "vectors_csv": os.path.abspath(vectors_csv),
+           "flows_inc": os.path.abspath(flows_inc) if flows_inc else None,
+           "scalars_csv": scalars if os.path.exists(scalars) else None,
+           "vstore": store if os.path.isdir(store) else None}
+    row.update(extra)
+    row.update(run_metrics(vectors_csv, flows_inc, queue_module, last_byte))
+    row.update(scalar_metrics(row["scalars_csv"]))
+    upsert(conn, row)
+    return row
+
+
+def query(conn, metric, L=None, N=None, scenario=None, agg="median", by="K"):
+    """[(by, aggregated metric, runs)] for the filtered slice, ordered by `by`."""
+    if metric not in METRICS or by not in ("K", "L", "N", "scenario", "seed") or agg not in ("median", "avg", "min", "max"):
+        raise ValueError(f"bad query: {agg}({metric}) by {by}")
+    where, vals = ["status = 'done'", f"{metric} IS NOT NULL"], []
+    for col, val in (("L", L), ("N", N), ("scenario", scenario)):
+        if val is not None:
+            where.append(f"{col} = ?")
+            vals.append(float(val) if col == "L" else int(val) if col == "N" else val)
+    sql = f"SELECT {by}, {agg}({metric}), COUNT(*) FROM runs WHERE {' AND '.join(where)} GROUP BY {by} ORDER BY {by}"
+    return conn.execute(sql, vals).fetchall()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="SQLite catalog of grid runs")
+    ap.add_argument("--db", default=CATALOG_PATH)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("add", help="Catalog exported runs by their *_vectors.csv")
+    p.add_argument("vectors", nargs="+")
+    p.add_argument("--flows-inc", help="flows.inc the run used (sendBytes per app)")
+    p.add_argument("--complete-at-last-byte", action="store_true",
+                   help="Flows without sendBytes complete at their last received byte (default: incomplete)")
+    p = sub.add_parser("query", help="Aggregated metric per K for one (L, N, scenario) slice")
+    p.add_argument("--metric", default="p99_ms", choices=METRICS)
+    p.add_argument("--L")
+    p.add_argument("--N")
+    p.add_argument("--scenario", choices=["sym", "asym"])
+    p.add_argument("--agg", default="median", choices=["median", "avg", "min", "max"])
+    p.add_argument("--by", default="K", choices=["K", "L", "N", "scenario", "seed"])
+    sub.add_parser("stats", help="Row counts per scenario")
+    args = ap.parse_args()
+
+    conn = connect(args.db)
+    if args.cmd == "add":
+        for v in args.vectors:
+            if not os.path.exists(v):
+                print(f"[warn] missing: {v}", file=sys.stderr)
+            elif add_vectors(conn, v, args.flows_inc, last_byte=args.complete_at_last_byte) is None:
+                print(f"[warn] no fixk_K.._L.._N.._s.. parameters in name: {v}", file=sys.stderr)
+            else:
+                print(f"[ok] cataloged {v}")
+    elif args.cmd == "query":
+        print(f"{args.by}\t{args.agg}({args.metric})\truns")
+        for key, val, n in query(conn, args.metric, args.L, args.N, args.scenario, args.agg, args.by):
+            print(f"{key}\t{val:.6g}\t{n}")
+    else:
+        total = conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+        print(f"{total} runs in {args.db}")
+        for scen, n in conn.execute("SELECT scenario, COUNT(*) FROM runs GROUP BY scenario"):
+            print(f"  {scen}: {n}")
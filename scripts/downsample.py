@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Extreme-preserving downsampling for long step signals (queue lengths, counters).
+
+The trace is split into equal-count buckets. Each bucket keeps its first and
+last samples plus its min and max samples, so the plot keeps every spike and
+trough. The level held into the next bucket is also preserved, which keeps
+threshold crossings against K visible. Everything is done with reshape and
+argmin/argmax on the padded arrays: O(n), no Python-level loop over samples.
+
+Usage:
+    from downsample import minmax_downsample
+    t, q = minmax_downsample(t, q, 20000)
+"""
+
+import numpy as np
+
+MAX_POINTS = 20000
+
+
+def minmax_indices(y, max_points=MAX_POINTS):
+    """Sorted sample indices to keep (at most ~max_points; all of them if already short)."""
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if max_points <= 0 or n <= max_points:
+        return np.arange(n)
+    nb = max(1, max_points // 4)             # 4 kept samples per bucket
+    size = -(-n // nb)
+    nb = -(-n // size)
+    pad = nb * size - n
+    # NaN samples never win min/max
+    lo = np.concatenate((np.where(np.isnan(y), np.inf, y), np.full(pad, np.inf))).reshape(nb, size)
+    hi = np.concatenate((np.where(np.isnan(y), -np.inf, y), np.full(pad, -np.inf))).reshape(nb, size)
+    base = np.arange(nb) * size
+    first = base
+    last = np.minimum(base + size, n) - 1
+    imin = base + lo.argmin(axis=1)
+    imax = base + hi.argmax(axis=1)
+    return np.unique(np.concatenate((first, imin, imax, last)))
+
+
+def minmax_downsample(x, y, max_points=MAX_POINTS):
+    """(x, y) as NumPy arrays reduced to bucket first/min/max/last samples."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    idx = minmax_indices(y, max_points)
+    return x[idx], y[idx]
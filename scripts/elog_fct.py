@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Exact per-flow FCT from an OMNeT++ eventlog (.elog), streamed line by line.
+
+Every message is labeled with the flow that caused it, by following the
+eventlog's causality:
+- an event at a sender app module (host[s].app[i] with sendBytes in flows.inc)
+  belongs to that flow;
+- any other event takes the label of the message it processes;
+- a message keeps the label it got when first sent (BS), so packets waiting in
+  shared queues stay with their own flow, and new segments, ACKs, timers and
+  socket indications take the label of the event that sends them.
+Per flow:
+- start is the first event at the sender app that sends a non-empty message (tSend);
+- bytes are the payload of the labeled messages delivered to an app on another host;
+- completion is the delivery that reaches sendBytes, or the last delivery if none does.
+There are no vector-recording gaps, and byte counts are kept (unlike endToEndDelay).
+
+Memory holds the module table, the live messages (removed on DM) and one row per
+flow. It does not grow with the log. Parsing is a generator pipeline:
+lines -> entries -> FlowTracker. With -j N the file is cut into byte ranges,
+aligned on event lines, and parsed by a process pool. Ranges are consumed in
+order through a bounded window, so the labeling pass stays sequential and exact.
+
+Usage:
+    python scripts/elog_fct.py sim/results/incast8/General-#0.elog --flows-inc sim/flows.inc
+    python scripts/elog_fct.py run.elog -j 8 --chunk-mb 64 --out results/incast8_elog_flows.csv
+"""
+
+import os, re, sys, argparse
+import numpy as np
+import pandas as pd
+from collections import deque
+from fct_engine import load_send_map, percentiles
+from flowmanifest import FlowManifest
+
+HOST_APP_RE = re.compile(r"(?:^|\.)host\[(\d+)\]\.app\[(\d+)\]$")
+CHUNK_MB = 64
+
+COLUMNS = ["host", "app", "dst", "signal", "bytes_need", "bytes_rcvd", "residual_bytes",
+           "t_start", "t_end", "fct_s", "complete"]
+
+
+def iter_lines(path, start=0, end=None):
+    """Raw lines of the event blocks that begin in [start, end) (the whole file by default)."""
+    with open(path, "rb") as f:
+        pos = start
+        if start > 0:
+            # drop the line straddling start (a line that begins exactly at start is kept),
+            # then skip to the first event line
+            f.seek(start - 1)
+            pos += len(f.readline()) - 1
+            for line in f:
+                if line.startswith(b"E #"):
+                    break
+                pos += len(line)
+            else:
+                return
+            if end is not None and pos >= end:
+                # the range holds no event line: that block belongs to the next range
+                return
+            yield line
+            pos += len(line)
+        else:
+            f.seek(0)
+        for line in f:
+            if end is not None and pos >= end and line.startswith(b"E #"):
+                return
+            pos += len(line)
+            yield line
+
+
+def iter_entries(lines):
+    """Compact tuples for the entry types the tracker needs:
+    ('E', t, module, msg), ('BS', id, bits), ('DM', id), ('MC', id, parent, name)."""
+    for line in lines:
+        c = line[:3]
+        if c == b"E #":
+            kv = line.split()
+            kv = dict(zip(kv[1::2], kv[2::2]))
+            yield ("E", float(kv[b"t"]), int(kv[b"m"]), int(kv.get(b"msg", -1)))
+        elif c == b"BS ":
+            kv = line.split()
+            kv = dict(zip(kv[1::2], kv[2::2]))
+            yield ("BS", int(kv[b"id"]), int(kv.get(b"l", 0)))
+        elif c == b"DM ":
+            kv = line.split()
+            yield ("DM", int(kv[kv.index(b"id") + 1]))
+        elif c == b"MC ":
+            kv = line.split()
+            kv = dict(zip(kv[1::2], kv[2::2]))
+            yield ("MC", int(kv[b"id"]), int(kv.get(b"pid", -1)), kv.get(b"n", b"").decode().strip('"'))
+
+
+def parse_range(args):
+    path, start, end = args
+    return list(iter_entries(iter_lines(path, start, end)))
+
+
+class FlowTracker:
+    def __init__(self, send_map):
+        self.send_map = send_map
+        self.path = {}          # module id -> full path
+        self.sender = {}        # module id -> flow index (sender app modules)
+        self.app_host = {}      # module id -> host index (every host[h].app[i])
+        self.msg = {}           # live message id -> [flow label, bits]
+        if isinstance(send_map, FlowManifest):
+            # flows in (host, app) order straight from the manifest columns
+            rows = np.asarray(send_map.by_host)
+            self.keys = list(zip(send_map.src[rows].tolist(), send_map.app[rows].tolist()))
+            self.need = send_map.bytes[rows].astype(np.float64)
+        else:
+            self.keys = list(send_map)
+            self.need = np.array([send_map[k] for k in self.keys], dtype=np.float64)
+        self.index = {k: i for i, k in enumerate(self.keys)}
+        n = len(self.keys)
+        self.rcvd = np.zeros(n)
+        self.t_start = np.full(n, np.nan)
+        self.t_end = np.full(n, np.nan)
+        self.t_done = np.full(n, np.nan)
+        self.dst = np.full(n, -1, dtype=np.int64)
+        self.cur = None
+        self.cur_mod = None
+        self.t = 0.0
+        self.events = 0
+
+    def feed(self, entries):
+        msg, sender, app_host = self.msg, self.sender, self.app_host
+        for e in entries:
+            kind = e[0]
+            if kind == "E":
+                _, t, m, x = e
+                self.t, self.cur_mod = t, m
+                self.events += 1
+                live = msg.get(x)
+                lab = sender.get(m, live[0] if live else None)
+                self.cur = lab
+                h = app_host.get(m)
+                if lab is not None and live and h is not None and m not in sender and live[1] > 0:
+                    src = self.keys[lab][0]
+                    if h != src:
+                        # payload delivered to an app on the receiving host
+                        self.rcvd[lab] += live[1] / 8.0
+                        self.t_end[lab] = t
+                        self.dst[lab] = h
+                        if np.isnan(self.t_done[lab]) and self.rcvd[lab] >= self.need[lab]:
+                            self.t_done[lab] = t
+            elif kind == "BS":
+                _, x, bits = e
+                live = msg.get(x)
+                if live is None:
+                    msg[x] = [self.cur, bits]
+                else:
+                    live[1] = bits
+                    if live[0] is None:
+                        live[0] = self.cur
+                if bits > 0 and self.cur_mod in sender:
+                    lab = sender[self.cur_mod]
+                    if np.isnan(self.t_start[lab]):
+                        self.t_start[lab] = self.t
+            elif kind == "DM":
+                msg.pop(e[1], None)
+            else:
+                _, mid, pid, name = e
+                p = f"{self.path[pid]}.{name}" if pid in self.path else name
+                self.path[mid] = p
+                m = HOST_APP_RE.search(p)
+                if m:
+                    ha = (int(m.group(1)), int(m.group(2)))
+                    app_host[mid] = ha[0]
+                    if ha in self.index:
+                        sender[mid] = self.index[ha]
+
+    def table(self):
+        done = ~np.isnan(self.t_done)
+        t_end = np.where(done, self.t_done, self.t_end)
+        df = pd.DataFrame({
+            "host": [k[0] for k in self.keys], "app": [k[1] for k in self.keys], "dst": self.dst,
+            "signal": "eventlog", "bytes_need": self.need, "bytes_rcvd": self.rcvd,
+            "residual_bytes": np.maximum(self.need - self.rcvd, 0.0),
+            "t_start": self.t_start, "t_end": t_end, "fct_s": t_end - self.t_start, "complete": done})
+        # flows whose app never sent anything are not in the run (e.g. a different flows.inc)
+        return df[~np.isnan(df["t_start"])].reset_index(drop=True)[COLUMNS]
+
+
+def byte_ranges(path, chunk):
+    size = os.path.getsize(path)
+    chunk = max(1, int(chunk))
+    return [(path, s, min(s + chunk, size)) for s in range(0, size, chunk)] or [(path, 0, 0)]
+
+
+def track(path, send_map, jobs=1, chunk=CHUNK_MB << 20):
+    """FlowTracker fed with the whole log (serially, or parsed by a process pool)."""
+    tr = FlowTracker(send_map)
+    if jobs <= 1:
+        tr.feed(iter_entries(iter_lines(path)))
+        return tr
+    from concurrent.futures import ProcessPoolExecutor
+    ranges = deque(byte_ranges(path, chunk))
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        window = deque(pool.submit(parse_range, ranges.popleft()) for _ in range(min(jobs + 1, len(ranges))))
+        while window:
+            entries = window.popleft().result()
+            if ranges:
+                window.append(pool.submit(parse_range, ranges.popleft()))
+            tr.feed(entries)
+            del entries
+    return tr
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Exact per-flow FCT from an OMNeT++ eventlog")
+    ap.add_argument("elog", nargs="+")
+    ap.add_argument("--flows-inc", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "sim", "flows.inc"),
+                    help="flows.inc of the run, or its .manifest (sendBytes per sender app; default sim/flows.inc)")
+    ap.add_argument("-j", "--jobs", type=int, default=1, help="Parse byte ranges in N processes")
+    ap.add_argument("--chunk-mb", type=float, default=CHUNK_MB, help="Byte range size per task with -j")
+    ap.add_argument("--out", help="Per-flow CSV (default <elog stem>_elog_flows.csv; only with one input)")
+    args = ap.parse_args()
+
+    send_map = load_send_map(args.flows_inc)
+    if not send_map:
+        sys.exit(f"[ERR] no sendBytes in {args.flows_inc}")
+    for path in args.elog:
+        if not os.path.isfile(path):
+            print(f"[warn] missing: {path}", file=sys.stderr)
+            continue
+        tr = track(path, send_map, args.jobs, args.chunk_mb * (1 << 20))
+        flows = tr.table()
+        out = args.out if args.out and len(args.elog) == 1 else os.path.splitext(path)[0] + "_elog_flows.csv"
+        flows.to_csv(out, index=False)
+        done = flows[flows["complete"]]
+        pct = percentiles(done["fct_s"])
+        print(f"[ok] {path}: {tr.events} events, {len(flows)} flows ({len(done)} complete) -> {out}")
+        if len(done):
+            print(f"     FCT P50/P95/P99 = {pct[50]*1e3:.3f} / {pct[95]*1e3:.3f} / {pct[99]*1e3:.3f} ms")
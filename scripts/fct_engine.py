@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Vectorized single-pass FCT engine.
+
+All host[*].app[*] receive vectors of a run are gathered in one scan (vector
+store, native .vec or any exported CSV shape), concatenated into flat arrays
+and reduced together:
+- per-sample byte increments -> one global cumsum (segments never decrease)
+- first-byte time  = searchsorted(cum, base_g, 'right')
+- completion time  = searchsorted(cum, base_g + need_g, 'left'), not before the first byte
+Flows whose completion index falls outside their own segment are reported as
+incomplete together with their residual bytes. Flows without a sendBytes in the
+workload are incomplete as well (bytes_need NaN), unless complete_at_last_byte.
+"""
+
+import re
+
+# receive-side signals in preference order; rcvdBytes is already a running total
+SIGNALS = ("rcvdBytes:vector", "rcvdPk:vector(packetBytes)", "packetReceived:vector(packetBytes)")
+CUMULATIVE = {"rcvdBytes:vector"}
+
+APP_RE = re.compile(r"(?:^|\.)host\[(\d+)\]\.app\[(\d+)\]$")
+
+FLOW_COLUMNS = ["host", "app", "signal", "bytes_need", "bytes_rcvd", "residual_bytes",
+                "t_start", "t_end", "fct_s", "complete"]
+
+
+def app_of(module):
+    m = APP_RE.search(str(module))
+    return (int(m.group(1)), int(m.group(2))) if m else None
+
+
+SEND_RE = re.compile(r"host\[(\d+)\]\.app\[(\d+)\]\.sendBytes\s*=\s*(\d+)B?")
+
+
+def parse_send_map(path):
+    """{(host, app): sendBytes} for every app configured in a flows.inc (empty if missing)."""
+    send = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                m = SEND_RE.search(line)
+                if m:
+                    send[(int(m.group(1)), int(m.group(2)))] = int(m.group(3))
+    except FileNotFoundError:
+        pass
+    return send
+
+
+def load_send_map(path):
+    """(host, app) -> sendBytes of a workload: its flow manifest (scripts/flowmanifest.py)
+    when one matches the flows.inc, else parse_send_map of the text."""
+    from flowmanifest import FlowManifest, for_inc, MANIFEST_SUFFIX
+    if str(path).endswith(MANIFEST_SUFFIX):
+        return FlowManifest(path)
+    return for_inc(path) or parse_send_map(path)
+
+
+def iter_app_vectors(path, rx_host=None):
+    """Yield (host, app, signal, t, v) for every receive vector of host[*].app[*], one pass."""
+    from vecstore import open_vectors, iter_csv_vectors
+    src = open_vectors(path)
+    if src is not None:
+        picked = []
+        for info in src.catalog():
+            if info.name not in SIGNALS:
+                continue
+            ha = app_of(info.module)
+            if ha and (rx_host is None or ha[0] == rx_host):
+                picked.append((ha, info))
+        data = src.read_many([info for _, info in picked])
+        for (h, a), info in picked:
+            t, v = data[info.key]
+            yield h, a, info.name, t, v
+        return
+    def keep(mod, name):
+        ha = app_of(mod) if name in SIGNALS else None
+        return ha is not None and (rx_host is None or ha[0] == rx_host)
+    # only the receive vectors are buffered while a row-wise export is read
+    for mod, name, t, v in iter_csv_vectors(path, keep):
+        ha = app_of(mod)
+        yield ha[0], ha[1], name, t, v
+
+
+def fct_engine(vectors, send_map=None, complete_at_last_byte=False):
+    """Per-flow FCT table from (host, app, signal, t, v) tuples.
+
+    send_map: {(host, app): bytes} or a FlowManifest (one vectorized index
+    lookup). Flows missing from it are incomplete with bytes_need NaN;
+    complete_at_last_byte=True instead completes them at their final received
+    byte count (only right when every flow is known to have finished).
+    """
+    import numpy as np
+    import pandas as pd
+    from flowmanifest import FlowManifest
+    send_map = send_map or {}
+    best = {}
+    for h, a, sig, t, v in vectors:
+        rank = SIGNALS.index(sig)
+        if len(t) and ((h, a) not in best or rank < best[(h, a)][0]):
+            best[(h, a)] = (rank, sig, t, v)
+    if not best:
+        return pd.DataFrame(columns=FLOW_COLUMNS)
+
+    keys = sorted(best)
+    sigs = [best[k][1] for k in keys]
+    lens = np.array([len(best[k][2]) for k in keys], dtype=np.int64)
+    start = np.concatenate(([0], np.cumsum(lens)[:-1]))
+    end = start + lens
+    t = np.concatenate([np.asarray(best[k][2], dtype=np.float64) for k in keys])
+    v = np.concatenate([np.asarray(best[k][3], dtype=np.float64) for k in keys])
+    gid = np.repeat(np.arange(len(keys)), lens)
+
+    # time order inside each segment (already sorted for recorder output)
+    if np.any((np.diff(t) < 0) & (gid[1:] == gid[:-1])):
+        order = np.lexsort((t, gid))
+        t, v = t[order], v[order]
+
+    # running totals -> increments; a counter never gives back bytes
+    cum_g = np.array([s in CUMULATIVE for s in sigs])
+    inc = v.copy()
+    if cum_g.any():
+        d = np.diff(v, prepend=0.0)
+        d[start] = v[start]
+        inc = np.where(cum_g[gid], d, v)
+    inc = np.maximum(inc, 0.0)
+
+    cum = np.cumsum(inc)
+    cum0 = np.concatenate(([0.0], cum))
+    base = cum0[start]
+    rcvd = cum0[end] - base
+    if isinstance(send_map, FlowManifest):
+        need = send_map.send_bytes([k[0] for k in keys], [k[1] for k in keys])
+    else:
+        need = np.array([send_map.get(k, np.nan) for k in keys], dtype=np.float64)
+    unknown = np.isnan(need)
+    if complete_at_last_byte:
+        need = np.where(unknown, rcvd, need)
+        unknown[:] = False
+
+    first = np.searchsorted(cum, base, side="right")
+    done = np.searchsorted(cum, base + need, side="left")
+    # need <= 0 would land in the previous flow's segment (cum[start - 1] == base)
+    done = np.maximum(done, first)
+    started = (first < end) & (rcvd > 0)
+    complete = started & (done < end) & ~unknown
+
+    t_pad = np.concatenate((t, [np.nan]))
+    t_start = np.where(started, t_pad[np.minimum(first, len(t))], np.nan)
+    t_end = np.where(complete, t_pad[np.minimum(done, len(t))], np.nan)
+    return pd.DataFrame({
+        "host": [k[0] for k in keys],
+        "app": [k[1] for k in keys],
+        "signal": sigs,
+        "bytes_need": need,
+        "bytes_rcvd": rcvd,
+        "residual_bytes": np.maximum(need - rcvd, 0.0),
+        "t_start": t_start,
+        "t_end": t_end,
+        "fct_s": np.maximum(t_end - t_start, 0.0),
+        "complete": complete,
+    }, columns=FLOW_COLUMNS)
+
+
+def percentiles(fct_s, qs=(50, 95, 99)):
+    """{q: value} for the given percentiles in one np.percentile call (NaN when empty)."""
+    import numpy as np
+    arr = np.asarray(fct_s, dtype=np.float64)
+    arr = arr[~np.isnan(arr)]
+    if arr.size == 0:
+        return {q: float("nan") for q in qs}
+    return dict(zip(qs, np.percentile(arr, qs).tolist()))
@@ -1,9 +1,15 @@
 #!/usr/bin/env python3
-import argparse, sys, os
+import argparse, sys, os, re
 import pandas as pd
 import numpy as np
 
 USECOLS = ["run","type","module","name","vectime","vecvalue"]
+CHUNK_ROWS = 500_000
+
+# 三类候选统计
+KEY_BYTES   = "rcvdBytes:vector"
+KEY_PKBYTES = "rcvdPk:vector(packetBytes)"
+KEY_E2E     = "endToEndDelay:vector"
 
 def load_vectors(path):
     df = pd.read_csv(path, usecols=USECOLS, low_memory=False)
@@ -13,8 +19,18 @@ def load_vectors(path):
     df = df.dropna(subset=["vectime","vecvalue"])
     return df
 
+HOST_RE = re.compile(r"\.host\[(\d+)\]\.")
+
+def host_pattern(rx_host):
+    # rx_host=None: every host in the fabric
+    return r"\.host\[\d+\]\." if rx_host is None else rf"\.host\[{rx_host}\]\."
+
+def host_of(module):
+    m = HOST_RE.search(str(module))
+    return int(m.group(1)) if m else -1
+
 def pick_vectors(df, rx_host):
-    mask_host = df["module"].astype(str).str.contains(rf"\.host\[{rx_host}\]\.", regex=True)
+    mask_host = df["module"].astype(str).str.contains(host_pattern(rx_host), regex=True)
     return df[mask_host].copy()
 
 def fct_from_bytes_series(times, values, is_pkt_bytes=False):
@@ -39,40 +55,148 @@ def fct_from_e2e_times(times):
     t1 = float(np.max(times))
     return dict(t_start=t0, t_end=t1, bytes_total=float('nan'), fct_s=float(max(0.0, t1-t0)))
 
+class VectorAcc:
+    """Running state of one (module, name) vector in streaming mode.
+
+    Holds the first-byte time, the running byte count and the time the count
+    first reached its maximum, so memory does not grow with the sample count.
+    Relies on each vector's rows being in time order (as opp_scavetool writes them).
+    """
+    __slots__ = ("rows", "cum", "t0", "vmax", "t_vmax", "last", "last_t", "tmin", "tmax")
+
+    def __init__(self):
+        self.rows = 0
+        self.cum = 0.0
+        self.t0 = None
+        self.vmax = -np.inf
+        self.t_vmax = None
+        self.last = None
+        self.last_t = -np.inf
+        self.tmin = np.inf
+        self.tmax = -np.inf
+
+    def fold(self, t, v, is_pkt_bytes):
+        if t[0] < self.last_t or np.any(np.diff(t) < 0):
+            raise ValueError("vector rows are not in time order; rerun without --stream")
+        if is_pkt_bytes:
+            v = self.cum + np.cumsum(v)
+            self.cum = float(v[-1])
+        if self.t0 is None:
+            started = np.flatnonzero(v > 0)
+            if started.size:
+                self.t0 = float(t[started[0]])
+        m = float(v.max())
+        if m > self.vmax:
+            self.vmax = m
+            self.t_vmax = float(t[np.flatnonzero(v >= m)[0]])
+        self.last, self.last_t = float(v[-1]), float(t[-1])
+        self.tmin = min(self.tmin, float(t[0]))
+        self.tmax = max(self.tmax, float(t[-1]))
+        self.rows += len(t)
+
+    def bytes_result(self):
+        if self.t0 is None:
+            return None
+        if self.last < self.vmax:
+            raise ValueError("byte counter decreased; rerun without --stream")
+        t1 = self.t_vmax
+        return dict(t_start=self.t0, t_end=t1, bytes_total=self.last, fct_s=float(max(0.0, t1-self.t0)))
+
+    def e2e_result(self):
+        if self.rows == 0:
+            return None
+        return dict(t_start=self.tmin, t_end=self.tmax, bytes_total=float('nan'), fct_s=float(max(0.0, self.tmax-self.tmin)))
+
+def stream_vectors(path, rx_host, chunksize=CHUNK_ROWS):
+    """Fold the CSV chunk by chunk into per-vector accumulators for host[rx_host] (None: all hosts).
+
+    Returns ({(module, name): VectorAcc} for the FCT statistics, inventory DataFrame).
+    Peak memory is one chunk plus one small accumulator per vector.
+    """
+    accs = {}
+    inventory = {}
+    host_pat = host_pattern(rx_host)
+    keys = {KEY_BYTES, KEY_PKBYTES, KEY_E2E}
+    for chunk in pd.read_csv(path, usecols=USECOLS, chunksize=chunksize, low_memory=False):
+        chunk = chunk[(chunk["type"]=="vector") & chunk["module"].astype(str).str.contains(host_pat, regex=True)]
+        if chunk.empty:
+            continue
+        chunk = chunk.assign(vectime=pd.to_numeric(chunk["vectime"], errors="coerce"),
+                             vecvalue=pd.to_numeric(chunk["vecvalue"], errors="coerce"))
+        chunk = chunk.dropna(subset=["vectime","vecvalue"])
+        for (mod, name), idx in chunk.groupby(["module","name"], sort=False).indices.items():
+            inventory[(mod, name)] = inventory.get((mod, name), 0) + len(idx)
+            if name not in keys:
+                continue
+            acc = accs.get((mod, name))
+            if acc is None:
+                acc = accs[(mod, name)] = VectorAcc()
+            acc.fold(chunk["vectime"].to_numpy()[idx], chunk["vecvalue"].to_numpy()[idx], name == KEY_PKBYTES)
+    inv = pd.DataFrame([{"module": m, "name": n, "rows": r} for (m, n), r in inventory.items()],
+                       columns=["module","name","rows"]).sort_values("rows", ascending=False)
+    return accs, inv
+
+def rows_from_stream(accs):
+    rows = []
+    for key in (KEY_BYTES, KEY_PKBYTES):
+        for (mod, name), acc in accs.items():
+            if name == key:
+                res = acc.bytes_result()
+                if res: rows.append({"module":mod, "name":name, **res})
+    covered = {host_of(r["module"]) for r in rows}
+    for (mod, name), acc in accs.items():
+        # endToEndDelay fallback for receivers without byte statistics
+        if name == KEY_E2E and host_of(mod) not in covered:
+            res = acc.e2e_result()
+            if res: rows.append({"module":mod, "name":name, **res})
+    return rows
+
 def main():
     ap = argparse.ArgumentParser(description="Extract per-flow FCT from vectors CSV (bytes or fallback to endToEndDelay)")
     ap.add_argument("--vectors", required=True)
     ap.add_argument("--rx-host", type=int, default=0)
+    ap.add_argument("--all-hosts", action="store_true",
+                    help="Every receiver host[*] in one pass; summary per receiver plus fabric-wide")
     ap.add_argument("--out_flows", required=True)
     ap.add_argument("--out_summary", required=True)
+    ap.add_argument("--stream", action="store_true", help="Chunked, bounded-memory pass over the CSV (same output)")
+    ap.add_argument("--chunksize", type=int, default=CHUNK_ROWS, help="CSV rows per chunk in --stream mode")
     args = ap.parse_args()
 
     if not os.path.isfile(args.vectors):
         sys.exit(f"[ERR] vectors CSV not found: {args.vectors}")
+    if args.all_hosts:
+        args.rx_host = None
+
+    key_bytes, key_pkbytes, key_e2e = KEY_BYTES, KEY_PKBYTES, KEY_E2E
+    if args.stream:
+        try:
+            accs, inv = stream_vectors(args.vectors, args.rx_host, args.chunksize)
+        except ValueError as e:
+            sys.exit(f"[ERR] {e}")
+        if inv.empty:
+            sys.exit(f"[ERR] No vectors under host[{'*' if args.rx_host is None else args.rx_host}] in {args.vectors}")
+        if not accs:
+            report_missing(args, inv)
+        try:
+            rows = rows_from_stream(accs)
+        except ValueError as e:
+            sys.exit(f"[ERR] {e}")
+        write_outputs(args, rows)
+        return
 
     df = load_vectors(args.vectors)
     rx = pick_vectors(df, args.rx_host)
     if rx.empty:
-        sys.exit(f"[ERR] No vectors under host[{args.rx_host}] in {args.vectors}")
-
-    # 三类候选统计
-    key_bytes   = "rcvdBytes:vector"
-    key_pkbytes = "rcvdPk:vector(packetBytes)"
-    key_e2e     = "endToEndDelay:vector"
+        sys.exit(f"[ERR] No vectors under host[{'*' if args.rx_host is None else args.rx_host}] in {args.vectors}")
 
     have_bytes   = rx["name"].eq(key_bytes).any()
     have_pkbytes = rx["name"].eq(key_pkbytes).any()
     have_e2e     = rx["name"].eq(key_e2e).any()
 
     if not (have_bytes or have_pkbytes or have_e2e):
-        inv = (rx.groupby(["module","name"]).size().reset_index(name="rows")
-                 .sort_values("rows", ascending=False))
-        inv_path = os.path.splitext(args.out_summary)[0] + "_inventory.csv"
-        inv.to_csv(inv_path, index=False)
-        sys.exit(
-            f"[ERR] Not found any of [{key_bytes} | {key_pkbytes} | {key_e2e}] under host[{args.rx_host}]. "
-            f"Wrote inventory to {inv_path}. Open it to see what *is* available, or enable recording in omnetpp.ini."
-        )
+        report_missing(args, rx.groupby(["module","name"]).size().reset_index(name="rows")
+                                .sort_values("rows", ascending=False))
 
     rows = []
 
@@ -88,31 +212,49 @@ def main():
             res = fct_from_bytes_series(g["vectime"], g["vecvalue"], is_pkt_bytes=True)
             if res: rows.append({"module":mod, "name":name, **res})
 
-    # 3) fallback: endToEndDelay:vector（只用时间窗口，bytes_total 为 NaN）
-    if not rows and have_e2e:
+    # 3) fallback: endToEndDelay:vector（只用时间窗口，bytes_total 为 NaN），按接收端逐个回退
+    covered = {host_of(r["module"]) for r in rows}
+    if have_e2e:
         for (mod, name), g in rx[rx["name"].eq(key_e2e)].groupby(["module","name"], sort=False):
+            if host_of(mod) in covered:
+                continue
             res = fct_from_e2e_times(g["vectime"])
             if res: rows.append({"module":mod, "name":name, **res})
 
+    write_outputs(args, rows)
+
+def report_missing(args, inv):
+    inv_path = os.path.splitext(args.out_summary)[0] + "_inventory.csv"
+    inv.to_csv(inv_path, index=False)
+    sys.exit(
+        f"[ERR] Not found any of [{KEY_BYTES} | {KEY_PKBYTES} | {KEY_E2E}] under host[{'*' if args.rx_host is None else args.rx_host}]. "
+        f"Wrote inventory to {inv_path}. Open it to see what *is* available, or enable recording in omnetpp.ini."
+    )
+
+def write_outputs(args, rows):
     if not rows:
         sys.exit("[ERR] Could not derive any FCT from available vectors.")
 
     flows = pd.DataFrame(rows).sort_values("fct_s")
+    if args.rx_host is None:
+        flows.insert(0, "rx_host", flows["module"].map(host_of))
     os.makedirs(os.path.dirname(args.out_flows), exist_ok=True)
     flows.to_csv(args.out_flows, index=False)
 
     qs = [0.5, 0.95, 0.99]
-    pct = {f"P{int(q*100)}": flows["fct_s"].quantile(q) for q in qs}
-    summary = pd.DataFrame([{
-        "rx_host": args.rx_host,
-        "flows": len(flows),
-        **pct
-    }])
+    def pct_row(rx, fct):
+        return {"rx_host": rx, "flows": len(fct), **{f"P{int(q*100)}": fct.quantile(q) for q in qs}}
+    if args.rx_host is None:
+        # per receiver, then fabric-wide
+        summary = pd.DataFrame([pct_row(h, g["fct_s"]) for h, g in flows.groupby("rx_host")] +
+                               [pct_row("all", flows["fct_s"])])
+    else:
+        summary = pd.DataFrame([pct_row(args.rx_host, flows["fct_s"])])
     os.makedirs(os.path.dirname(args.out_summary), exist_ok=True)
     summary.to_csv(args.out_summary, index=False)
 
     print(f"[ok] wrote {args.out_flows} ({len(flows)} flows)")
-    print(f"[ok] wrote {args.out_summary}: {summary.to_dict(orient='records')[0]}")
+    print(f"[ok] wrote {args.out_summary}: {summary.to_dict(orient='records')[-1]}")
 
 if __name__ == "__main__":
     main()
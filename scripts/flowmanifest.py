@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Columnar flow manifest written next to every generated flows.inc.
+
+The traffic generators (traffic.py, traffic_incast.py, workload.py) write the
+flows a second time as raw columns, so analysis never has to parse the text:
+
+Layout of `<stem>.manifest/` (flows.inc -> flows.manifest/, <case>.inc -> <case>.manifest/):
+    meta.json    version, flow/host counts, digests, size of the flows.inc it belongs to
+    verified.json size/mtime of the flows.inc whose text was last checked against `body`
+    src.i32 dst.i32 app.i32 t_open.f64 t_send.f64 bytes.i64
+                 one row per flow; the row number is the flow id
+    offsets.i64  hosts + 1 entries: host h's flows are by_host[offsets[h]:offsets[h+1]]
+    by_host.i64  row numbers ordered by (src, app), so (h, a) -> by_host[offsets[h] + a]
+
+The flows.inc ends with a `# manifest <digest> <flows> <body>` trailer: the
+digest of the columns and the sha256 of the text above the trailer, hashed as it
+is written. A manifest is used only when the trailer matches its meta.json and
+the text still hashes to `body`. The text is hashed once per size/mtime of the
+flows.inc (verified.json), so later loads take milliseconds. An edited,
+regenerated or copied-over flows.inc falls back to parsing the text
+(fct_engine.load_send_map) instead of being joined to the wrong flows.
+
+Usage:
+    python scripts/flowmanifest.py results/flows/fixk_K30_L0.6_N8_sym_s1.inc     # check / summary
+    python scripts/flowmanifest.py sim/flows.inc --host 3
+    m = for_inc("work/fixk_K30_L0.6_N8_sym_s1/flows.inc")   # FlowManifest or None
+"""
+
+import os, sys, json, shutil, hashlib, argparse
+from collections.abc import Mapping
+import numpy as np
+
+MANIFEST_SUFFIX = ".manifest"
+MANIFEST_VERSION = 2
+COLUMNS = {"src": np.int32, "dst": np.int32, "app": np.int32,
+           "t_open": np.float64, "t_send": np.float64, "bytes": np.int64}
+TRAILER = "# manifest"
+
+
+def _file(col, dtype=None):
+    dt = np.dtype(dtype or COLUMNS[col])
+    return f"{col}.{dt.kind}{dt.itemsize * 8}"
+
+
+FILES = ["meta.json", "offsets.i64", "by_host.i64"] + [_file(c) for c in COLUMNS]
+
+
+def manifest_path_for(inc):
+    inc = os.path.abspath(str(inc))
+    if inc.endswith(MANIFEST_SUFFIX):
+        return inc
+    return os.path.splitext(inc)[0] + MANIFEST_SUFFIX
+
+
+def read_trailer(inc):
+    """(digest, flows, body digest, body length) of a flows.inc's manifest trailer, or None."""
+    try:
+        with open(inc, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(max(0, size - 256))
+            last = f.read().rstrip(b"\n").rsplit(b"\n", 1)[-1]
+    except OSError:
+        return None
+    tail = last.decode("ascii", "replace").split()
+    if len(tail) != 5 or " ".join(tail[:2]) != TRAILER or not tail[3].isdigit():
+        return None
+    return tail[2], int(tail[3]), tail[4], size - len(last) - 1
+
+
+def body_digest(inc, length):
+    h = hashlib.sha256()
+    with open(inc, "rb") as f:
+        while length > 0:
+            buf = f.read(min(length, 1 << 20))
+            if not buf:
+                break
+            h.update(buf)
+            length -= len(buf)
+    return h.hexdigest()[:16]
+
+
+class ManifestWriter:
+    """Collect flow batches for one flows.inc; trailer() goes last into the file, then close()."""
+
+    def __init__(self, inc, hosts=None):
+        self.inc = str(inc)
+        self.path = manifest_path_for(inc)
+        self.hosts = hosts
+        self.n = 0
+        self._sha = hashlib.sha256()
+        self._body = hashlib.sha256()
+        self._tmp = self.path + f".tmp{os.getpid()}"
+        shutil.rmtree(self._tmp, ignore_errors=True)
+        os.makedirs(self._tmp)
+        self._f = {c: open(os.path.join(self._tmp, _file(c)), "wb") for c in COLUMNS}
+
+    def add(self, src, dst, app, t_open, t_send, size):
+        """Append a batch; times are rounded as flows.inc prints them (%.3f)."""
+        cols = {"src": src, "dst": dst, "app": app, "t_open": np.round(np.asarray(t_open, dtype=np.float64), 3),
+                "t_send": np.round(np.asarray(t_send, dtype=np.float64), 3), "bytes": size}
+        for c, t in COLUMNS.items():
+            buf = np.ascontiguousarray(cols[c], dtype=t).tobytes()
+            self._f[c].write(buf)
+            self._sha.update(buf)
+        self.n += len(cols["src"])
+
+    def text(self, s):
+        """Hash flows.inc text on its way to the file; returns it unchanged."""
+        self._body.update(s.encode())
+        return s
+
+    def trailer(self):
+        return f"{TRAILER} {self._sha.hexdigest()[:16]} {self.n} {self._body.hexdigest()[:16]}"
+
+    def close(self):
+        """Build the (host, app) index and publish the manifest; call after flows.inc is closed."""
+        for f in self._f.values():
+            f.close()
+        src = _read(os.path.join(self._tmp, _file("src")), np.int32)
+        app = _read(os.path.join(self._tmp, _file("app")), np.int32)
+        hosts = max(self.hosts or 0, int(src.max()) + 1 if len(src) else 0)
+        order = np.argsort(src, kind="stable")
+        offsets = np.concatenate(([0], np.cumsum(np.bincount(src, minlength=hosts)))).astype(np.int64)
+        # stable sort keeps each host's flows in app order; the index relies on app == rank
+        rank = np.arange(len(src)) - np.repeat(offsets[:-1], np.diff(offsets))
+        if not np.array_equal(app[order], rank):
+            shutil.rmtree(self._tmp, ignore_errors=True)
+            raise ValueError(f"{self.inc}: app indices are not 0..numApps-1 per host in flow order")
+        offsets.tofile(os.path.join(self._tmp, "offsets.i64"))
+        order.astype(np.int64).tofile(os.path.join(self._tmp, "by_host.i64"))
+        with open(os.path.join(self._tmp, "meta.json"), "w") as f:
+            json.dump({"version": MANIFEST_VERSION, "flows": self.n, "hosts": hosts,
+                       "digest": self._sha.hexdigest()[:16], "body": self._body.hexdigest()[:16],
+                       "inc_size": os.path.getsize(self.inc),
+                       "columns": {c: np.dtype(t).str for c, t in COLUMNS.items()}}, f)
+        _stamp(self._tmp, self.inc)
+        shutil.rmtree(self.path, ignore_errors=True)
+        os.replace(self._tmp, self.path)
+        return self.path
+
+
+def _read(path, dtype):
+    # np.memmap refuses empty files
+    return np.memmap(path, dtype=dtype, mode="r") if os.path.getsize(path) else np.empty(0, dtype=dtype)
+
+
+class FlowManifest(Mapping):
+    """Memory-mapped manifest; as a Mapping it is {(host, app): sendBytes}, like parse_send_map."""
+
+    def __init__(self, path):
+        self.path = manifest_path_for(path)
+        with open(os.path.join(self.path, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.n, self.hosts, self.digest = self.meta["flows"], self.meta["hosts"], self.meta["digest"]
+        self._cols = {}
+        self.offsets = self._col("offsets", np.int64)
+        self.by_host = self._col("by_host", np.int64)
+
+    def _col(self, name, dtype=None):
+        if name not in self._cols:
+            dtype = dtype or COLUMNS[name]
+            self._cols[name] = _read(os.path.join(self.path, _file(name, dtype)), dtype)
+        return self._cols[name]
+
+    def __getattr__(self, name):
+        # m.src, m.bytes, ...: whole columns, mapped on first use
+        if name in COLUMNS:
+            return self._col(name)
+        raise AttributeError(name)
+
+    def rows(self, hosts, apps):
+        """Flow ids of (hosts[i], apps[i]); -1 where the app does not exist."""
+        h = np.asarray(hosts, dtype=np.int64)
+        a = np.asarray(apps, dtype=np.int64)
+        out = np.full(h.shape, -1, dtype=np.int64)
+        if not self.hosts:
+            return out
+        ok = (h >= 0) & (h < self.hosts) & (a >= 0)
+        hc = np.where(ok, h, 0)
+        ok &= a < self.offsets[hc + 1] - self.offsets[hc]
+        out[ok] = self.by_host[self.offsets[hc[ok]] + a[ok]]
+        return out
+
+    def send_bytes(self, hosts, apps):
+        """sendBytes of (hosts[i], apps[i]) as float64, NaN where unknown."""
+        r = self.rows(hosts, apps)
+        out = np.full(r.shape, np.nan)
+        out[r >= 0] = self._col("bytes")[r[r >= 0]]
+        return out
+
+    def row(self, host, app):
+        r = int(self.rows([host], [app])[0])
+        if r < 0:
+            raise KeyError((host, app))
+        return r
+
+    def __getitem__(self, key):
+        return int(self._col("bytes")[self.row(*key)])
+
+    def __contains__(self, key):
+        try:
+            return self.rows([key[0]], [key[1]])[0] >= 0
+        except (TypeError, IndexError, ValueError):
+            return False
+
+    def __iter__(self):
+        src, app = self._col("src"), self._col("app")
+        for r in self.by_host.tolist():
+            yield int(src[r]), int(app[r])
+
+    def __len__(self):
+        return self.n
+
+    def table(self):
+        """All flows as a DataFrame (flow id = index)."""
+        import pandas as pd
+        return pd.DataFrame({c: np.asarray(self._col(c)) for c in COLUMNS}).rename_axis("flow")
+
+
+def _inc_stamp(inc):
+    st = os.stat(inc)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _stamp(path, inc):
+    # best effort: a read-only manifest is just re-hashed next time
+    # (replaced, not rewritten: the file may be a hard link shared with other cases)
+    tmp = os.path.join(path, f"verified.json.tmp{os.getpid()}")
+    try:
+        with open(tmp, "w") as f:
+            json.dump(_inc_stamp(inc), f)
+        os.replace(tmp, os.path.join(path, "verified.json"))
+    except OSError:
+        pass
+
+
+def is_fresh(path, inc):
+    """True when the manifest at `path` belongs to this very flows.inc, text included."""
+    meta_path = os.path.join(path, "meta.json")
+    if not os.path.exists(meta_path):
+        return False
+    with open(meta_path) as f:
+        meta = json.load(f)
+    trailer = read_trailer(inc)
+    if meta.get("version") != MANIFEST_VERSION or trailer is None or \
+            trailer[:3] != (meta.get("digest"), meta.get("flows"), meta.get("body")) or \
+            meta.get("inc_size") != os.path.getsize(inc):
+        return False
+    try:
+        with open(os.path.join(path, "verified.json")) as f:
+            if json.load(f) == _inc_stamp(inc):
+                return True
+    except (OSError, ValueError):
+        pass
+    if body_digest(inc, trailer[3]) != meta["body"]:
+        return False
+    _stamp(path, inc)
+    return True
+
+
+def for_inc(inc):
+    """FlowManifest of a flows.inc when a matching one exists next to it, else None (warns if stale)."""
+    if not inc or not os.path.isfile(inc):
+        return None
+    path = manifest_path_for(inc)
+    if not os.path.isdir(path):
+        return None
+    if not is_fresh(path, inc):
+        print(f"[warn] {path} does not match {inc} (edited or regenerated since); ignoring it", file=sys.stderr)
+        return None
+    return FlowManifest(path)
+
+
+def link_inc(src, dst):
+    """Place flows.inc `src` and its manifest at `dst` (hard links, copies across file systems)."""
+    def _link(a, b):
+        if os.path.exists(b):
+            os.remove(b)
+        try:
+            os.link(a, b)
+        except OSError:
+            shutil.copyfile(a, b)
+    os.makedirs(os.path.dirname(os.path.abspath(dst)), exist_ok=True)
+    _link(src, dst)
+    msrc, mdst = manifest_path_for(src), manifest_path_for(dst)
+    shutil.rmtree(mdst, ignore_errors=True)
+    if os.path.isdir(msrc):
+        os.makedirs(mdst)
+        for f in os.listdir(msrc):
+            _link(os.path.join(msrc, f), os.path.join(mdst, f))
+    return dst
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Check a flows.inc against its flow manifest and summarize it")
+    ap.add_argument("inc", help="flows.inc (or its .manifest directory)")
+    ap.add_argument("--host", type=int, help="List the flows sent by this host")
+    args = ap.parse_args(argv)
+
+    if args.inc.endswith(MANIFEST_SUFFIX):
+        m = FlowManifest(args.inc)
+    else:
+        if not os.path.isfile(args.inc):
+            sys.exit(f"[ERR] not found: {args.inc}")
+        m = for_inc(args.inc)
+        if m is None:
+            sys.exit(f"[ERR] no matching manifest for {args.inc} (regenerate it with the traffic scripts)")
+    if args.host is not None:
+        df = m.table()
+        print(df[df["src"] == args.host].to_string())
+        return 0
+    print(f"[ok] {m.path}: {m.n} flows from {m.hosts} hosts, {int(np.sum(m.bytes)) / 1e6:.1f} MB, digest {m.digest}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
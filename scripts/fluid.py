@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Fluid-model pre-screener for the Fixed-K grid (no OMNeT++ needed).
+
+Models the two-tier leaf-spine fabric of the port map (scripts/topo.py, default
+SmallLeafSpine: 4 leaves x 3 hosts, 2 spines), 10Gbps links, 2us per hop, and
+optionally the 5Gbps asym uplink (leaf[2]->spine[0]).
+Flows to the same receiver share its ToR downlink (processor sharing).
+A cross-leaf flow is pinned to one spine, standing in for the ECMP hash: the
+cross-leaf flows of each (case, source leaf) take the spines round-robin in
+start order. Sender NICs, then the leaf->spine uplink and the spine->leaf
+downlink of that path, scale rates proportionally when they are
+oversubscribed, so a flow hashed onto the asym uplink is held to 5Gbps. The downlink queue of a receiver with n backlogged flows
+follows the DCTCP fluid-model sawtooth (Alizadeh et al.) with a hard marking
+threshold K, like RedDropperQueue with minth=maxth=K and wq=0:
+    S_max = B + K + n      aggregate window peak (B = C * base RTT, packets)
+    A = sqrt(2n(B+K))/2    window drop per marking episode; --cc ecn: A = S_max/2 (halve)
+The window sweeps [S_max - A, S_max] linearly. Queue = max(S - B, 0) and
+throughput = min(S, B)/RTT. That gives the link utilization, the mean/peak
+queue, and the fraction of time above K for every (case, receiver) and flow
+count. Small K costs throughput; large K costs queueing delay, which is
+added to each flow's completion.
+
+All grid cases (K x L x N x scenario x seed) advance together, event by event:
+each iteration moves every case to its own next arrival or completion, over flat
+NumPy arrays of all flows. The loop count is about twice the flows of one case,
+not a function of simulated time. Flows come from the same flows.inc the generators
+write (traffic_incast.py per (N, L, seed) by default, or --flows for a fixed file).
+
+Outputs:
+- fluid_cases.csv: per case, predicted FCT P50/P95/P99 and the busiest queue's mean/peak/time above K;
+- fluid_rank.csv: per (L, N, scenario), K ranked by median predicted P99 over seeds; the
+  shortlist column marks the best --keep values plus any within --margin of the best;
+- fluid_compare.csv (--compare): predictions next to finished runs from the catalog,
+  with per-slice Spearman rank correlation of P99;
+- --traj FILE.npz: per-event times and queue occupancy of every (case, receiver).
+
+Usage:
+    python scripts/fluid.py --Ks "10 30 60 120" --Ls "0.3 0.6 0.8" --Ns "8 16" --Seeds "1 2 3"
+    python scripts/fluid.py --compare results/catalog.sqlite
+    python scripts/grid.py --cases results/fluid_rank.csv ...     # simulate the shortlist only
+"""
+
+import os, re, sys, time, argparse, tempfile
+import numpy as np
+import pandas as pd
+from traffic_incast import write_incast
+import topo
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+RES_DIR = os.path.join(ROOT_DIR, "results")
+
+LINK_BPS = 10e9
+ASYM_BPS = 5e9            # asym uplink of the port map (leaf[2].ppp[0] -> spine[0]) in the asym scenario
+# fabric shape from the port map; a non-leaf-spine map falls back to SmallLeafSpine
+_TOPO = topo.load()
+_P = _TOPO.d["params"] if _TOPO.d["kind"] == "leafspine" else {}
+LEAVES, SPINES, HOSTS_PER_LEAF = _P.get("leaves", 4), _P.get("spines", 2), _P.get("hosts_per_leaf", 3)
+ASYM_LEAF = int(_TOPO.d["asym"][0][5:-1]) if _P else 2
+ASYM_SPINE = int(_TOPO.d["asym"][1]) if _P else 0     # uplink ppp[s] faces spine[s]
+MSS = 1460
+HOP_DELAY = 2e-6
+BASE_RTT = 2 * 4 * HOP_DELAY + 4 * MSS * 8 / LINK_BPS   # 4 hops each way + serialization
+QS = (50, 95, 99)
+
+APP_RE = re.compile(r"host\[(\d+)\]\.app\[(\d+)\]\.(connectAddress|tSend|sendBytes)\s*=\s*\"?(?:host\[)?([\d.]+)")
+
+
+def parse_flows(path):
+    """(src, dst, t_send, bytes) arrays for every app in a flows.inc (full or compact)."""
+    apps = {}
+    with open(path) as f:
+        for line in f:
+            m = APP_RE.search(line)
+            if m:
+                apps.setdefault((int(m.group(1)), int(m.group(2))), {})[m.group(3)] = m.group(4)
+    rows = [(h, int(a["connectAddress"]), float(a["tSend"]), int(a["sendBytes"]))
+            for (h, _), a in apps.items() if {"connectAddress", "tSend", "sendBytes"} <= set(a)]
+    if not rows:
+        return tuple(np.empty(0) for _ in range(4))
+    src, dst, t, size = map(np.array, zip(*rows))
+    return src.astype(np.int64), dst.astype(np.int64), t.astype(np.float64), size.astype(np.float64)
+
+
+def incast_flows(N, L, seed, cache):
+    """Flows of traffic_incast.py N L seed (generated once per triple into a temp dir)."""
+    key = (N, L, seed)
+    if key not in cache:
+        path = os.path.join(cache["_dir"], f"flows_N{N}_L{L}_s{seed}.inc")
+        write_incast(int(N), float(L), int(seed), path)
+        cache[key] = parse_flows(path)
+    return cache[key]
+
+
+def sawtooth(n, K, B, cc="dctcp"):
+    """(utilization, mean queue, peak queue, fraction of time above K) for n backlogged flows.
+
+    Arrays broadcast; n == 0 gives an idle link (utilization 0, empty queue).
+    """
+    n = np.asarray(n, dtype=np.float64)
+    s_max = B + K + n
+    A = s_max / 2.0 if cc == "ecn" else 0.5 * np.sqrt(2.0 * n * (B + K))
+    A = np.maximum(A, 1e-9)
+    s_min = s_max - A
+    # S uniform on [s_min, s_max]: E[min(S, B)] and E[max(S - B, 0)]
+    lo = np.clip(s_min, None, B)
+    below = np.clip((B - s_min) / A, 0.0, 1.0)
+    thr = np.where(s_min >= B, B, (below * (B + lo) / 2.0 * A + (s_max - np.maximum(B, s_min)) * B) / A)
+    hi = np.maximum(s_min, B)
+    q_mean = (s_max - hi) / A * ((s_max + hi) / 2.0 - B)
+    frac_k = np.clip(n / A, 0.0, 1.0)
+    busy = n > 0
+    return (np.where(busy, thr / B, 0.0), np.where(busy, q_mean, 0.0),
+            np.where(busy, s_max - B, 0.0), np.where(busy, frac_k, 0.0))
+
+
+def simulate(cases, flows, hosts_per_leaf=HOSTS_PER_LEAF, cc="dctcp", traj=False):
+    """Advance all cases together, one event (arrival or completion) per case per iteration.
+
+    cases: list of dicts with K (packets) and scenario; flows: per-case (src, dst, t, bytes).
+    Returns (fct per case [arrays, s], queue stats DataFrame, iterations, trajectory or None).
+    """
+    nc = len(cases)
+    hosts = LEAVES * hosts_per_leaf
+    C = LINK_BPS / 8.0 / MSS                     # packets/s
+    B = C * BASE_RTT
+    lens = np.array([len(f[0]) for f in flows], dtype=np.int64)
+    cid = np.repeat(np.arange(nc), lens)
+    src = np.concatenate([f[0] for f in flows]).astype(np.int64)
+    dst = np.concatenate([f[1] for f in flows]).astype(np.int64)
+    t0 = np.concatenate([f[2] for f in flows]).astype(np.float64)
+    rem = np.concatenate([f[3] for f in flows]).astype(np.float64) / MSS
+    # sorted by (case, start) so one searchsorted finds every case's next arrival
+    order = np.lexsort((t0, cid))
+    cid, src, dst, t0, rem = cid[order], src[order], dst[order], t0[order], rem[order]
+    nflows = len(t0)
+    off = np.concatenate(([0], np.cumsum(lens)))
+    shift = (t0.max() - t0.min() + 1.0) if nflows else 1.0
+    tkey = t0 + cid * shift
+    fct = np.full(nflows, np.nan)
+    done = np.zeros(nflows, dtype=bool)
+
+    K = np.array([c["K"] for c in cases], dtype=np.float64)
+    k_q = np.repeat(K, hosts)
+    up_cap = np.full((nc, LEAVES, SPINES), C)
+    up_cap[np.array([c["scenario"] == "asym" for c in cases]), ASYM_LEAF, ASYM_SPINE] = ASYM_BPS / 8.0 / MSS
+    up_cap = up_cap.ravel()
+    qi = cid * hosts + dst
+    si = cid * hosts + src
+    leaf_s, leaf_d = src // hosts_per_leaf, dst // hosts_per_leaf
+    cross = leaf_s != leaf_d
+    # ECMP stand-in: round-robin over the spines per (case, source leaf), in start order
+    grp = np.where(cross, cid * LEAVES + leaf_s, -1)
+    by_grp = np.argsort(grp, kind="stable")
+    spine = np.empty(nflows, dtype=np.int64)
+    spine[by_grp] = (np.arange(nflows) - np.searchsorted(grp[by_grp], grp[by_grp])) % SPINES
+    ui = (cid * LEAVES + leaf_s) * SPINES + spine     # leaf -> spine uplink
+    di = (cid * LEAVES + leaf_d) * SPINES + spine     # spine -> leaf downlink
+
+    pos = np.arange(nflows)
+    ptr = off[:-1].copy()                           # first flow of each case not yet arrived
+    t = np.array([t0[off[c]] if lens[c] else np.inf for c in range(nc)])
+    q_int = np.zeros(nc * hosts)
+    above = np.zeros(nc * hosts)
+    q_peak = np.zeros(nc * hosts)
+    span = np.zeros(nc)
+    ts, qs = [], []
+    iters = 0
+    while True:
+        act = ~done & (pos < ptr[cid])
+        head = np.minimum(ptr, nflows - 1)
+        nxt = np.where(ptr < off[1:], t0[head], np.inf)   # exact start times
+
+        n = np.bincount(qi[act], minlength=nc * hosts)
+        util, q_mean, peak, frac_k = sawtooth(n, k_q, B, cc)
+        rate = np.zeros(nflows)
+        rate[act] = (C * util / np.maximum(n, 1))[qi[act]]
+        load = np.bincount(si, weights=rate, minlength=nc * hosts)
+        rate *= np.minimum(1.0, C / np.maximum(load[si], 1e-12))
+        upl = np.bincount(ui, weights=rate * cross, minlength=nc * LEAVES * SPINES)
+        rate = np.where(cross, rate * np.minimum(1.0, up_cap[ui] / np.maximum(upl[ui], 1e-12)), rate)
+        dnl = np.bincount(di, weights=rate * cross, minlength=nc * LEAVES * SPINES)
+        rate = np.where(cross, rate * np.minimum(1.0, C / np.maximum(dnl[di], 1e-12)), rate)
+
+        ttf = np.where(act, rem / np.maximum(rate, 1e-12), np.inf)
+        t_fin = np.full(nc, np.inf)
+        np.minimum.at(t_fin, cid[act], ttf[act])
+        # cases without arrivals left have nxt = t = inf
+        gap = np.where(np.isfinite(nxt), nxt - t, np.inf)
+        arrive = np.isfinite(gap) & (gap <= t_fin)
+        dt = np.maximum(np.minimum(gap, t_fin), 0.0)
+        live = np.isfinite(dt)
+        if not live.any():
+            break
+        dt = np.where(live, dt, 0.0)
+        dq = np.repeat(dt, hosts)
+        q_int += q_mean * dq
+        above += frac_k * dq
+        np.maximum(q_peak, peak, out=q_peak)
+        span += dt
+        if traj:
+            ts.append(t.copy()); qs.append(q_mean.reshape(nc, hosts).copy())
+
+        fin = act & (ttf <= dt[cid] * (1.0 + 1e-9))
+        rem[act] -= rate[act] * dt[cid[act]]
+        rem[fin] = 0.0
+        t = np.where(arrive, nxt, t + dt)
+        # arrivals: step past every flow of the case starting at exactly this time
+        ptr = np.where(arrive, np.searchsorted(tkey, tkey[head], side="right"), ptr)
+        # completion: last byte leaves the queue behind the standing occupancy
+        fct[fin] = t[cid[fin]] - t0[fin] + q_mean[qi[fin]] / C + BASE_RTT / 2.0
+        done |= fin
+        iters += 1
+
+    out = np.empty(nflows)
+    out[order] = fct
+    per_case = np.split(out, np.cumsum(lens)[:-1])
+    busiest = q_int.reshape(nc, hosts).argmax(axis=1)
+    sel = np.arange(nc) * hosts + busiest
+    span = np.maximum(span, 1e-12)
+    qstats = pd.DataFrame({"q_host": busiest, "q_mean_pk": q_int[sel] / span, "q_peak_pk": q_peak[sel],
+                           "frac_above_k": above[sel] / span})
+    trajectory = {"t": np.array(ts), "q": np.array(qs)} if traj else None
+    return per_case, qstats, iters, trajectory
+
+
+def predict(cases, flows, **kw):
+    """Per-case prediction table (FCT percentiles in ms, queue stats)."""
+    fcts, qstats, steps, trajectory = simulate(cases, flows, **kw)
+    rows = []
+    for c, f in zip(cases, fcts):
+        f = f[~np.isnan(f)] * 1000.0
+        pct = np.percentile(f, QS) if len(f) else [np.nan] * len(QS)
+        rows.append({**c, "flows": len(f), **{f"p{q}_ms": v for q, v in zip(QS, pct)}})
+    return pd.concat([pd.DataFrame(rows), qstats], axis=1), steps, trajectory
+
+
+def rank(pred, keep=1, margin=0.02):
+    """K ranked per (L, N, scenario) by median predicted P99 over seeds, with the shortlist flag."""
+    agg = pred.groupby(["L", "N", "scenario", "K"], as_index=False)["p99_ms"].median()
+    agg["rank"] = agg.groupby(["L", "N", "scenario"])["p99_ms"].rank(method="first").astype(int)
+    best = agg.groupby(["L", "N", "scenario"])["p99_ms"].transform("min")
+    agg["shortlist"] = (agg["rank"] <= keep) | (agg["p99_ms"] <= best * (1.0 + margin))
+    return agg.sort_values(["L", "N", "scenario", "rank"]).reset_index(drop=True)
+
+
+def compare(pred, db_path):
+    """Predicted vs simulated median P99 per (K, L, N, scenario), plus per-slice Spearman rho."""
+    import catalog
+    conn = catalog.connect(db_path)
+    sim = pd.DataFrame(conn.execute(
+        "SELECT K, L, N, scenario, median(p99_ms), COUNT(*) FROM runs "
+        "WHERE status = 'done' AND p99_ms IS NOT NULL GROUP BY K, L, N, scenario").fetchall(),
+        columns=["K", "L", "N", "scenario", "sim_p99_ms", "runs"])
+    model = pred.groupby(["K", "L", "N", "scenario"], as_index=False)["p99_ms"].median()
+    model = model.rename(columns={"p99_ms": "pred_p99_ms"})
+    model["L"] = model["L"].astype(float)
+    both = model.merge(sim, on=["K", "L", "N", "scenario"], how="inner")
+    both["ratio"] = both["pred_p99_ms"] / both["sim_p99_ms"]
+    rho = pd.DataFrame([{"L": L, "N": N, "scenario": scen,
+                         "spearman_p99": g["pred_p99_ms"].rank().corr(g["sim_p99_ms"].rank()) if len(g) > 1 else np.nan}
+                        for (L, N, scen), g in both.groupby(["L", "N", "scenario"])],
+                       columns=["L", "N", "scenario", "spearman_p99"])
+    return both.merge(rho, on=["L", "N", "scenario"], how="left")
+
+
+if __name__ == "__main__":
+    from grid import DEFAULT_AXES, split_axis, build_cases
+    ap = argparse.ArgumentParser(description="Fluid-model pre-screen of the K x L x N x scenario grid")
+    for axis, default in DEFAULT_AXES.items():
+        ap.add_argument(f"--{axis}", default=default, help=f"space/comma separated (default: {default})")
+    ap.add_argument("--flows", help="Use this flows.inc for every case instead of traffic_incast.py per (N, L, seed)")
+    ap.add_argument("--cc", choices=["dctcp", "ecn"], default="dctcp", help="Window response to marks (default dctcp)")
+    ap.add_argument("--traj", metavar="NPZ", help="Save per-event queue trajectories (t: iters x cases, q: iters x cases x hosts)")
+    ap.add_argument("--keep", type=int, default=1, help="Shortlist the best N values of K per slice")
+    ap.add_argument("--margin", type=float, default=0.02, help="...plus any K within this fraction of the best P99")
+    ap.add_argument("--compare", metavar="CATALOG", help="Compare with finished runs in this catalog")
+    ap.add_argument("--out-dir", default=RES_DIR)
+    args = ap.parse_args()
+
+    axes = {a: split_axis(getattr(args, a)) for a in DEFAULT_AXES}
+    cases = build_cases(axes)
+    if not args.flows:
+        # traffic_incast.py draws N distinct senders besides host[0]
+        too_big = sorted({c["N"] for c in cases if c["N"] > LEAVES * HOSTS_PER_LEAF - 1})
+        if too_big:
+            print(f"[warn] skipping N={too_big}: only {LEAVES * HOSTS_PER_LEAF - 1} incast senders", file=sys.stderr)
+            cases = [c for c in cases if c["N"] not in too_big]
+    if not cases:
+        sys.exit("[ERR] no cases to screen")
+    t_start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = {"_dir": tmp}
+        fixed = parse_flows(args.flows) if args.flows else None
+        flows = [fixed if fixed is not None else incast_flows(c["N"], c["L"], c["seed"], cache) for c in cases]
+    pred, steps, trajectory = predict(cases, flows, cc=args.cc, traj=bool(args.traj))
+    ranked = rank(pred, args.keep, args.margin)
+    os.makedirs(args.out_dir, exist_ok=True)
+    pred.to_csv(os.path.join(args.out_dir, "fluid_cases.csv"), index=False)
+    ranked.to_csv(os.path.join(args.out_dir, "fluid_rank.csv"), index=False)
+    if args.traj:
+        np.savez_compressed(args.traj, **trajectory)
+    print(f"[ok] {len(cases)} cases, {sum(len(f[0]) for f in flows)} flows, {steps} event steps "
+          f"in {time.perf_counter() - t_start:.1f}s -> {args.out_dir}/fluid_cases.csv, fluid_rank.csv")
+    print(ranked[ranked["shortlist"]].to_string(index=False))
+    if args.compare:
+        cmp_df = compare(pred, args.compare)
+        cmp_df.to_csv(os.path.join(args.out_dir, "fluid_compare.csv"), index=False)
+        print(f"[ok] {len(cmp_df)} groups with finished runs -> {args.out_dir}/fluid_compare.csv")
+        if len(cmp_df):
+            print(cmp_df.to_string(index=False))
@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+Parallel grid runner for Fixed-K ECN experiments (Python counterpart of run_grid.sh).
+
+Axes: K x Load L x N x seed x scenario, same defaults and env overrides as
+run_grid.sh (Ks, Ls, Ns, Seeds, Scenarios; OMNETPP_BIN, SCAVE_BIN, INET_NED,
+INET_LIB, OPP_LIBS).
+
+Every case gets a private work directory work/<case>/ holding its own copy of
+omnetpp.ini, its flows.inc (picked up by `include flows.inc`; a link to the
+(N, L, seed) workload written once for the whole grid in work/workloads/), the
+override set and the raw results, so cases never share inputs and can run
+concurrently. Cases run through a bounded process pool; work/manifest.json
+records per-case status so an interrupted grid resumes where it stopped.
+
+Simulation outputs (raw .vec/.vci/.sca and exported CSVs) and sanity figures
+go through the content-addressed cache in scripts/resultcache.py: a case whose
+effective inputs were seen before is restored instead of simulated.
+
+Each stage appends its wall/CPU time, peak RSS and input/output sizes to
+work/<case>/stages.jsonl (scripts/stagelog.py; `stagelog.py report` ranks them).
+
+Finished cases are upserted into the SQLite run catalog (scripts/catalog.py)
+with their artifact paths, FCT percentiles, queue statistics and drop/mark counts.
+
+The network comes from a port map (--topo, scripts/topo.py; default SmallLeafSpine).
+It sets the host count for the traffic, the receiver's recording scope, the asym
+uplink, the ToR->RX queue that is plotted and cataloged, and `--network` when it
+differs from the ini.
+
+Usage:
+    python scripts/grid.py --Ks "10 30 60" --Ls 0.6 --Ns 8 --Scenarios "sym asym" --Seeds 1 -j 8
+    python scripts/grid.py --cases results/fluid_rank.csv --Seeds "1 2 3"   # fluid.py shortlist only
+    python scripts/grid.py --topo sim/dcn/FatTreeK8.ports.json --Ns "8 64" ...
+    OMNETPP_BIN=/path/to/stub_opp_run SCAVE_BIN=/path/to/stub_scavetool python scripts/grid.py ...
+"""
+
+import os, re, sys, json, shutil, argparse, itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from resultcache import ResultCache, CACHE_DIR, DEFAULT_MAX_GB, case_key, digest, sha256_file
+import catalog, pipeline, queue_stats, scalars, stagelog, topo
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SIM_DIR = os.path.join(ROOT_DIR, "sim")
+RES_DIR = os.path.join(ROOT_DIR, "results")
+FIG_DIR = os.path.join(ROOT_DIR, "figs")
+WORK_DIR = os.path.join(ROOT_DIR, "work")
+SCRIPTS = os.path.join(ROOT_DIR, "scripts")
+# code behind the cached sanity plot: drawing, downsampling and vector loading
+PLOT_CODE = ("plot_sanity.py", "downsample.py", "vecstore.py", "vecfile.py")
+
+# Axes defaults (overridable via environment, like run_grid.sh)
+DEFAULT_AXES = {
+    "Ks": os.environ.get("Ks", "10 30 60"),
+    "Ls": os.environ.get("Ls", "0.3 0.6 0.8"),
+    "Ns": os.environ.get("Ns", "8 16"),
+    "Seeds": os.environ.get("Seeds", "1 2 3 4 5"),
+    "Scenarios": os.environ.get("Scenarios", "sym asym"),
+}
+
+
+def split_axis(s):
+    return [x for x in s.replace(",", " ").split() if x]
+
+
+def case_name(c):
+    return f"fixk_K{c['K']}_L{c['L']}_N{c['N']}_{c['scenario']}_s{c['seed']}"
+
+
+def build_cases(axes):
+    cases = []
+    # same nesting order as run_grid.sh
+    for K, L, N, seed, scen in itertools.product(axes["Ks"], axes["Ls"], axes["Ns"], axes["Seeds"], axes["Scenarios"]):
+        cases.append({"K": int(K), "L": L, "N": int(N), "seed": int(seed), "scenario": scen})
+    return cases
+
+
+def fit_cases(cases, hosts):
+    """Cases whose N fits the network (1..hosts-1 senders besides host[0]); others dropped with a warning."""
+    for N in sorted({c["N"] for c in cases if not 0 < c["N"] < hosts}):
+        print(f"[warn] N={N} needs 1..{hosts - 1} senders on this {hosts}-host network; its cases are skipped",
+              file=sys.stderr)
+    return [c for c in cases if 0 < c["N"] < hosts]
+
+
+def cases_from_csv(path, seeds, scenarios):
+    """Cases for the (K, L, N[, scenario]) rows of a CSV such as scripts/fluid.py's fluid_rank.csv.
+
+    Only rows with a true `shortlist` column are kept when it exists; each row runs every seed.
+    """
+    import csv
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    if rows and not {"K", "L", "N"} <= set(rows[0]):
+        sys.exit(f"[ERR] {path}: needs K, L and N columns")
+    if rows and "shortlist" in rows[0]:
+        rows = [r for r in rows if r["shortlist"].strip().lower() in ("true", "1")]
+    cases, seen = [], set()
+    for r in rows:
+        for scen in ([r["scenario"]] if r.get("scenario") else scenarios):
+            for seed in seeds:
+                c = {"K": int(float(r["K"])), "L": r["L"], "N": int(float(r["N"])), "seed": int(seed), "scenario": scen}
+                if case_name(c) not in seen:
+                    seen.add(case_name(c))
+                    cases.append(c)
+    return cases
+
+
+def ini_configs(ini_path):
+    with open(ini_path) as f:
+        return set(re.findall(r"^\[Config\s+([^\]\s]+)\]", f.read(), re.M))
+
+
+def ini_network(ini_path):
+    with open(ini_path) as f:
+        m = re.search(r"^network\s*=\s*(\S+)", f.read(), re.M)
+    return m.group(1) if m else None
+
+
+def k_overrides(K):
+    # Fixed-K as runtime overrides (RedDropperQueue minth = maxth = K) for K without a kXX section
+    return [f"--**.{ifc}[*].queue.{p}={K}" for ifc in ("ppp", "eth") for p in ("minth", "maxth")]
+
+
+def base_config(c, configs=None):
+    # Pick base config by N and K: incast8/incast16 combined with kXX
+    name = f"incast{c['N']}_k{c['K']}"
+    if configs is None or name in configs:
+        return name
+    # any incast{N}_kXX section carries the ECN/RED settings; K then comes from k_overrides()
+    alt = sorted(x for x in configs if x.startswith(f"incast{c['N']}_k"))
+    return alt[0] if alt else name
+
+
+def case_overrides(c, result_dir, configs=None, pm=None, network=None):
+    # Additional runtime overrides: recording on, result dir, optional channel datarate throttle
+    pm = pm or topo.load()
+    overrides = [
+        "--**.scalar-recording=true",
+        "--**.vector-recording=true",
+        *pm.rx_recording(0),
+        f"--result-dir={result_dir}",
+    ]
+    if network and network != pm.qualified:
+        overrides.append(f"--network={pm.qualified}")
+    if c["scenario"] == "asym":
+        # one deterministic link to throttle: the map's asym uplink (leaf[2].ppp[0] -> 5Gbps)
+        overrides.append(f"--{pm.asym_line()}")
+    if base_config(c, configs) != base_config(c):
+        overrides += k_overrides(c["K"])
+    return overrides
+
+
+def resolve_env():
+    """Executables and NED/lib flags, resolved the same way as run_grid.sh."""
+    opp_run = os.environ.get("OMNETPP_BIN") or shutil.which("opp_run") or ""
+    scave = os.environ.get("SCAVE_BIN") or shutil.which("opp_scavetool") or ""
+    # *_BIN may point at the bin directory (README) or at the executable (run_grid.sh)
+    if os.path.isdir(opp_run):
+        opp_run = os.path.join(opp_run, "opp_run")
+    if os.path.isdir(scave):
+        scave = os.path.join(scave, "opp_scavetool")
+    ned_path = SIM_DIR
+    inet_ned = os.environ.get("INET_NED")
+    if inet_ned:
+        ned_path = f"{SIM_DIR}:{inet_ned}"
+    libs = os.environ.get("OPP_LIBS", "").split()
+    if not libs and inet_ned:
+        inet_lib_default = os.path.join(inet_ned[:-4] if inet_ned.endswith("/src") else inet_ned,
+                                        "out", "clang-release", "src", "libINET.dylib")
+        if os.environ.get("INET_LIB"):
+            libs = ["-l", os.environ["INET_LIB"]]
+        elif os.path.isfile(inet_lib_default):
+            libs = ["-l", inet_lib_default]
+        else:
+            libs = ["-l", "INET"]
+    return {"opp_run": opp_run, "scavetool": scave, "ned_path": ned_path, "libs": libs}
+
+
+def _stage(rec, stage, cmd, log_path, cwd=None, inputs=(), outputs=(), events=False):
+    """Run one stage command; rc goes to rec["stages"], its cost to <work>/stages.jsonl."""
+    rc, usage = stagelog.timed_run(cmd, log_path, cwd)
+    extra = stagelog.EventScan().feed_file(log_path).result(usage["wall_s"]) if events else {}
+    stagelog.record(os.path.join(rec["work"], "stages.jsonl"), rec["case"], stage, rc, usage, inputs, outputs, **extra)
+    rec["stages"][stage] = rc
+    return rc
+
+
+def _call(rec, stage, fn, *args, log_path=None, inputs=(), outputs=()):
+    """In-process counterpart of _stage (pipeline.run_step): same log file, rc and stages.jsonl record."""
+    rc, _ = pipeline.run_step(stage, fn, *args, case=rec["case"], jsonl=os.path.join(rec["work"], "stages.jsonl"),
+                              log_path=log_path, inputs=inputs, outputs=outputs)
+    rec["stages"][stage] = rc
+    return rc
+
+
+def run_case(c, env, work_root, plot=True, cache=None, verify=False, topo_path=None, workload=None):
+    """Run one case end to end inside work_root/<case>; returns a manifest record."""
+    from vecstore import store_path_for
+    pm = topo.load(topo_path)
+    name = case_name(c)
+    work = os.path.join(work_root, name)
+    os.makedirs(work, exist_ok=True)
+    result_dir = os.path.join(work, "results")
+    rec = {"case": name, "params": c, "work": work, "stages": {}}
+
+    # private inputs: ini copy + this case's flows.inc + override set
+    shutil.copyfile(os.path.join(SIM_DIR, "omnetpp.ini"), os.path.join(work, "omnetpp.ini"))
+    flows = os.path.join(work, "flows.inc")
+    rc = _call(rec, "traffic", pipeline.traffic_step, c, flows, pm.hosts, workload, log_path=os.path.join(work, "traffic.log"),
+               outputs=[flows])
+    if rc != 0:
+        rec["status"] = "failed"
+        return rec
+    configs = ini_configs(os.path.join(work, "omnetpp.ini"))
+    config = base_config(c, configs)
+    overrides = case_overrides(c, result_dir, configs, pm, ini_network(os.path.join(work, "omnetpp.ini")))
+    with open(os.path.join(work, "overrides.txt"), "w") as f:
+        f.write("\n".join(overrides) + "\n")
+
+    vec_csv = os.path.join(RES_DIR, f"{name}_vectors.csv")
+    sca_csv = os.path.join(RES_DIR, f"{name}_scalars.csv")
+    outputs = {
+        "omnetpp.vec": os.path.join(result_dir, "omnetpp.vec"),
+        "omnetpp.vci": os.path.join(result_dir, "omnetpp.vci"),
+        "omnetpp.sca": os.path.join(result_dir, "omnetpp.sca"),
+        "vectors.csv": vec_csv,
+        "scalars.csv": sca_csv,
+    }
+    key = None
+    if cache is not None:
+        key = case_key(os.path.join(work, "omnetpp.ini"), config, flows, overrides,
+                       {"script": "traffic_incast.py", "args": [c["N"], c["L"], c["seed"]]}, SIM_DIR)
+        rec["cache_key"] = key
+    with stagelog.Timer() as tm:
+        rec["cached"] = key is not None and cache.get(key, outputs, required=["omnetpp.vec", "omnetpp.sca"], verify=verify)
+    if rec["cached"]:
+        stagelog.record(os.path.join(work, "stages.jsonl"), name, "cache_restore", 0, tm.usage, outputs=outputs.values())
+
+    if not rec["cached"]:
+        cmd = [env["opp_run"], "-u", "Cmdenv", "-n", env["ned_path"], *env["libs"],
+               "-f", "omnetpp.ini", "-c", config, *overrides]
+        rc = _stage(rec, "opp_run", cmd, os.path.join(work, "opp_run.log"), cwd=work,
+                    inputs=[os.path.join(work, "omnetpp.ini"), flows],
+                    outputs=[outputs["omnetpp.vec"], outputs["omnetpp.vci"], outputs["omnetpp.sca"]], events=True)
+        if rc != 0:
+            rec["status"] = "failed"
+            return rec
+
+        # Export (failures tolerated, as in run_grid.sh)
+        _stage(rec, "export_vec", [env["scavetool"], "x", outputs["omnetpp.vec"], "-o", vec_csv],
+               os.path.join(work, "export_vec.log"), inputs=[outputs["omnetpp.vec"]], outputs=[vec_csv])
+        _stage(rec, "export_sca", [env["scavetool"], "x", outputs["omnetpp.sca"], "-o", sca_csv],
+               os.path.join(work, "export_sca.log"), inputs=[outputs["omnetpp.sca"]], outputs=[sca_csv])
+        if key is not None:
+            cache.put(key, outputs, info={"case": name, "params": c})
+    if os.path.exists(vec_csv):
+        store = store_path_for(vec_csv)
+        _call(rec, "vecstore", pipeline.vecstore_step, vec_csv, log_path=os.path.join(work, "vecstore.log"),
+              inputs=[vec_csv], outputs=[os.path.join(store, f) for f in ("time.f64", "value.f64", "index.json")])
+        # per-queue occupancy table for every leaf/spine port (K from the case name)
+        _call(rec, "queues", pipeline.queues_step, vec_csv, log_path=os.path.join(work, "queues.log"),
+              inputs=[vec_csv], outputs=[os.path.join(RES_DIR, f"{name}_queues.csv")])
+    if os.path.exists(vec_csv):
+        # per-run metrics for the catalog, computed in the worker; the parent does the write
+        with stagelog.Timer() as tm:
+            try:
+                rec["metrics"] = catalog.run_metrics(vec_csv, flows, pm.rx_queue(0))
+                rec["metrics"].update(scalars.scalar_metrics(outputs["omnetpp.sca"]))
+            except Exception as e:
+                rec["stages"]["metrics"] = repr(e)
+        stagelog.record(os.path.join(work, "stages.jsonl"), name, "metrics", 0 if "metrics" in rec else 1, tm.usage,
+                        inputs=[vec_csv, flows])
+    rec["paths"] = {"flows_inc": os.path.abspath(flows), "vec_path": outputs["omnetpp.vec"], "vectors_csv": vec_csv, "scalars_csv": sca_csv,
+                    "vstore": store_path_for(vec_csv), "figure": None}
+    if plot and os.path.exists(vec_csv):
+        # Quick queue sanity plot (ToR->RX); cached on sim key + plotting code + plot args
+        png = os.path.join(FIG_DIR, f"{name}_queue.png")
+        plot_args = ["--module", pm.rx_queue(0), "--name", "queueBitLength",
+                     "--y_unit", "KB", "--k", str(c["K"]), "--k_unit", "packets", "--mss", str(queue_stats.MSS)]
+        pkey = digest({"case": key, "plot": [sha256_file(os.path.join(SCRIPTS, f)) for f in PLOT_CODE],
+                       "args": plot_args}) if key else None
+        if pkey and cache.get(pkey, {"queue.png": png}, verify=verify):
+            rec["stages"]["plot"] = "cached"
+        else:
+            _call(rec, "plot", pipeline.plot_step, vec_csv, png, c["K"], pm.rx_queue(0),
+                  log_path=os.path.join(work, "plot.log"), inputs=[vec_csv], outputs=[png])
+            if pkey and rec["stages"]["plot"] == 0:
+                cache.put(pkey, {"queue.png": png}, info={"case": name, "figure": "queue"})
+        rec["paths"]["figure"] = png
+    rec["status"] = "done"
+    return rec
+
+
+def load_manifest(path):
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {}
+
+
+def save_manifest(path, manifest):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def catalog_row(rec):
+    """Catalog row for a manifest record (artifacts that were not produced stay NULL)."""
+    row = {"case_name": rec["case"], "K": rec["params"]["K"], "L": float(rec["params"]["L"]),
+           "N": rec["params"]["N"], "scenario": rec["params"]["scenario"], "seed": rec["params"]["seed"],
+           "status": rec["status"], "cache_key": rec.get("cache_key"), "work_dir": rec.get("work")}
+    row.update({k: v for k, v in rec.get("paths", {}).items() if v and os.path.exists(v)})
+    row.update(rec.get("metrics", {}))
+    return row
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Run the Fixed-K grid in parallel with per-case isolated inputs")
+    for axis, default in DEFAULT_AXES.items():
+        ap.add_argument(f"--{axis}", default=default, help=f"space/comma separated (default: {default})")
+    ap.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="Parallel cases (default: CPU count)")
+    ap.add_argument("--work-dir", default=WORK_DIR, help="Per-case work directories and manifest.json")
+    ap.add_argument("--force", action="store_true", help="Rerun cases already marked done in the manifest")
+    ap.add_argument("--no-plot", action="store_true", help="Skip the per-case sanity plot")
+    ap.add_argument("--cache-dir", default=CACHE_DIR, help="Content-addressed result cache (default: cache/)")
+    ap.add_argument("--cache-max-gb", type=float, default=DEFAULT_MAX_GB, help="Cache size budget (LRU eviction)")
+    ap.add_argument("--no-cache", action="store_true", help="Always simulate, export and plot")
+    ap.add_argument("--verify-cache", action="store_true", help="Full digest check of cache hits before reuse")
+    ap.add_argument("--cases", metavar="CSV", help="Run the K/L/N[/scenario] rows of this CSV (e.g. results/fluid_rank.csv "
+                    "shortlist) for every --Seeds instead of the full Ks x Ls x Ns product")
+    ap.add_argument("--catalog", default=catalog.CATALOG_PATH, help="SQLite run catalog (default: results/catalog.sqlite)")
+    ap.add_argument("--no-catalog", action="store_true", help="Do not record runs in the catalog")
+    ap.add_argument("--topo", default=topo.DEFAULT_MAP, help="Port map of the network to simulate (scripts/topo.py)")
+    args = ap.parse_args()
+
+    if not os.path.isfile(args.topo):
+        sys.exit(f"[ERR] no port map {args.topo} (generate one with scripts/topo.py)")
+    env = resolve_env()
+    if not env["opp_run"] or not env["scavetool"]:
+        sys.exit("ERROR: Set OMNETPP_BIN and SCAVE_BIN environment variables.")
+    os.makedirs(RES_DIR, exist_ok=True)
+    os.makedirs(FIG_DIR, exist_ok=True)
+    os.makedirs(args.work_dir, exist_ok=True)
+
+    # workers only get/put; LRU eviction runs here once the pool is done
+    cache = None if args.no_cache else ResultCache(args.cache_dir, int(args.cache_max_gb * 1024 ** 3), auto_gc=False)
+    db = None if args.no_catalog else catalog.connect(args.catalog)
+    axes = {a: split_axis(getattr(args, a)) for a in DEFAULT_AXES}
+    hosts = topo.load(args.topo).hosts
+    cases = cases_from_csv(args.cases, axes["Seeds"], axes["Scenarios"]) if args.cases else build_cases(axes)
+    cases = fit_cases(cases, hosts)
+    if not cases:
+        sys.exit("[ERR] no case fits the network")
+    manifest_path = os.path.join(args.work_dir, "manifest.json")
+    manifest = load_manifest(manifest_path)
+    todo = [c for c in cases if args.force or manifest.get(case_name(c), {}).get("status") != "done"]
+    print(f"==> {len(cases)} cases, {len(cases) - len(todo)} already done, {len(todo)} to run on {args.jobs} workers")
+
+    # every distinct (N, L, seed) workload once, before the cases fan out
+    workloads = pipeline.traffic_batch(todo, os.path.join(args.work_dir, "workloads"), hosts, args.jobs) if todo else {}
+    failed = 0
+    with ProcessPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        futs = {}
+        for c in todo:
+            manifest[case_name(c)] = {"case": case_name(c), "params": c, "status": "running"}
+            futs[pool.submit(run_case, c, env, args.work_dir, not args.no_plot, cache, args.verify_cache, args.topo,
+                             workloads.get(pipeline.workload_key(c)))] = c
+        save_manifest(manifest_path, manifest)
+        for fut in as_completed(futs):
+            c = futs[fut]
+            try:
+                rec = fut.result()
+            except Exception as e:
+                rec = {"case": case_name(c), "params": c, "status": "failed", "error": repr(e)}
+            manifest[rec["case"]] = rec
+            save_manifest(manifest_path, manifest)
+            if db is not None:
+                catalog.upsert(db, catalog_row(rec))
+            failed += rec["status"] != "done"
+            print(f"==> Case {rec['case']}: {rec['status']}{' (cached)' if rec.get('cached') else ''}")
+    if cache is not None:
+        cache.gc()
+
+    print(f"Grid done ({failed} failed). CSVs in {RES_DIR}; figures in {FIG_DIR}; manifest {manifest_path}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+In-process pipeline steps and a batch entry point for grid cases.
+
+Each per-case Python step of the grid runners is a function call here:
+- traffic generation;
+- vector store;
+- queue table;
+- catalog row;
+- sanity plot.
+A batch run pays the pandas / numpy / matplotlib imports once and then walks
+the whole case list in one process, instead of starting one interpreter per
+step and case. Step output goes to a log file (or the console) and the step
+cost to a stages.jsonl record, as with `stagelog.py run`. A failing step is
+logged with its traceback, recorded with rc=1, and does not stop the batch.
+
+scripts/grid.py calls run_step in its pool workers. run_grid.sh generates all
+flows with one `traffic` call, then post-processes all cases with one `post` call.
+`traffic` writes each distinct (N, L, seed) workload once into <flows-dir>/workloads/
+(traffic_incast.write_incast_many, -j in parallel) and links <case>.inc to it, so
+sym/asym and every K of a (N, L, seed) share one file.
+Case parameters come from the fixk_K{K}_L{L}_N{N}_{scenario}_s{seed} names;
+the host count and the ToR->RX queue come from the port map (--topo, scripts/topo.py).
+
+Usage:
+    python scripts/pipeline.py traffic --flows-dir results/flows fixk_K30_L0.6_N8_sym_s1 fixk_K60_L0.6_N8_sym_s1
+    python scripts/pipeline.py post --flows-dir results/flows --jsonl results/stages.jsonl fixk_K30_L0.6_N8_sym_s1 ...
+"""
+
+import os, sys, argparse, traceback, contextlib
+import stagelog, topo
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+RES_DIR = os.path.join(ROOT_DIR, "results")
+FIG_DIR = os.path.join(ROOT_DIR, "figs")
+
+# quick sanity plot of the ToR->RX queue (host[0]), as in run_grid.sh / grid.py
+PLOT_MODULE, PLOT_NAME = topo.load().rx_queue(0), "queueBitLength"
+
+
+def run_step(stage, fn, *args, case=None, jsonl=None, log_path=None, inputs=(), outputs=(), **kw):
+    """fn(*args, **kw) with its output in log_path; returns (rc, result). rc=1 on an exception."""
+    result, rc = None, 0
+    with contextlib.ExitStack() as ctx:
+        if log_path:
+            log = ctx.enter_context(open(log_path, "w"))
+            ctx.enter_context(contextlib.redirect_stdout(log))
+            ctx.enter_context(contextlib.redirect_stderr(log))
+        with stagelog.Timer() as tm:
+            try:
+                result = fn(*args, **kw)
+            except Exception:
+                traceback.print_exc()
+                rc = 1
+    if jsonl:
+        stagelog.record(jsonl, case, stage, rc, tm.usage, inputs, outputs)
+    return rc, result
+
+
+# ---- steps -------------------------------------------------------------
+
+def workload_key(c):
+    # what the traffic depends on: K and the scenario do not change it
+    return int(c["N"]), float(c["L"]), int(c["seed"])
+
+
+def traffic_batch(cases, out_dir, hosts=None, jobs=1):
+    """Every distinct (N, L, seed) workload of `cases`, written once; returns {workload_key: path}."""
+    from traffic_incast import write_incast_many, TOTAL
+    return write_incast_many(sorted({workload_key(c) for c in cases}), out_dir, hosts or TOTAL, jobs=jobs)
+
+
+def traffic_step(c, out, hosts=None, workload=None):
+    """This case's flows.inc: linked to its pre-generated workload (traffic_batch), else generated."""
+    if workload:
+        from flowmanifest import link_inc
+        out = link_inc(workload, out)
+        print("linked", out, "->", workload)
+        return str(out)
+    from traffic_incast import write_incast, TOTAL
+    out = write_incast(*workload_key(c), out, hosts=hosts or TOTAL)
+    print("wrote", out)
+    return str(out)
+
+
+def vecstore_step(vec_csv):
+    from vecstore import ingest, is_fresh, store_path_for, VecStore
+    store = store_path_for(vec_csv)
+    if is_fresh(store, vec_csv):
+        print(f"[skip] {store} up to date")
+        return store
+    ingest(vec_csv, store)
+    print(f"[ok] wrote {store} ({len(VecStore(store).vectors)} vectors)")
+    return store
+
+
+def queues_step(vec_csv, k=None):
+    from queue_stats import queues_csv, k_from_name
+    k = k_from_name(vec_csv) if k is None else k
+    out, table = queues_csv(vec_csv, k)
+    if out is None:
+        print(f"[warn] no queueLength/queueBitLength vectors in {vec_csv}", file=sys.stderr)
+    else:
+        print(f"[ok] wrote {out}: {len(table)} queues (K={k})")
+    return out
+
+
+def catalog_step(vec_csv, flows_inc=None, db_path=None, queue_module=PLOT_MODULE):
+    import catalog
+    conn = catalog.connect(db_path or catalog.CATALOG_PATH)
+    try:
+        row = catalog.add_vectors(conn, vec_csv, flows_inc, queue_module)
+    finally:
+        conn.close()
+    if row is None:
+        raise ValueError(f"no fixk_K.._L.._N.._s.. parameters in name: {vec_csv}")
+    print(f"[ok] cataloged {vec_csv}")
+    return row
+
+
+def plot_step(vec_csv, png, K, module=PLOT_MODULE):
+    from plot_sanity import sanity_plot
+    from queue_stats import MSS
+    # K is in packets (RED minth/maxth): the line sits at K * MSS bytes
+    return sanity_plot(vec_csv, module, PLOT_NAME, png, float(K), "packets", MSS, y_unit="KB")
+
+
+def post_case(name, flows_inc=None, res_dir=RES_DIR, fig_dir=FIG_DIR, jsonl=None, plot=True, db_path=None,
+              queue_module=PLOT_MODULE):
+    """vecstore, queues, catalog and plot for one exported case; returns {stage: rc}."""
+    from catalog import params_from_name
+    vec_csv = os.path.join(res_dir, f"{name}_vectors.csv")
+    if not os.path.exists(vec_csv):
+        print(f"[warn] {name}: no {vec_csv}", file=sys.stderr)
+        return {}
+    p = params_from_name(name) or {}
+    kw = {"case": name, "jsonl": jsonl, "inputs": [vec_csv]}
+    rcs = {}
+    rcs["vecstore"], store = run_step("vecstore", vecstore_step, vec_csv, **kw)
+    rcs["queues"], _ = run_step("queues", queues_step, vec_csv, **kw,
+                                outputs=[os.path.join(res_dir, f"{name}_queues.csv")])
+    if db_path is not False:
+        rcs["catalog"], _ = run_step("catalog", catalog_step, vec_csv, flows_inc, db_path, queue_module, **kw)
+    if plot and "K" in p:
+        png = os.path.join(fig_dir, f"{name}_queue.png")
+        rcs["plot"], _ = run_step("plot", plot_step, vec_csv, png, p["K"], queue_module, **kw, outputs=[png])
+    return rcs
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Run the per-case Python steps of a grid in one process")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("traffic", help="flows.inc per case into --flows-dir/<case>.inc")
+    p.add_argument("cases", nargs="+", help="fixk_K.._L.._N.._{sym,asym}_s.. names")
+    p.add_argument("--flows-dir", required=True)
+    p.add_argument("--jsonl", help="Append stage records here (stagelog.py report)")
+    p.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="Workloads written in parallel")
+    p = sub.add_parser("post", help="vecstore, queues, catalog and sanity plot per exported case")
+    p.add_argument("cases", nargs="+", help="fixk_K.._L.._N.._{sym,asym}_s.. names")
+    p.add_argument("--flows-dir", help="flows.inc per case (<case>.inc) for the catalog FCT metrics")
+    p.add_argument("--flows-inc", help="One flows.inc for every case instead")
+    p.add_argument("--res-dir", default=RES_DIR)
+    p.add_argument("--fig-dir", default=FIG_DIR)
+    p.add_argument("--jsonl", help="Append stage records here (stagelog.py report)")
+    p.add_argument("--catalog", help="SQLite run catalog (default: results/catalog.sqlite)")
+    p.add_argument("--no-catalog", action="store_true")
+    p.add_argument("--no-plot", action="store_true")
+    for p in sub.choices.values():
+        p.add_argument("--topo", help="Port map of the simulated network (default: topo.DEFAULT_MAP)")
+    args = ap.parse_args()
+    pm = topo.load(args.topo)
+
+    from catalog import params_from_name
+    bad = [c for c in args.cases if params_from_name(c) is None]
+    if bad:
+        sys.exit(f"[ERR] no fixk_K.._L.._N.._s.. parameters in: {' '.join(bad)}")
+    failed = 0
+    if args.cmd == "traffic":
+        os.makedirs(args.flows_dir, exist_ok=True)
+        # each distinct (N, L, seed) once, in parallel; cases get links to them
+        wl_dir = os.path.join(args.flows_dir, "workloads")
+        rc, workloads = run_step("traffic_batch", traffic_batch, [params_from_name(n) for n in args.cases], wl_dir,
+                                 pm.hosts, args.jobs, case="*", jsonl=args.jsonl)
+        failed += rc != 0
+        for name in args.cases:
+            c = params_from_name(name)
+            out = os.path.join(args.flows_dir, f"{name}.inc")
+            rc, _ = run_step("traffic", traffic_step, c, out, pm.hosts, (workloads or {}).get(workload_key(c)),
+                             case=name, jsonl=args.jsonl, outputs=[out])
+            failed += rc != 0
+    else:
+        os.makedirs(args.fig_dir, exist_ok=True)
+        for name in args.cases:
+            print(f"==> Post {name}")
+            flows = args.flows_inc or (os.path.join(args.flows_dir, f"{name}.inc") if args.flows_dir else None)
+            rcs = post_case(name, flows, args.res_dir, args.fig_dir, args.jsonl, not args.no_plot,
+                            False if args.no_catalog else args.catalog, pm.rx_queue(0))
+            failed += any(rcs.values()) or not rcs
+    print(f"[ok] {args.cmd}: {len(args.cases)} cases, {failed} with failed steps")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Time-weighted occupancy statistics for every queue of a run.
+
+All queueLength / queueBitLength vectors (every leaf and spine port) are
+concatenated into flat arrays and reduced together as step signals. Each
+sample holds until the next sample of its vector, and the last one holds
+until the end of the run:
+- time-weighted mean via bincount(weights=value*dt);
+- time-weighted percentiles via lexsort by (queue, value) and one
+  searchsorted on the cumulated holding time;
+- fraction of time above K and bursts above K, where a burst is a run of
+  consecutive samples above K and its duration is the sum of their holding times;
+- peak occupancy via maximum.reduceat.
+K is in packets (RedDropperQueue minth/maxth). Byte-valued vectors are
+compared with K * MSS bytes, and queueBitLength is reported in bytes.
+With --topo, a `peer` column names what each port faces (host[h] or the
+neighbour switch), looked up in the port map of scripts/topo.py.
+
+Usage:
+    python scripts/queue_stats.py results/fixk_K30_L0.6_N8_sym_s1_vectors.csv   # K taken from the name
+    python scripts/queue_stats.py results/incast8/omnetpp.vec --k 30 --top 5
+    python scripts/queue_stats.py results/fixk_K30_L0.6_N8_sym_s1_vectors.csv --topo sim/dcn/SmallLeafSpine.ports.json
+"""
+
+import os, sys, argparse
+
+QUEUE_NAMES = ("queueLength", "queueBitLength")
+QS = (50, 95, 99)
+MSS = 1460          # **.tcp.mss in sim/omnetpp.ini (plot_sanity --mss uses the same)
+
+COLUMNS = ["module", "name", "unit", "samples", "duration_s", "mean", "p50", "p95", "p99", "peak",
+           "k", "frac_above_k", "bursts", "burst_mean_s", "burst_max_s"]
+
+
+def queue_name(name):
+    base = str(name).split(":", 1)[0]
+    return base if base in QUEUE_NAMES else None
+
+
+def iter_queue_vectors(path):
+    """Yield (module, name, t, v) for every queue length vector of a run, one pass."""
+    from vecstore import open_vectors, iter_csv_vectors
+    src = open_vectors(path)
+    if src is not None:
+        infos = [i for i in src.catalog() if queue_name(i.name)]
+        data = src.read_many(infos)
+        for info in infos:
+            t, v = data[info.key]
+            yield info.module, info.name, t, v
+        return
+    yield from iter_csv_vectors(path, lambda mod, name: queue_name(name) is not None)
+
+
+def queue_table(vectors, k=None, mss=MSS, t_end=None, qs=QS):
+    """Per-queue statistics (see COLUMNS) from (module, name, t, v) tuples.
+
+    k: threshold in packets (None: no K columns); t_end: run end (default: last sample of any queue).
+    """
+    import numpy as np
+    import pandas as pd
+    mods, names, ts, vs = [], [], [], []
+    for mod, name, t, v in vectors:
+        if len(t):
+            mods.append(mod); names.append(name)
+            ts.append(np.asarray(t, dtype=np.float64)); vs.append(np.asarray(v, dtype=np.float64))
+    if not mods:
+        return pd.DataFrame(columns=COLUMNS)
+
+    nq = len(mods)
+    lens = np.array([len(t) for t in ts], dtype=np.int64)
+    start = np.concatenate(([0], np.cumsum(lens)[:-1]))
+    gid = np.repeat(np.arange(nq), lens)
+    t = np.concatenate(ts)
+    v = np.concatenate(vs)
+    is_bits = np.array([queue_name(n) == "queueBitLength" for n in names])
+    v = np.where(is_bits[gid], v / 8.0, v)
+    unit = np.where(is_bits, "B", "pk")
+    if t_end is None:
+        t_end = float(t.max())
+
+    # holding time of each sample: until the next sample of the same queue, the last until t_end
+    nxt = np.empty_like(t)
+    nxt[:-1] = t[1:]
+    last = start + lens - 1
+    nxt[last] = t_end
+    dt = np.maximum(nxt - t, 0.0)
+    dur = np.bincount(gid, weights=dt, minlength=nq)
+    safe = np.where(dur > 0, dur, np.nan)
+
+    mean = np.bincount(gid, weights=v * dt, minlength=nq) / safe
+    peak = np.maximum.reduceat(v, start)
+
+    # time-weighted percentiles: sort by (queue, value), cumulated holding time is monotone
+    order = np.lexsort((v, gid))
+    cw = np.cumsum(dt[order])
+    base = np.concatenate(([0.0], np.cumsum(dur)[:-1]))
+    targets = base[:, None] + dur[:, None] * (np.asarray(qs, dtype=np.float64) / 100.0)
+    pos = np.minimum(np.searchsorted(cw, targets, side="left"), (start + lens - 1)[:, None])
+    pos = np.maximum(pos, start[:, None])
+    pct = v[order][pos]
+
+    out = {"module": mods, "name": names, "unit": unit, "samples": lens, "duration_s": dur,
+           "mean": mean, "peak": peak}
+    for i, q in enumerate(qs):
+        out[f"p{q}"] = pct[:, i]
+
+    if k is not None:
+        k_q = np.where(unit == "B", k * float(mss), float(k))
+        above = v > k_q[gid]
+        t_above = np.bincount(gid, weights=dt * above, minlength=nq)
+        # a burst starts at a sample above K whose predecessor (same queue) is not
+        first = np.zeros(len(v), dtype=bool)
+        first[start] = True
+        starts = above & (first | ~np.roll(above, 1))
+        bid = np.cumsum(starts) - 1
+        n_bursts = np.bincount(gid[starts], minlength=nq)
+        bdur = np.bincount(bid[above], weights=dt[above], minlength=int(starts.sum()))
+        bmax = np.zeros(nq)
+        np.maximum.at(bmax, gid[starts], bdur)
+        out.update({"k": k_q, "frac_above_k": t_above / safe, "bursts": n_bursts,
+                    "burst_mean_s": np.where(n_bursts > 0, t_above / np.maximum(n_bursts, 1), 0.0),
+                    "burst_max_s": bmax})
+    return pd.DataFrame(out, columns=[c for c in COLUMNS if c in out])
+
+
+def queues_csv(src, k=None, mss=MSS, t_end=None, out=None, pm=None):
+    """Write the queue table of one source to `out` (default <stem>_queues.csv); returns (out, table).
+
+    out is None when the source has no queue vectors. pm: topo.PortMap for the peer column.
+    """
+    table = queue_table(iter_queue_vectors(src), k, mss, t_end)
+    if table.empty:
+        return None, table
+    if pm is not None:
+        table.insert(1, "peer", [pm.peer(m) for m in table["module"]])
+    stem = src[:-len("_vectors.csv")] if src.endswith("_vectors.csv") else os.path.splitext(src.rstrip("/"))[0]
+    out = out or f"{stem}_queues.csv"
+    table.to_csv(out, index=False)
+    return out, table
+
+
+def k_from_name(path):
+    from catalog import params_from_name
+    p = params_from_name(path)
+    return p["K"] if p else None
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Time-weighted occupancy statistics of every queue in a run")
+    ap.add_argument("sources", nargs="+", help="vectors CSV, native .vec or .vstore dir")
+    ap.add_argument("--k", type=float, help="Marking threshold in packets (default: K from a fixk_K.. file name)")
+    ap.add_argument("--mss", type=int, default=MSS, help="Bytes per packet for byte-valued queues (default %(default)s, the ini tcp.mss)")
+    ap.add_argument("--t-end", type=float, help="Run end time (default: last queue sample)")
+    ap.add_argument("--out", help="Output CSV (default <stem>_queues.csv next to the source)")
+    ap.add_argument("--top", type=int, default=10, help="Print the N hottest queues")
+    ap.add_argument("--topo", help="Port map (scripts/topo.py) for the peer column")
+    args = ap.parse_args()
+    pm = None
+    if args.topo:
+        import topo
+        pm = topo.load(args.topo)
+
+    for src in args.sources:
+        if not os.path.exists(src):
+            print(f"[warn] missing: {src}", file=sys.stderr)
+            continue
+        k = args.k if args.k is not None else k_from_name(src)
+        out, table = queues_csv(src, k, args.mss, args.t_end, args.out if len(args.sources) == 1 else None, pm)
+        if out is None:
+            print(f"[warn] no queueLength/queueBitLength vectors in {src}", file=sys.stderr)
+            continue
+        print(f"[ok] wrote {out}: {len(table)} queues (K={k})")
+        if args.top > 0:
+            hot = table.sort_values(["frac_above_k", "p99"] if k is not None else ["p99"], ascending=False)
+            print(hot.head(args.top).to_string(index=False))
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache for grid results.
+
+Keys are SHA-256 digests of the effective inputs of a case:
+- the resolved omnetpp.ini section (the config, its `extends` chain and General)
+- the generated flows.inc content and the generator parameters
+- the runtime overrides (minus the per-workdir --result-dir) and the NED sources
+A hit restores the stored files (.vec/.vci/.sca, exported CSVs, figures)
+instead of simulating/exporting again.
+
+Entries live in cache/objects/<key>/ with an entry.json listing every file's
+size and digest. Access bumps the entry mtime; `gc` evicts least recently used
+entries until the cache fits the size budget. get/put hold a shared flock on
+cache/lock and gc/verify an exclusive one, so eviction never removes an entry
+another process is restoring. Pool runners build the cache with auto_gc=False
+and call gc() once in the parent after the pool.
+
+Usage:
+    python scripts/resultcache.py stats
+    python scripts/resultcache.py gc --max-gb 50
+    python scripts/resultcache.py verify
+"""
+
+import os, re, sys, json, time, fcntl, shutil, hashlib, argparse
+from contextlib import contextmanager
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+CACHE_DIR = os.environ.get("DCN_CACHE_DIR", os.path.join(ROOT_DIR, "cache"))
+DEFAULT_MAX_GB = float(os.environ.get("DCN_CACHE_MAX_GB", "50"))
+
+SECTION_RE = re.compile(r"^\[(?:Config\s+)?([^\]]+)\]\s*$")
+
+
+def sha256_file(path, bufsize=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for buf in iter(lambda: f.read(bufsize), b""):
+            h.update(buf)
+    return h.hexdigest()
+
+
+def digest(obj):
+    return hashlib.sha256(json.dumps(obj, sort_keys=True).encode()).hexdigest()
+
+
+# ---- ini resolution ---------------------------------------------------------
+
+def parse_ini_sections(path):
+    """{section: [effective lines]} with comments/blank lines dropped."""
+    sections = {"General": []}
+    cur = "General"
+    with open(path, encoding="utf-8") as f:
+        for raw in f:
+            line = raw.split("#", 1)[0].strip()
+            if not line:
+                continue
+            m = SECTION_RE.match(line)
+            if m:
+                cur = m.group(1).strip()
+                sections.setdefault(cur, [])
+                continue
+            sections[cur].append(re.sub(r"\s*=\s*", " = ", line, count=1))
+    return sections
+
+
+def resolve_ini(path, config):
+    """Lines that apply to `config`, in OMNeT++ lookup order (section, bases, General)."""
+    sections = parse_ini_sections(path)
+    out, seen = [], set()
+
+    def visit(name):
+        if name in seen or name not in sections:
+            return
+        seen.add(name)
+        lines = sections[name]
+        out.append(f"[{name}]")
+        out.extend(l for l in lines if not l.startswith("extends "))
+        for l in lines:
+            if l.startswith("extends "):
+                for base in l.split("=", 1)[1].split(","):
+                    visit(base.strip())
+
+    visit(config)
+    visit("General")
+    return out
+
+
+def ned_digest(sim_dir):
+    h = hashlib.sha256()
+    for dirpath, _, files in sorted(os.walk(sim_dir)):
+        for fn in sorted(files):
+            if fn.endswith(".ned"):
+                p = os.path.join(dirpath, fn)
+                h.update(os.path.relpath(p, sim_dir).encode())
+                h.update(sha256_file(p).encode())
+    return h.hexdigest()
+
+
+def case_key(ini_path, config, flows_path, overrides, generator, sim_dir):
+    """Cache key for one simulation case (see module docstring)."""
+    return digest({
+        "ini": resolve_ini(ini_path, config),
+        "flows": sha256_file(flows_path),
+        "overrides": sorted(o for o in overrides if not o.startswith("--result-dir=")),
+        "generator": generator,
+        "ned": ned_digest(sim_dir),
+    })
+
+
+# ---- store ------------------------------------------------------------------
+
+class ResultCache:
+    def __init__(self, root=CACHE_DIR, max_bytes=int(DEFAULT_MAX_GB * 1024 ** 3), auto_gc=True):
+        self.root = root
+        self.objects = os.path.join(root, "objects")
+        self.max_bytes = max_bytes
+        self.auto_gc = auto_gc
+        os.makedirs(self.objects, exist_ok=True)
+
+    def _entry(self, key):
+        return os.path.join(self.objects, key)
+
+    @contextmanager
+    def _lock(self, exclusive=False):
+        with open(os.path.join(self.root, "lock"), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def get(self, key, dest, required=None, verify=False):
+        """Restore entry `key` as {name: dest[name]}; False on miss or integrity failure.
+
+        Names in `required` (default: all of dest) must be in the entry; others are optional.
+        """
+        with self._lock():
+            try:
+                return self._get(key, dest, required, verify)
+            except (FileNotFoundError, json.JSONDecodeError):
+                # replaced by a concurrent put of the same key: treat as a miss
+                return False
+
+    def _get(self, key, dest, required, verify):
+        entry = self._entry(key)
+        meta_path = os.path.join(entry, "entry.json")
+        if not os.path.exists(meta_path):
+            return False
+        with open(meta_path) as f:
+            meta = json.load(f)
+        files = meta["files"]
+        if not set(dest if required is None else required) <= set(files):
+            return False
+        for name, info in files.items():
+            p = os.path.join(entry, name)
+            if not os.path.isfile(p) or os.path.getsize(p) != info["size"] or \
+                    (verify and sha256_file(p) != info["sha256"]):
+                print(f"[warn] cache entry {key} failed integrity check; dropping it", file=sys.stderr)
+                shutil.rmtree(entry, ignore_errors=True)
+                return False
+        for name, target in dest.items():
+            if name not in files:
+                continue
+            os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+            shutil.copyfile(os.path.join(entry, name), target)
+        os.utime(meta_path)  # LRU: last access
+        return True
+
+    def put(self, key, src, info=None):
+        """Store {name: src_path} under `key` (missing sources are skipped), then enforce the budget
+        unless auto_gc is off."""
+        with self._lock():
+            files = self._put(key, src, info)
+        if self.auto_gc:
+            self.gc()
+        return files
+
+    def _put(self, key, src, info):
+        entry = self._entry(key)
+        tmp = entry + f".tmp{os.getpid()}"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        files = {}
+        for name, path in src.items():
+            if not os.path.isfile(path):
+                continue
+            shutil.copyfile(path, os.path.join(tmp, name))
+            files[name] = {"size": os.path.getsize(path), "sha256": sha256_file(path)}
+        with open(os.path.join(tmp, "entry.json"), "w") as f:
+            json.dump({"key": key, "created": time.time(), "info": info or {}, "files": files}, f, indent=1)
+        shutil.rmtree(entry, ignore_errors=True)
+        os.replace(tmp, entry)
+        return files
+
+    def entries(self):
+        """[(last access, size, key)]; entries removed or replaced while listing are skipped."""
+        out = []
+        for key in os.listdir(self.objects):
+            if ".tmp" in key:
+                continue
+            meta_path = os.path.join(self.objects, key, "entry.json")
+            try:
+                with open(meta_path) as f:
+                    meta = json.load(f)
+                mtime = os.path.getmtime(meta_path)
+            except (FileNotFoundError, NotADirectoryError, json.JSONDecodeError):
+                continue
+            size = sum(i["size"] for i in meta["files"].values())
+            out.append((mtime, size, key))
+        return out
+
+    def gc(self, max_bytes=None):
+        """Evict least recently used entries until the total size fits; returns evicted keys."""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        with self._lock(exclusive=True):
+            ents = sorted(self.entries())
+            total = sum(e[1] for e in ents)
+            evicted = []
+            for _, size, key in ents:
+                if total <= max_bytes:
+                    break
+                shutil.rmtree(self._entry(key), ignore_errors=True)
+                total -= size
+                evicted.append(key)
+        return evicted
+
+    def verify(self):
+        """Full digest check of every entry; corrupt entries are removed. Returns bad keys."""
+        bad = []
+        with self._lock(exclusive=True):
+            for _, _, key in self.entries():
+                entry = self._entry(key)
+                with open(os.path.join(entry, "entry.json")) as f:
+                    files = json.load(f)["files"]
+                for name, info in files.items():
+                    p = os.path.join(entry, name)
+                    if not os.path.isfile(p) or sha256_file(p) != info["sha256"]:
+                        shutil.rmtree(entry, ignore_errors=True)
+                        bad.append(key)
+                        break
+        return bad
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Inspect and maintain the grid result cache")
+    ap.add_argument("cmd", choices=["stats", "gc", "verify"])
+    ap.add_argument("--cache-dir", default=CACHE_DIR)
+    ap.add_argument("--max-gb", type=float, default=DEFAULT_MAX_GB, help="Size budget for gc")
+    args = ap.parse_args()
+    cache = ResultCache(args.cache_dir, int(args.max_gb * 1024 ** 3))
+    if args.cmd == "stats":
+        ents = cache.entries()
+        print(f"{len(ents)} entries, {sum(e[1] for e in ents) / 1024 ** 2:.1f} MB in {cache.root}")
+    elif args.cmd == "gc":
+        print(f"evicted {len(cache.gc())} entries")
+    else:
+        bad = cache.verify()
+        print(f"{len(bad)} corrupt entries removed" + (": " + " ".join(bad) if bad else ""))
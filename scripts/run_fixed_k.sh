@@ -91,10 +91,11 @@ run_and_export() {
   echo "==> Exporting $sim_out_dir -> $vec_out / $sca_out"
   "$SCAVE_BIN" x "$sim_out_dir/omnetpp.vec" -o "$vec_out" || true
   "$SCAVE_BIN" x "$sim_out_dir/omnetpp.sca" -o "$sca_out" || true
+  python3 "$ROOT_DIR/scripts/vecstore.py" "$vec_out" || true
 
   echo "==> Plotting sanity for $full_cfg"
   python3 "$ROOT_DIR/scripts/plot_sanity.py" \
-    --module "leaf[0].ppp[2].queue" \
+    --module "$(python3 "$ROOT_DIR/scripts/topo.py" show --get rx_queue)" \
     --name "queueBitLength" \
     --source_csv "$vec_out" \
     --output "$FIG_DIR/${full_cfg}_sanity_queue.png" \
@@ -3,6 +3,7 @@ set -euo pipefail
 # Grid runner for Fixed-K ECN experiments
 # Axes: K in {10,30,60}, Load L in {0.3,0.6,0.8}, N in {8,16}, Scenario {sym, asym}, Seeds {1..5}
 # Requires: OMNETPP_BIN, SCAVE_BIN exported; INET_NED optional
+# TOPO: port map of the network to simulate (scripts/topo.py; default SmallLeafSpine)
 
 ROOT_DIR="$(cd "$(dirname "$0")/.." && pwd)"
 SIM_DIR="$ROOT_DIR/sim"
@@ -39,21 +40,30 @@ Ns=(${Ns:-8 16})
 Seeds=(${Seeds:-1 2 3 4 5})
 Scenarios=(${Scenarios:-sym asym}) # asym implies a 5Gbps override on a chosen uplink
 
-# Choose one deterministic link to throttle for asym: leaf[2].ppp[0]
-ASYM_5G_LINE='*.leaf[2].ppp[0].channel.datarate=5Gbps'
+# Network, host count and asym uplink come from the port map
+TOPO=${TOPO:-$SIM_DIR/dcn/SmallLeafSpine.ports.json}
+topo_get() { python3 "$ROOT_DIR/scripts/topo.py" show "$TOPO" --get "$1"; }
+NETWORK="$(topo_get network)"
+# Choose one deterministic link to throttle for asym: the map's asym uplink (leaf[2].ppp[0])
+ASYM_5G_LINE="$(topo_get asym_line)"
 
 run_case() {
   local K="$1"; local L="$2"; local N="$3"; local seed="$4"; local scen="$5"
   local cfg_name="fixk_K${K}_L${L}_N${N}_${scen}_s${seed}"
   echo "==> Case $cfg_name"
+  # Per-stage wall/CPU time, peak RSS and file sizes -> results/stages.jsonl (scripts/stagelog.py report)
+  local stage=(python3 "$ROOT_DIR/scripts/stagelog.py" run --jsonl "$RES_DIR/stages.jsonl" --case "$cfg_name")
 
-  # Generate flows.inc for this case
-  if [[ "$scen" == "sym" ]]; then
-    python3 "$ROOT_DIR/scripts/traffic_incast.py" "$N" "$L" "$seed"
-  else
-    # asym uses the same traffic; only channel override differs at runtime
-    python3 "$ROOT_DIR/scripts/traffic_incast.py" "$N" "$L" "$seed"
+  # This case's flows.inc (generated up front by pipeline.py traffic); asym uses the same
+  # traffic, only the channel override differs at runtime
+  if [[ ! -f "$FLOWS_DIR/$cfg_name.inc" ]]; then
+    echo "[warn] $cfg_name: no flows (see traffic step above), skipped" >&2
+    return 0
   fi
+  cp "$FLOWS_DIR/$cfg_name.inc" "$SIM_DIR/flows.inc"
+  # and its flow manifest, so sim/flows.inc never pairs with another case's
+  rm -rf "$SIM_DIR/flows.manifest"
+  [[ -d "$FLOWS_DIR/$cfg_name.manifest" ]] && cp -r "$FLOWS_DIR/$cfg_name.manifest" "$SIM_DIR/flows.manifest"
 
   # Pick base config by N and K: incast8/incast16 combined with kXX
   local base_cfg="incast${N}_k${K}"
@@ -67,38 +77,51 @@ run_case() {
     "--**.host[0].app[*].endToEndDelay.vector-recording=true"
     "--**.host[0].app[*].packetReceived.result-recording-modes=+vector"
     "--result-dir=results/$cfg_name"
+    "--network=$NETWORK"
   )
   if [[ "$scen" == "asym" ]]; then
     overrides+=("--$ASYM_5G_LINE")
   fi
 
-  (cd "$SIM_DIR" && \
-    "$OMNETPP_BIN" -u Cmdenv -n "$NED_PATH" ${OPP_LIBS[@]:-} -f omnetpp.ini -c "$base_cfg" "${overrides[@]}")
+  local raw="$SIM_DIR/results/$cfg_name"
+  "${stage[@]}" --stage opp_run --events --cwd "$SIM_DIR" --in "$SIM_DIR/omnetpp.ini" "$SIM_DIR/flows.inc" \
+    --out "$raw/omnetpp.vec" "$raw/omnetpp.vci" "$raw/omnetpp.sca" -- \
+    "$OMNETPP_BIN" -u Cmdenv -n "$NED_PATH" ${OPP_LIBS[@]:-} -f omnetpp.ini -c "$base_cfg" "${overrides[@]}"
 
   # Export
-  "$SCAVE_BIN" x "$SIM_DIR/results/$cfg_name/omnetpp.vec" -o "$RES_DIR/${cfg_name}_vectors.csv" || true
-  "$SCAVE_BIN" x "$SIM_DIR/results/$cfg_name/omnetpp.sca" -o "$RES_DIR/${cfg_name}_scalars.csv" || true
-
-  # Quick queue sanity plot (ToR->RX)
-  python3 "$ROOT_DIR/scripts/plot_sanity.py" \
-    --module "leaf[0].ppp[2].queue" \
-    --name "queueBitLength" \
-    --source_csv "$RES_DIR/${cfg_name}_vectors.csv" \
-    --output "$FIG_DIR/${cfg_name}_queue.png" \
-    --y_unit KB \
-    --k "$K" --k_unit KB || true
+  "${stage[@]}" --stage export_vec --in "$raw/omnetpp.vec" --out "$RES_DIR/${cfg_name}_vectors.csv" -- \
+    "$SCAVE_BIN" x "$raw/omnetpp.vec" -o "$RES_DIR/${cfg_name}_vectors.csv" || true
+  "${stage[@]}" --stage export_sca --in "$raw/omnetpp.sca" --out "$RES_DIR/${cfg_name}_scalars.csv" -- \
+    "$SCAVE_BIN" x "$raw/omnetpp.sca" -o "$RES_DIR/${cfg_name}_scalars.csv" || true
 }
 
+cases=()
+params=()
 for K in "${Ks[@]}"; do
   for L in "${Ls[@]}"; do
     for N in "${Ns[@]}"; do
       for seed in "${Seeds[@]}"; do
         for scen in "${Scenarios[@]}"; do
-          run_case "$K" "$L" "$N" "$seed" "$scen"
+          cases+=("fixk_K${K}_L${L}_N${N}_${scen}_s${seed}")
+          params+=("$K $L $N $seed $scen")
         done
       done
     done
   done
 done
 
+# Python steps run in one process per phase (scripts/pipeline.py), not one interpreter per step and case
+FLOWS_DIR="$RES_DIR/flows"
+python3 "$ROOT_DIR/scripts/pipeline.py" traffic --flows-dir "$FLOWS_DIR" --jsonl "$RES_DIR/stages.jsonl" \
+  --topo "$TOPO" "${cases[@]}" || true
+
+for p in "${params[@]}"; do
+  run_case $p
+done
+
+# Per case: columnar store, time-weighted queue table (${cfg_name}_queues.csv), catalog row
+# (params, artifact paths, FCT percentiles, queue stats, drops/marks) and the ToR->RX sanity plot
+python3 "$ROOT_DIR/scripts/pipeline.py" post --flows-dir "$FLOWS_DIR" --jsonl "$RES_DIR/stages.jsonl" \
+  --res-dir "$RES_DIR" --fig-dir "$FIG_DIR" --topo "$TOPO" "${cases[@]}" || true
+
 echo "Grid done. CSVs in $RES_DIR; figures in $FIG_DIR" 
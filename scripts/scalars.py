@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Scalar results ingest and per-queue drop / ECN-mark accounting.
+
+Reads native .sca files or the `opp_scavetool x` CSV exports
+(results/<case>_scalars.csv) of any number of runs into a single table
+(case, run, module, name, value). The index (case, run, module, name) -> value
+comes from scalar_index(). The accounting runs in one pass over that table:
+- every scalar of a `...ppp[i].queue` / `...eth[i].queue` module, or of one of
+  its submodules (RedDropperQueue: queue.fifo, queue.red), is rolled up to the
+  queue. A value recorded by the queue itself wins over the sum of its submodules;
+- drops: `packetDropped:count` (`dropPk:count` in older INET), or the sum of the
+  per-reason `packetDropped<Reason>:count` when there is no total;
+- marks: any `*mark*` count (the name varies across INET versions, like markEcn);
+- forwarded: `outgoingPackets:count`, else `packetPulled:count` / `packetPopped:count`.
+Per case the queues are summed into fabric totals with drop and mark fractions.
+K/L/N/scenario/seed come from the fixk_.. case name, so the totals join the
+FCT summaries (`file` column of fct_extract.py) and the run catalog.
+
+Usage:
+    python scripts/scalars.py                                  # results/*_scalars.csv
+    python scripts/scalars.py work/*/results/omnetpp.sca --fct-summary results/fct_summary.csv
+    python scripts/scalars.py results/*_scalars.csv --query "packetDropped"
+"""
+
+import os, re, sys, glob, argparse
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+RES_DIR = os.path.join(ROOT_DIR, "results")
+
+QUEUE_RE = re.compile(r"^(.*\.(?:ppp|eth)\[\d+\]\.queue)(\..+)?$")
+DROP_RE = re.compile(r"^(?:packetDropped|dropPk)(\w*):count$")
+MARK_RE = re.compile(r"(?i)^[^:]*mark[^:]*(?::count)?$")
+FWD_NAMES = ("outgoingPackets:count", "packetPulled:count", "packetPopped:count")
+
+KEYS = ["case", "run", "queue"]
+QUEUE_COLUMNS = KEYS + ["drops", "marks", "forwarded", "drop_frac", "mark_frac"]
+
+
+def case_of(path):
+    """Case name of a scalar file: <case>_scalars.csv, or the run directory of an omnetpp.sca."""
+    base = os.path.basename(path)
+    if base.endswith("_scalars.csv"):
+        return base[: -len("_scalars.csv")]
+    if base != "omnetpp.sca":
+        return os.path.splitext(base)[0]
+    d = os.path.dirname(os.path.abspath(path))
+    # grid.py: work/<case>/results/omnetpp.sca; run_grid.sh: sim/results/<case>/omnetpp.sca
+    return os.path.basename(os.path.dirname(d)) if os.path.basename(d) == "results" else os.path.basename(d)
+
+
+def read_sca(path):
+    """(run, module, name, value) lists of the `scalar` lines of a .sca (statistics are skipped)."""
+    from vecfile import split_header
+    runs, mods, names, vals = [], [], [], []
+    run = ""
+    with open(path, errors="replace") as f:
+        for line in f:
+            if line.startswith("scalar "):
+                p = split_header(line)
+                if len(p) >= 4:
+                    runs.append(run); mods.append(p[1]); names.append(p[2]); vals.append(p[3])
+            elif line.startswith("run "):
+                run = line[4:].strip()
+    return runs, mods, names, vals
+
+
+def read_scalars_csv(path):
+    import pandas as pd
+    df = pd.read_csv(path, usecols=lambda c: c in ("run", "type", "module", "name", "value"), dtype=str)
+    if not {"type", "module", "name", "value"} <= set(df.columns):
+        print(f"[warn] not a scalars export: {path}", file=sys.stderr)
+        df = df.iloc[0:0]
+    else:
+        df = df[df["type"] == "scalar"]
+    return df.reindex(columns=["run", "module", "name", "value"])
+
+
+def load_scalars(paths):
+    """One table (case, run, module, name, value) for all runs; module/name are categorical."""
+    import pandas as pd
+    frames = []
+    for path in paths:
+        if path.endswith(".sca"):
+            runs, mods, names, vals = read_sca(path)
+            df = pd.DataFrame({"run": runs, "module": mods, "name": names, "value": vals})
+        else:
+            df = read_scalars_csv(path)
+        df.insert(0, "case", case_of(path))
+        frames.append(df)
+    if not frames:
+        return pd.DataFrame(columns=["case", "run", "module", "name", "value"])
+    df = pd.concat(frames, ignore_index=True)
+    df["run"] = df["run"].fillna("")
+    df["value"] = pd.to_numeric(df["value"], errors="coerce")
+    for c in ("case", "module", "name"):
+        df[c] = df[c].astype("category")
+    return df
+
+
+def scalar_index(df):
+    """Series indexed by (case, run, module, name), sorted for fast .loc lookups."""
+    return df.set_index(["case", "run", "module", "name"])["value"].sort_index()
+
+
+def _rollup(q, mask, pick=None):
+    """Per (case, run, queue): the queue's own value, else the sum over its submodules."""
+    sel = q[mask]
+    if pick is not None:
+        # first available name in priority order, per module
+        sel = sel.assign(rank=pick[mask]).sort_values("rank")
+        sel = sel.drop_duplicates(KEYS + ["module"], keep="first")
+    s = sel.groupby(KEYS + ["sub"], observed=True)["value"].sum().reset_index()
+    s = s.sort_values("sub").drop_duplicates(KEYS, keep="first")
+    return s.set_index(KEYS)["value"]
+
+
+def queue_accounting(df):
+    """Per-queue drops, marks and forwarded packets (see QUEUE_COLUMNS)."""
+    import numpy as np
+    import pandas as pd
+    mods = df["module"].cat.categories
+    m = mods.str.extract(QUEUE_RE)
+    qmap = pd.Series(m[0].to_numpy(), index=mods)
+    sub = pd.Series(m[1].notna().to_numpy().astype(int), index=mods)
+    q = df[df["module"].map(qmap).notna().to_numpy()].copy()
+    if q.empty:
+        return pd.DataFrame(columns=QUEUE_COLUMNS)
+    q["queue"] = q["module"].map(qmap).astype(str)
+    q["sub"] = q["module"].map(sub).astype(int)
+    q["case"] = q["case"].astype(str)
+
+    # classify each distinct name once
+    names = q["name"].cat.categories.to_series()
+    drop = names.str.extract(DROP_RE)[0]
+    kind_drop = q["name"].map(drop.notna()).astype(bool).to_numpy()
+    drop_total = q["name"].map(drop == "").astype(bool).to_numpy()
+    kind_mark = q["name"].map(names.str.contains(MARK_RE) & drop.isna()).astype(bool).to_numpy()
+    fwd_rank = q["name"].map(pd.Series({n: i for i, n in enumerate(FWD_NAMES)})).astype(float).to_numpy()
+    kind_fwd = ~np.isnan(fwd_rank)
+
+    # a module with a drop total uses it; otherwise its per-reason counts are summed
+    has_total = q[kind_drop & drop_total].groupby(KEYS + ["module"], observed=True).size()
+    own = pd.MultiIndex.from_frame(q[KEYS + ["module"]]).isin(has_total.index)
+    drops = _rollup(q, kind_drop & (drop_total | ~own))
+    marks = _rollup(q, kind_mark)
+    fwd = _rollup(q, kind_fwd, pick=pd.Series(fwd_rank, index=q.index))
+
+    out = pd.concat({"drops": drops, "marks": marks, "forwarded": fwd}, axis=1)
+    out = out.reindex(q.drop_duplicates(KEYS).set_index(KEYS).index).fillna(0.0)
+    out["drop_frac"] = out["drops"] / (out["forwarded"] + out["drops"]).where(lambda s: s > 0)
+    out["mark_frac"] = out["marks"] / out["forwarded"].where(lambda s: s > 0)
+    return out.reset_index().sort_values(KEYS).reset_index(drop=True)[QUEUE_COLUMNS]
+
+
+def case_totals(queues):
+    """Fabric-wide totals per case, with the grid parameters parsed from the case name."""
+    import pandas as pd
+    from catalog import params_from_name
+    g = queues.groupby("case")
+    tot = g[["drops", "marks", "forwarded"]].sum()
+    tot["queues"] = g.size()
+    tot["queues_dropping"] = g["drops"].apply(lambda s: int((s > 0).sum()))
+    tot["drop_frac"] = tot["drops"] / (tot["forwarded"] + tot["drops"]).where(lambda s: s > 0)
+    tot["mark_frac"] = tot["marks"] / tot["forwarded"].where(lambda s: s > 0)
+    tot = tot.reset_index()
+    params = pd.DataFrame([params_from_name(c) or {} for c in tot["case"]],
+                          columns=["K", "L", "N", "scenario", "seed"])
+    return pd.concat([tot, params], axis=1)
+
+
+def scalar_metrics(path):
+    """Catalog columns (drops, marks, forwarded) of one run's scalars; {} without queue scalars."""
+    if not path or not os.path.exists(path):
+        return {}
+    q = queue_accounting(load_scalars([path]))
+    if q.empty:
+        return {}
+    return {"drops": int(q["drops"].sum()), "marks": int(q["marks"].sum()), "forwarded": int(q["forwarded"].sum())}
+
+
+def join_fct(totals, summary_csv):
+    """FCT summary rows (fct_extract.py) with the scalar totals of their case."""
+    import pandas as pd
+    fct = pd.read_csv(summary_csv)
+    fct["case"] = fct["file"].astype(str).str.replace(r"(_vectors)?\.(csv|vec)$", "", regex=True)
+    return fct.merge(totals, on="case", how="left")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Scalar ingest and per-queue drop/mark accounting")
+    ap.add_argument("sources", nargs="*", help="*_scalars.csv or .sca files (default results/*_scalars.csv)")
+    ap.add_argument("--out", default=os.path.join(RES_DIR, "scalar_queues.csv"), help="Per-queue table")
+    ap.add_argument("--totals", default=os.path.join(RES_DIR, "scalar_totals.csv"), help="Per-case totals")
+    ap.add_argument("--fct-summary", help="Join the totals onto this FCT summary CSV (writes <stem>_drops.csv)")
+    ap.add_argument("--query", metavar="REGEX", help="Print matching scalar names per case instead (names vary by INET version)")
+    ap.add_argument("--top", type=int, default=10, help="Print the N cases with most drops")
+    args = ap.parse_args()
+
+    paths = args.sources or sorted(glob.glob(os.path.join(RES_DIR, "*_scalars.csv")))
+    for p in [p for p in paths if not os.path.isfile(p)]:
+        print(f"[warn] missing: {p}", file=sys.stderr)
+    paths = [p for p in paths if os.path.isfile(p)]
+    if not paths:
+        sys.exit("[ERR] no scalar files")
+    df = load_scalars(paths)
+    print(f"[ok] {len(df)} scalars from {len(paths)} files ({df['case'].nunique()} cases)")
+
+    if args.query:
+        hit = df[df["name"].astype(str).str.contains(args.query)]
+        agg = hit.groupby(["name", "case"], observed=True)["value"].agg(["count", "sum"])
+        print(agg.to_string() if len(agg) else f"[warn] no scalar name matches {args.query}")
+        sys.exit(0)
+
+    queues = queue_accounting(df)
+    if queues.empty:
+        sys.exit("[ERR] no queue scalars (enable **.scalar-recording)")
+    totals = case_totals(queues)
+    for path, table in ((args.out, queues), (args.totals, totals)):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        table.to_csv(path, index=False)
+    print(f"[ok] wrote {args.out} ({len(queues)} queues) and {args.totals} ({len(totals)} cases)")
+    if args.fct_summary:
+        out = os.path.splitext(args.fct_summary)[0] + "_drops.csv"
+        join_fct(totals, args.fct_summary).to_csv(out, index=False)
+        print(f"[ok] wrote {out}")
+    if args.top > 0:
+        cols = ["case", "drops", "marks", "forwarded", "drop_frac", "mark_frac", "queues_dropping"]
+        print(totals.sort_values(["drops", "marks"], ascending=False)[cols].head(args.top).to_string(index=False))
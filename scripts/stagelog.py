@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Per-stage cost records for grid cases (JSON lines) and a report over them.
+
+Each stage (traffic, opp_run, export_vec/sca, vecstore, queues, metrics, plot)
+appends one line to a stages.jsonl:
+    {"case", "stage", "rc", "wall_s", "cpu_user_s", "cpu_sys_s", "peak_rss_mb",
+     "in_bytes", "out_bytes", "files": {name: bytes}, "events", "events_per_s", "ts"}
+CPU time and peak RSS come from os.wait4 on the stage's own child process, so
+concurrent cases do not mix. In-process stages (Timer) record getrusage deltas
+of the worker and its VmHWM after a reset, i.e. the stage's own peak. For opp_run, events and ev/sec are taken from
+Cmdenv's progress and end-of-run lines when present.
+
+scripts/grid.py writes work/<case>/stages.jsonl. run_grid.sh wraps each command
+with `stagelog.py run` into results/stages.jsonl. `report` ranks stages and
+cases by cost across a grid.
+
+Usage:
+    python scripts/stagelog.py run --jsonl results/stages.jsonl --case C --stage opp_run --events -- opp_run ...
+    python scripts/stagelog.py report                      # results/stages.jsonl + work/*/stages.jsonl
+    python scripts/stagelog.py report work/*/stages.jsonl --top 20 --by cpu_s
+"""
+
+import os, re, sys, json, glob, time, argparse, subprocess as sp
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Cmdenv: "** Event #123456   t=0.5 ... ev/sec=1.2e+06" and "... at t=60s, event #123456"
+EVENT_RE = re.compile(r"[Ee]vent #(\d+)")
+EVSEC_RE = re.compile(r"ev/sec=([\d.]+(?:[eE][+-]?\d+)?)")
+
+
+def _usage(ru, wall):
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = ru.ru_maxrss / (1 << 20) if sys.platform == "darwin" else ru.ru_maxrss / 1024.0
+    return {"wall_s": wall, "cpu_user_s": ru.ru_utime, "cpu_sys_s": ru.ru_stime, "peak_rss_mb": rss}
+
+
+def timed_run(cmd, log_path=None, cwd=None, scan=None):
+    """Run cmd (output to log_path, or echoed when None); returns (rc, usage).
+
+    scan: callable fed every output line when output is echoed (log files are scanned afterwards).
+    """
+    t0 = time.perf_counter()
+    if log_path:
+        with open(log_path, "w") as log:
+            p = sp.Popen(cmd, cwd=cwd, stdout=log, stderr=sp.STDOUT)
+            _, status, ru = os.wait4(p.pid, 0)
+    else:
+        p = sp.Popen(cmd, cwd=cwd, stdout=sp.PIPE, stderr=sp.STDOUT, text=True, bufsize=1)
+        for line in p.stdout:
+            sys.stdout.write(line)
+            if scan:
+                scan(line)
+        p.stdout.close()
+        _, status, ru = os.wait4(p.pid, 0)
+    p.returncode = os.waitstatus_to_exitcode(status)
+    return p.returncode, _usage(ru, time.perf_counter() - t0)
+
+
+class EventScan:
+    """Last event number and ev/sec seen in Cmdenv output."""
+
+    def __init__(self):
+        self.events = None
+        self.evsec = None
+
+    def __call__(self, line):
+        for m in EVENT_RE.finditer(line):
+            self.events = int(m.group(1))
+        m = EVSEC_RE.search(line)
+        if m:
+            self.evsec = float(m.group(1))
+
+    def feed_file(self, path):
+        if path and os.path.exists(path):
+            with open(path, errors="replace") as f:
+                for line in f:
+                    self(line)
+        return self
+
+    def result(self, wall):
+        if self.events is None:
+            return {}
+        # prefer the simulator's own rate; otherwise events over the stage wall time
+        return {"events": self.events, "events_per_s": self.evsec or (self.events / wall if wall > 0 else None)}
+
+
+def _reset_hwm():
+    """Reset this process's VmHWM to its current RSS (Linux >= 4.0); False where unsupported."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _hwm_mb():
+    try:
+        with open("/proc/self/status") as f:
+            m = re.search(r"^VmHWM:\s+(\d+) kB", f.read(), re.M)
+    except OSError:
+        return None
+    return int(m.group(1)) / 1024.0 if m else None
+
+
+class Timer:
+    """Wall time and getrusage(RUSAGE_SELF) deltas of an in-process stage.
+
+    Peak RSS is the stage's own when the high-water mark can be reset
+    (/proc/self/clear_refs); otherwise it is the process's maxrss so far and the
+    record carries "rss_cumulative": true.
+    """
+
+    def __enter__(self):
+        import resource
+        self.own_rss = _reset_hwm()
+        self.t0, self.ru0 = time.perf_counter(), resource.getrusage(resource.RUSAGE_SELF)
+        return self
+
+    def __exit__(self, *exc):
+        import resource
+        ru = resource.getrusage(resource.RUSAGE_SELF)
+        self.usage = _usage(ru, time.perf_counter() - self.t0)
+        self.usage["cpu_user_s"] = ru.ru_utime - self.ru0.ru_utime
+        self.usage["cpu_sys_s"] = ru.ru_stime - self.ru0.ru_stime
+        hwm = _hwm_mb() if self.own_rss else None
+        if hwm is not None:
+            self.usage["peak_rss_mb"] = hwm
+        else:
+            self.usage["rss_cumulative"] = True
+        return False
+
+
+def file_sizes(paths):
+    return {os.path.basename(p): os.path.getsize(p) for p in paths if p and os.path.isfile(p)}
+
+
+def record(jsonl, case, stage, rc, usage, inputs=(), outputs=(), **extra):
+    """Append one stage record; returns it."""
+    fin, fout = file_sizes(inputs), file_sizes(outputs)
+    rec = {"case": case, "stage": stage, "rc": rc, **usage,
+           "in_bytes": sum(fin.values()), "out_bytes": sum(fout.values()), "files": {**fin, **fout},
+           **extra, "ts": time.time()}
+    os.makedirs(os.path.dirname(os.path.abspath(jsonl)), exist_ok=True)
+    with open(jsonl, "a") as f:
+        f.write(json.dumps(rec) + "\n")
+    return rec
+
+
+def load_records(paths, latest=True):
+    import pandas as pd
+    rows = []
+    for p in paths:
+        with open(p) as f:
+            rows += [json.loads(line) for line in f if line.strip()]
+    df = pd.DataFrame(rows)
+    if df.empty:
+        return df
+    df["cpu_s"] = df["cpu_user_s"].fillna(0.0) + df["cpu_sys_s"].fillna(0.0)
+    if latest:
+        # a resumed or re-run case keeps only its newest record per stage
+        df = df.sort_values("ts").drop_duplicates(["case", "stage"], keep="last")
+    return df
+
+
+def report(df, by="wall_s", top=10):
+    """(per-stage totals, per-case totals, top case x stage rows), each sorted by `by`."""
+    agg = {"runs": ("case", "count"), "wall_s": ("wall_s", "sum"), "cpu_s": ("cpu_s", "sum"),
+           "mean_wall_s": ("wall_s", "mean"), "max_wall_s": ("wall_s", "max"),
+           "peak_rss_mb": ("peak_rss_mb", "max"), "out_bytes": ("out_bytes", "sum"), "failed": ("rc", lambda s: int((s != 0).sum()))}
+    stages = df.groupby("stage").agg(**agg).sort_values(by, ascending=False)
+    stages.insert(2, "share", stages["wall_s"] / max(stages["wall_s"].sum(), 1e-12))
+    cases = df.groupby("case").agg(wall_s=("wall_s", "sum"), cpu_s=("cpu_s", "sum"),
+                                   peak_rss_mb=("peak_rss_mb", "max"), out_bytes=("out_bytes", "sum"))
+    cases = cases.sort_values(by if by in cases.columns else "wall_s", ascending=False)
+    cols = ["case", "stage", "wall_s", "cpu_s", "peak_rss_mb", "in_bytes", "out_bytes"] + \
+           [c for c in ("events", "events_per_s") if c in df.columns]
+    rows = df.sort_values(by, ascending=False)[cols].head(top)
+    return stages, cases.head(top), rows
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Per-stage cost records of grid cases")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("run", help="Run one stage command and append its record")
+    p.add_argument("--jsonl", required=True)
+    p.add_argument("--case", required=True)
+    p.add_argument("--stage", required=True)
+    p.add_argument("--cwd")
+    p.add_argument("--log", help="Send output to this file instead of stdout")
+    p.add_argument("--in", dest="inputs", nargs="*", default=[], help="Input files to size")
+    p.add_argument("--out", dest="outputs", nargs="*", default=[], help="Output files to size")
+    p.add_argument("--events", action="store_true", help="Scan Cmdenv output for event count and ev/sec")
+    p.add_argument("command", nargs=argparse.REMAINDER, help="-- command ...")
+    p = sub.add_parser("report", help="Rank stages and cases by cost")
+    p.add_argument("jsonl", nargs="*", help="stages.jsonl files (default results/stages.jsonl and work/*/stages.jsonl)")
+    p.add_argument("--by", default="wall_s", choices=["wall_s", "cpu_s", "peak_rss_mb", "out_bytes"])
+    p.add_argument("--top", type=int, default=10)
+    p.add_argument("--all", action="store_true", help="Keep every record, not just the newest per (case, stage)")
+    p.add_argument("--csv", help="Also write the per-stage table here")
+    args = ap.parse_args()
+
+    if args.cmd == "run":
+        cmd = args.command[1:] if args.command[:1] == ["--"] else args.command
+        if not cmd:
+            sys.exit("[ERR] no command after --")
+        scan = EventScan() if args.events else None
+        rc, usage = timed_run(cmd, args.log, args.cwd, scan)
+        extra = scan.feed_file(args.log).result(usage["wall_s"]) if scan else {}
+        record(args.jsonl, args.case, args.stage, rc, usage, args.inputs, args.outputs, **extra)
+        return rc
+
+    import pandas as pd
+    paths = args.jsonl or [p for p in [os.path.join(ROOT_DIR, "results", "stages.jsonl")] if os.path.exists(p)] + \
+        sorted(glob.glob(os.path.join(ROOT_DIR, "work", "*", "stages.jsonl")))
+    paths = [p for p in paths if os.path.exists(p)]
+    df = load_records(paths, latest=not args.all)
+    if df.empty:
+        sys.exit("[ERR] no stage records found")
+    stages, cases, rows = report(df, args.by, args.top)
+    with pd.option_context("display.width", 200, "display.max_columns", 20):
+        print(f"== stages by {args.by} ({df['case'].nunique()} cases, {len(df)} records)")
+        print(stages.to_string(float_format=lambda v: f"{v:.3f}"))
+        print(f"\n== top {args.top} cases by {args.by if args.by in cases.columns else 'wall_s'}")
+        print(cases.to_string(float_format=lambda v: f"{v:.3f}"))
+        print(f"\n== top {args.top} case x stage")
+        print(rows.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+    if args.csv:
+        stages.to_csv(args.csv)
+        print(f"[ok] wrote {args.csv}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
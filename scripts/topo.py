@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Topology generator: NED network plus a machine-readable port map.
+
+Two families:
+- leafspine: `leaves` ToRs, each uplinked to every one of `spines` spines, with
+  `hosts_per_leaf` hosts per ToR;
+- fattree:   k-ary fat-tree (k pods of k/2 edge + k/2 aggregation switches,
+  (k/2)^2 cores, k^3/4 hosts).
+The NED is written with explicit gate indices (no `pppg++`), one line per link.
+The same link list produces the port map <Network>.ports.json, so the two
+cannot disagree. The map records:
+- host_port: host h -> [ToR, ppp index]. The ToR egress queue towards h is
+  <ToR>.ppp[i].queue;
+- uplinks:   switch -> [[ppp, peer switch, peer ppp], ...] for every upward port;
+- asym:      [switch, ppp] of the uplink throttled in the asym scenario.
+Leaf-spine port order matches the hand-written SmallLeafSpine: uplinks to
+spine[0..S-1] are ppp[0..S-1], and the hosts follow. Spine ppp[i] faces leaf[i].
+
+Traffic generators, grid runners, the recording scopes and the analysis
+defaults read the map through load(), which defaults to
+sim/dcn/SmallLeafSpine.ports.json.
+
+Usage:
+    python scripts/topo.py leafspine --leaves 4 --spines 2 --hosts-per-leaf 3 --name SmallLeafSpine
+    python scripts/topo.py leafspine --leaves 16 --spines 4 --hosts-per-leaf 16     # -> sim/dcn/LeafSpine16x4x16.*
+    python scripts/topo.py fattree --k 8
+    python scripts/topo.py show sim/dcn/FatTreeK8.ports.json --host 37
+    python scripts/topo.py show --get asym_line                                    # for run_grid.sh
+"""
+
+import os, sys, json, argparse
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+NED_DIR = os.path.join(ROOT_DIR, "sim", "dcn")
+PACKAGE = "dcn"
+DEFAULT_MAP = os.environ.get("DCN_TOPO", os.path.join(NED_DIR, "SmallLeafSpine.ports.json"))
+ASYM_RATE = "5Gbps"
+
+
+def _links_map(kind, params, host_port, links, asym, nodes):
+    uplinks = {}
+    for a, pa, b, pb in links:
+        # links are written lower tier first: a's port is an uplink
+        uplinks.setdefault(a, []).append([pa, b, pb])
+    return {"network": None, "package": PACKAGE, "kind": kind, "params": params, "nodes": nodes,
+            "hosts": len(host_port), "host_port": host_port, "uplinks": uplinks, "links": links, "asym": asym}
+
+
+def leaf_spine(leaves=4, spines=2, hosts_per_leaf=3, name=None):
+    """Port map of a two-tier leaf-spine fabric."""
+    if min(leaves, spines, hosts_per_leaf) < 1:
+        raise ValueError("leaves, spines and hosts_per_leaf must be >= 1")
+    links = [[f"leaf[{i}]", s, f"spine[{s}]", i] for i in range(leaves) for s in range(spines)]
+    host_port = [[f"leaf[{h // hosts_per_leaf}]", spines + h % hosts_per_leaf] for h in range(leaves * hosts_per_leaf)]
+    nodes = {"spine": [spines, leaves], "leaf": [leaves, spines + hosts_per_leaf]}
+    # the third ToR's first uplink, as in the original asym scenario
+    d = _links_map("leafspine", {"leaves": leaves, "spines": spines, "hosts_per_leaf": hosts_per_leaf},
+                   host_port, links, [f"leaf[{min(2, leaves - 1)}]", 0], nodes)
+    d["network"] = name or f"LeafSpine{leaves}x{spines}x{hosts_per_leaf}"
+    return d
+
+
+def fat_tree(k=4, name=None):
+    """Port map of a k-ary fat-tree (edge / agg / core)."""
+    if k < 2 or k % 2:
+        raise ValueError(f"fat-tree k must be even and >= 2, got {k}")
+    h = k // 2
+    links = []
+    for p in range(k):
+        for i in range(h):
+            for j in range(h):
+                # edge ppp[j] -> agg j of the pod, agg ppp[i] <- edge i
+                links.append([f"edge[{p * h + i}]", j, f"agg[{p * h + j}]", i])
+    for p in range(k):
+        for j in range(h):
+            for m in range(h):
+                # agg ppp[h+m] -> core j*h+m, core ppp[p] <- pod p
+                links.append([f"agg[{p * h + j}]", h + m, f"core[{j * h + m}]", p])
+    host_port = [[f"edge[{x // h}]", h + x % h] for x in range(k * k * k // 4)]
+    nodes = {"core": [h * h, k], "agg": [k * h, k], "edge": [k * h, k]}
+    d = _links_map("fattree", {"k": k}, host_port, links, [f"edge[{min(2, k * h - 1)}]", 0], nodes)
+    d["network"] = name or f"FatTreeK{k}"
+    return d
+
+
+def ned_text(d, cmd=None):
+    """NED source of a port map: one submodule vector per tier, one line per link."""
+    hdr = f"// Generated by scripts/topo.py{' ' + cmd if cmd else ''}; do not edit.\n" \
+          f"// Port map: {d['network']}.ports.json\n"
+    lines = [hdr.rstrip("\n"), f"package {d['package']};", "",
+             "import inet.node.inet.Router;", "import inet.node.inet.StandardHost;",
+             "import inet.networklayer.configurator.ipv4.Ipv4NetworkConfigurator;", "",
+             f"network {d['network']}", "{", "    submodules:",
+             '        configurator: Ipv4NetworkConfigurator { parameters: @display("p=60,40"); }']
+    y = 80
+    for tier, (count, ports) in d["nodes"].items():
+        lines.append(f'        {tier}[{count}]: Router {{ parameters: @display("p=150,{y},row,120;i=block/router"); '
+                     f'gates: pppg[{ports}]; }}')
+        y += 100
+    lines.append(f'        host[{d["hosts"]}]: StandardHost {{ parameters: @display("p=60,{y},row,60;i=device/laptop"); '
+                 f'gates: pppg[1]; }}')
+    lines += ["    connections:"]
+    lines += [f"        {a}.pppg[{pa}] <--> EthChan <--> {b}.pppg[{pb}];" for a, pa, b, pb in d["links"]]
+    lines += [f"        host[{x}].pppg[0] <--> EthChan <--> {tor}.pppg[{p}];" for x, (tor, p) in enumerate(d["host_port"])]
+    lines += ["}", ""]
+    return "\n".join(lines)
+
+
+def write(d, out_dir=NED_DIR, cmd=None):
+    """Write <network>.ned and <network>.ports.json into out_dir; returns both paths."""
+    os.makedirs(out_dir, exist_ok=True)
+    ned = os.path.join(out_dir, f"{d['network']}.ned")
+    ports = os.path.join(out_dir, f"{d['network']}.ports.json")
+    with open(ned, "w") as f:
+        f.write(ned_text(d, cmd))
+    with open(ports, "w") as f:
+        # one top-level key per line, lists inline
+        f.write("{\n" + ",\n".join(f" {json.dumps(k)}: {json.dumps(v)}" for k, v in d.items()) + "\n}\n")
+    return ned, ports
+
+
+class PortMap:
+    """Lookups over a port map; every query is a list index or dict hit."""
+
+    def __init__(self, d):
+        self.d = d
+        self.network = d["network"]
+        self.qualified = f"{d['package']}.{d['network']}"
+        self.hosts = d["hosts"]
+        self.host_port = [tuple(x) for x in d["host_port"]]
+        # (switch, ppp) -> what the port faces
+        self.peers = {(tor, p): f"host[{x}]" for x, (tor, p) in enumerate(self.host_port)}
+        for a, pa, b, pb in d["links"]:
+            self.peers[(a, pa)] = b
+            self.peers[(b, pb)] = a
+        self.tor_hosts = {}
+        for x, (tor, _) in enumerate(self.host_port):
+            self.tor_hosts.setdefault(tor, []).append(x)
+
+    def tor(self, host):
+        return self.host_port[host][0]
+
+    def rx_queue(self, host):
+        """ToR egress queue towards `host`, e.g. leaf[0].ppp[2].queue."""
+        tor, p = self.host_port[host]
+        return f"{tor}.ppp[{p}].queue"
+
+    def uplinks(self, switch):
+        """[(ppp, peer, peer ppp)] of a switch's upward ports."""
+        return [tuple(u) for u in self.d["uplinks"].get(switch, [])]
+
+    def peer(self, module):
+        """What the port of a `...<switch>.ppp[i]...` module path faces (None if unknown)."""
+        parts = module.split(".")
+        for i, part in enumerate(parts[1:], 1):
+            if part.startswith("ppp[") and part.endswith("]"):
+                return self.peers.get((parts[i - 1], int(part[4:-1])))
+        return None
+
+    def asym_line(self, rate=ASYM_RATE):
+        sw, p = self.d["asym"]
+        return f"*.{sw}.ppp[{p}].channel.datarate={rate}"
+
+    def rx_recording(self, host=0):
+        """Runtime overrides that record the receive-side app vectors of `host`."""
+        app = f"**.host[{host}].app[*]"
+        return [f"--{app}.statistic-recording=true",
+                f"--{app}.rcvdBytes.vector-recording=true",
+                f"--{app}.rcvdPk:vector(packetBytes).vector-recording=true",
+                f"--{app}.endToEndDelay.vector-recording=true",
+                f"--{app}.packetReceived.result-recording-modes=+vector"]
+
+
+_LOADED = {}
+
+
+def load(path=None):
+    """PortMap of a ports.json (default DEFAULT_MAP); cached per path."""
+    path = os.path.abspath(path or DEFAULT_MAP)
+    if path not in _LOADED:
+        with open(path) as f:
+            _LOADED[path] = PortMap(json.load(f))
+    return _LOADED[path]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Generate a leaf-spine / fat-tree NED network and its port map")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("leafspine")
+    p.add_argument("--leaves", type=int, default=4)
+    p.add_argument("--spines", type=int, default=2)
+    p.add_argument("--hosts-per-leaf", type=int, default=3)
+    p = sub.add_parser("fattree")
+    p.add_argument("--k", type=int, default=4, help="Switch radix (even)")
+    for name in ("leafspine", "fattree"):
+        p = sub.choices[name]
+        p.add_argument("--name", help="Network name (default LeafSpine<L>x<S>x<H> / FatTreeK<k>)")
+        p.add_argument("--out-dir", default=NED_DIR)
+    p = sub.add_parser("show", help="Summary of a port map, or the ports of one host")
+    p.add_argument("ports", nargs="?", default=DEFAULT_MAP)
+    p.add_argument("--host", type=int)
+    p.add_argument("--get", choices=["network", "hosts", "asym_line", "rx_queue"],
+                   help="Print one value (rx_queue of --host, default host 0) for shell scripts")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "show":
+        pm = load(args.ports)
+        if args.get:
+            print({"network": pm.qualified, "hosts": pm.hosts, "asym_line": pm.asym_line(),
+                   "rx_queue": pm.rx_queue(args.host or 0)}[args.get])
+        elif args.host is not None:
+            if not 0 <= args.host < pm.hosts:
+                sys.exit(f"[ERR] host {args.host} not in 0..{pm.hosts - 1}")
+            tor = pm.tor(args.host)
+            print(f"host[{args.host}]: rx queue {pm.rx_queue(args.host)}")
+            for p, peer, pp in pm.uplinks(tor):
+                print(f"  uplink {tor}.ppp[{p}] -> {peer}.ppp[{pp}]")
+        else:
+            print(f"{pm.qualified}: {pm.hosts} hosts, {len(pm.d['links'])} fabric links, "
+                  f"{', '.join(f'{t}[{n}]' for t, (n, _) in pm.d['nodes'].items())}; asym {pm.asym_line()}")
+        return 0
+    try:
+        if args.cmd == "leafspine":
+            d = leaf_spine(args.leaves, args.spines, args.hosts_per_leaf, args.name)
+        else:
+            d = fat_tree(args.k, args.name)
+    except ValueError as e:
+        sys.exit(f"[ERR] {e}")
+    cmd = " ".join([args.cmd] + [f"--{k.replace('_', '-')} {v}" for k, v in d["params"].items()]
+                   + ([f"--name {args.name}"] if args.name else []))
+    ned, ports = write(d, args.out_dir, cmd)
+    print(f"[ok] wrote {ned} and {ports} ({d['hosts']} hosts, {len(d['links'])} fabric links)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,22 +1,26 @@
 #!/usr/bin/env python3
-import random, math, pathlib, sys
+import os, random, math, pathlib, sys, argparse
 from collections import defaultdict
+import topo
 
 HOSTS_PER_LEAF = 3
 LEAVES = 4
-TOTAL_HOSTS = HOSTS_PER_LEAF * LEAVES
+TOTAL_HOSTS = topo.load().hosts   # port map (scripts/topo.py), SmallLeafSpine = LEAVES x HOSTS_PER_LEAF
 
-LOAD = float(sys.argv[1]) if len(sys.argv) > 1 else 0.6
+LOAD = 0.6
 MICE_FRAC = 0.8
 MICE_MIN, MICE_MAX = 64*1024, 1*1024*1024
 ELEPHANT_MIN = 64*1024*1024
 DURATION = 50.0
 SEED = 1
-random.seed(SEED)
+BATCH = 1 << 16   # flows per vectorized batch (bounds memory in batched mode)
 
-def pick_host(exclude=None):
+def flow_gap(load):
+    return (1.0 - load) * 0.02 + 0.002  # 控制总体负载
+
+def pick_host(exclude=None, total_hosts=TOTAL_HOSTS):
     while True:
-        h = random.randrange(TOTAL_HOSTS)
+        h = random.randrange(total_hosts)
         if h != exclude:
             return h
 
@@ -24,25 +28,89 @@ def sample_mice():
     a, b = math.log(MICE_MIN), math.log(MICE_MAX)
     return int(math.exp(random.uniform(a, b)))
 
-def gen_flows():
+def gen_flows(load=LOAD, duration=DURATION, total_hosts=TOTAL_HOSTS):
     flows, t = [], 0.0
-    gap = (1.0 - LOAD) * 0.02 + 0.002  # 控制总体负载
-    while t < DURATION:
-        s = random.randrange(TOTAL_HOSTS); d = pick_host(s)
+    gap = flow_gap(load)
+    while t < duration:
+        s = random.randrange(total_hosts); d = pick_host(s, total_hosts)
         size = sample_mice() if random.random() < MICE_FRAC else ELEPHANT_MIN
         flows.append((t, s, d, size))
         t += random.expovariate(1.0 / gap)
     return flows
 
-def write_inc(flows, path):
+def gen_flows_batched(load=LOAD, duration=DURATION, total_hosts=TOTAL_HOSTS, seed=SEED, batch=BATCH):
+    """Yield (t, src, dst, size) NumPy arrays, BATCH flows at a time, in start-time order.
+
+    Same workload model as gen_flows (Poisson arrivals, uniform src/dst pairs,
+    log-uniform mice / fixed elephants), drawn with a NumPy Generator.
+    """
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    gap = flow_gap(load)
+    a, b = math.log(MICE_MIN), math.log(MICE_MAX)
+    t0 = 0.0
+    while t0 < duration:
+        ia = rng.exponential(gap, batch)
+        t = t0 + np.concatenate(([0.0], np.cumsum(ia[:-1])))
+        t0 = t[-1] + ia[-1]
+        n = int(np.searchsorted(t, duration))
+        t = t[:n]
+        s = rng.integers(0, total_hosts, n)
+        # uniform over the other hosts, no rejection loop
+        d = rng.integers(0, total_hosts - 1, n)
+        d += d >= s
+        mice = rng.random(n) < MICE_FRAC
+        size = np.where(mice, np.exp(rng.uniform(a, b, n)).astype(np.int64), ELEPHANT_MIN)
+        yield t, s, d, size
+
+APP_TEMPLATE = (
+    '**.host[%d].app[%d].typename = "TcpSessionApp"\n'
+    '**.host[%d].app[%d].active = true\n'
+    '**.host[%d].app[%d].connectAddress = "host[%d]"\n'
+    '**.host[%d].app[%d].connectPort = 80\n'
+    '**.host[%d].app[%d].tOpen = %.3fs\n'
+    '**.host[%d].app[%d].tSend = %.3fs\n'
+    '**.host[%d].app[%d].sendBytes = %dB\n'
+    '**.host[%d].app[%d].tClose = %.3fs\n'
+)
+
+# compact mode: per-app invariants hoisted into wildcards, written after the
+# per-flow keys (first match wins, so any specific line earlier still takes precedence)
+COMPACT_DEFAULTS = [
+    '**.host[*].app[*].typename = "TcpSessionApp"',
+    "**.host[*].app[*].active = true",
+    "**.host[*].app[*].connectPort = 80",
+    "**.host[*].app[*].tClose = this.tOpen + 3600s",
+]
+
+APP_TEMPLATE_COMPACT = (
+    '**.host[%d].app[%d].connectAddress = "host[%d]"\n'
+    '**.host[%d].app[%d].tOpen = %.3fs\n'
+    '**.host[%d].app[%d].tSend = %.3fs\n'
+    '**.host[%d].app[%d].sendBytes = %dB\n'
+)
+
+def write_inc(flows, path, compact=False):
+    from flowmanifest import ManifestWriter
     lines = ["# auto-generated by scripts/traffic.py"]
     by_host = defaultdict(list)
     for st, s, d, sz in flows:
         by_host[s].append((st, d, sz))
+    mw = ManifestWriter(path)
     for h, vec in by_host.items():
         lines.append(f"**.host[{h}].numApps = {len(vec)}")
+        mw.add([h] * len(vec), [d for _, d, _ in vec], range(len(vec)), [st for st, _, _ in vec],
+               [st + 0.010 for st, _, _ in vec], [sz for _, _, sz in vec])
         for i,(st,d,sz) in enumerate(vec):
             base=f"**.host[{h}].app[{i}]"
+            if compact:
+                lines += [
+                  f'{base}.connectAddress = "host[{d}]"',
+                  f"{base}.tOpen = {st:.3f}s",
+                  f"{base}.tSend = {st+0.010:.3f}s",
+                  f"{base}.sendBytes = {sz}B",
+                ]
+                continue
             lines += [
               f'{base}.typename = "TcpSessionApp"',
               f"{base}.active = true",
@@ -53,9 +121,85 @@ def write_inc(flows, path):
               f"{base}.sendBytes = {sz}B",
               f"{base}.tClose = {st+3600:.3f}s",
             ]
-    pathlib.Path(path).write_text("\n".join(lines))
+    if compact:
+        lines += COMPACT_DEFAULTS
+    body = mw.text("\n".join(lines) + "\n")
+    # new file renamed over the old one: hard-linked copies keep their content
+    tmp = f"{path}.tmp{os.getpid()}"
+    pathlib.Path(tmp).write_text(body + mw.trailer() + "\n")
+    os.replace(tmp, path)
+    mw.close()
+
+def write_inc_streaming(batches, path, total_hosts=TOTAL_HOSTS, compact=False):
+    """Stream flow batches to flows.inc and its flow manifest; app indices follow per-host arrival order.
+
+    numApps lines go last (ini key order does not matter), so nothing but the
+    per-host counters is kept across batches. Returns the number of flows.
+    """
+    import numpy as np
+    from flowmanifest import ManifestWriter
+    mw = ManifestWriter(path, total_hosts)
+    napps = np.zeros(total_hosts, dtype=np.int64)
+    total = 0
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "w") as f:
+        f.write(mw.text("# auto-generated by scripts/traffic.py (batched)\n"))
+        for t, s, d, size in batches:
+            n = len(t)
+            if n == 0:
+                continue
+            # rank of each flow among the batch's flows from the same host
+            order = np.argsort(s, kind="stable")
+            s_sorted = s[order]
+            first = np.searchsorted(s_sorted, s_sorted, side="left")
+            rank = np.empty(n, dtype=np.int64)
+            rank[order] = np.arange(n) - first
+            app = napps[s] + rank
+            napps += np.bincount(s, minlength=total_hosts)
+            mw.add(s, d, app, t, t + 0.010, size)
+            rows = zip(s.tolist(), app.tolist(), d.tolist(), t.tolist(), size.tolist())
+            if compact:
+                f.write(mw.text("".join(APP_TEMPLATE_COMPACT % (h, i, dst, h, i, st, h, i, st+0.010, h, i, sz)
+                                        for h, i, dst, st, sz in rows)))
+            else:
+                f.write(mw.text("".join(APP_TEMPLATE % (h, i, h, i, h, i, dst, h, i, h, i, st, h, i, st+0.010, h, i, sz, h, i, st+3600)
+                                        for h, i, dst, st, sz in rows)))
+            total += n
+        for h in np.flatnonzero(napps).tolist():
+            f.write(mw.text(f"**.host[{h}].numApps = {int(napps[h])}\n"))
+        if compact:
+            f.write(mw.text("\n".join(COMPACT_DEFAULTS) + "\n"))
+        f.write(mw.trailer() + "\n")
+    os.replace(tmp, path)
+    mw.close()
+    return total
 
 if __name__ == "__main__":
-    out = pathlib.Path(__file__).resolve().parents[1] / "sim" / "flows.inc"
-    write_inc(gen_flows(), out)
-    print("wrote", out)
+    ap = argparse.ArgumentParser(description="Generate a load-controlled mixed workload into flows.inc")
+    ap.add_argument("load", nargs="?", type=float, default=LOAD, help="Target load 0..1 (default 0.6)")
+    ap.add_argument("--batched", action="store_true", help="NumPy-batched generation with streaming output (10^6+ flows)")
+    ap.add_argument("--hosts-per-leaf", type=int, default=HOSTS_PER_LEAF)
+    ap.add_argument("--leaves", type=int, default=LEAVES)
+    ap.add_argument("--topo", help="Port map (scripts/topo.py) to take the host count from instead")
+    ap.add_argument("--cdf", help="Empirical flow sizes (scripts/workload.py built-in or CSV) at the exact load; implies --batched")
+    ap.add_argument("--duration", type=float, default=DURATION, help="Seconds of arrivals (default 50)")
+    ap.add_argument("--seed", type=int, default=SEED)
+    ap.add_argument("--out", help="Output path (default sim/flows.inc)")
+    ap.add_argument("--compact", action="store_true", help="Hoist invariant app parameters into **.host[*].app[*] wildcards")
+    args = ap.parse_args()
+
+    total_hosts = topo.load(args.topo).hosts if args.topo else args.hosts_per_leaf * args.leaves
+    out = pathlib.Path(args.out) if args.out else pathlib.Path(__file__).resolve().parents[1] / "sim" / "flows.inc"
+    if args.cdf:
+        from workload import load_cdf, gen_cdf_flows
+        n = write_inc_streaming(gen_cdf_flows(load_cdf(args.cdf), args.load, args.duration, total_hosts, args.seed),
+                                out, total_hosts, args.compact)
+        print("wrote", out, f"({n} flows, {args.cdf})")
+    elif args.batched:
+        n = write_inc_streaming(gen_flows_batched(args.load, args.duration, total_hosts, args.seed), out, total_hosts,
+                                args.compact)
+        print("wrote", out, f"({n} flows)")
+    else:
+        random.seed(args.seed)
+        write_inc(gen_flows(args.load, args.duration, total_hosts), out, args.compact)
+        print("wrote", out)
@@ -1,66 +1,200 @@
 #!/usr/bin/env python3
-import random, pathlib, sys
-from collections import defaultdict
+"""
+Incast workload into flows.inc: ROUNDS bursts of N mice to host[0] plus one elephant.
+
+Every (N, LOAD, SEED) draws from its own NumPy stream: the child of
+SeedSequence(SEED) keyed by (N, LOAD), i.e. what SeedSequence.spawn hands out,
+but addressed by the combination instead of its position in a list. A workload
+is therefore the same whether it is written alone or as part of any grid.
+With --out-dir, every combination of the --N / --load / --seed lists is written
+once (duplicates dropped) as incast_N<N>_L<LOAD>_s<SEED>.inc, -j in parallel.
 
-# 参数
-N = int(sys.argv[1]) if len(sys.argv) > 1 else 8   # incast 发送端数量
-LOAD = float(sys.argv[2]) if len(sys.argv) > 2 else None  # 目标负载(0..1)，可选：用于缩放 GAP
-SEED = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+Usage:
+    python scripts/traffic_incast.py N [LOAD] [SEED] [OUT] [--compact] [--topo sim/dcn/FatTreeK8.ports.json]
+    python scripts/traffic_incast.py --N 8 16 --load 0.3 0.6 0.8 --seed 1 2 3 4 5 --out-dir results/flows/workloads -j 4
+    from traffic_incast import write_incast; write_incast(8, 0.6, 1, "work/x/flows.inc")
+"""
+import os, pathlib, sys, argparse, itertools
+from collections import defaultdict
+import topo
 
 # burst 轮数及间隔（可受 LOAD 缩放）
 ROUNDS = 20
 BASE_GAP = 0.10
-GAP = (1.0 - LOAD) * BASE_GAP + 0.02 if LOAD is not None else BASE_GAP
-random.seed(SEED)
 
-# 拓扑规模（与你的 NED 匹配：4 个 leaf、每 leaf 3 台主机）
-HOSTS_PER_LEAF = 3
-LEAVES = 4
-TOTAL = HOSTS_PER_LEAF * LEAVES
+# 拓扑规模取自端口映射（scripts/topo.py；默认 SmallLeafSpine：4 个 leaf、每 leaf 3 台主机）
+TOTAL = topo.load().hosts
 
 victim = 0                     # 所有 incast 都打到 host[0]
 MICE = 512 * 1024              # 512KB 短流
 ELEPHANT = 64 * 1024 * 1024    # 64MB 长流
 
-by_host = defaultdict(list)
-t = 0.0
-for r in range(ROUNDS):
-    # 选 N 个不同的发送端，避开 victim
-    senders = set()
-    while len(senders) < N:
-        s = random.randrange(TOTAL)
-        if s != victim:
-            senders.add(s)
-    senders = sorted(senders)
-    # 让每个 sender 发一个 mice 到 victim；轻微错开启动时间
-    for idx, s in enumerate(senders):
-        tOpen = t + 0.000 * idx
-        tSend = t + 0.010 * idx
-        by_host[s].append((tOpen, tSend, victim, MICE))
-    t += GAP
-
-# 让一条 elephant 与 incast 重叠，观察短长流共存
-src_ele = (victim + 1) % TOTAL
-by_host[src_ele].append((0.0, 0.01, victim, ELEPHANT))
-
-# 写 flows.inc：先写 numApps，再写每个 app 的参数
-lines = ["# auto-generated incast by traffic_incast.py"]
-for h, vec in by_host.items():
-    lines.append(f"**.host[{h}].numApps = {len(vec)}")
-for h, vec in by_host.items():
-    for i, (tOpen, tSend, dst, bytes_) in enumerate(vec):
-        base = f"**.host[{h}].app[{i}]"
+def workload_seq(N, load, seed):
+    """SeedSequence of one (N, load, seed) workload: child (N, load in 1e-3 steps) of SeedSequence(seed)."""
+    import numpy as np
+    key = (int(N),) if load is None else (int(N), int(round(float(load) * 1000)))
+    return np.random.SeedSequence(int(seed), spawn_key=key)
+
+def gen_incast(N=8, load=None, seed=1, hosts=TOTAL):
+    """{sender host: [(tOpen, tSend, dst, bytes)]} for N senders per round (load scales the gap)."""
+    import numpy as np
+    if not 0 < N < hosts:
+        raise ValueError(f"N={N} needs 1..{hosts - 1} senders besides host[{victim}]")
+    gap = (1.0 - load) * BASE_GAP + 0.02 if load is not None else BASE_GAP
+    rng = np.random.default_rng(workload_seq(N, load, seed))
+    others = np.delete(np.arange(hosts), victim)
+    by_host = defaultdict(list)
+    t = 0.0
+    for r in range(ROUNDS):
+        # 选 N 个不同的发送端，避开 victim
+        senders = sorted(rng.choice(others, N, replace=False).tolist())
+        # 让每个 sender 发一个 mice 到 victim；轻微错开启动时间
+        for idx, s in enumerate(senders):
+            tOpen = t + 0.000 * idx
+            tSend = t + 0.010 * idx
+            by_host[s].append((tOpen, tSend, victim, MICE))
+        t += gap
+
+    # 让一条 elephant 与 incast 重叠，观察短长流共存
+    src_ele = (victim + 1) % hosts
+    by_host[src_ele].append((0.0, 0.01, victim, ELEPHANT))
+    return by_host
+
+def incast_lines(by_host, compact=False):
+    # 写 flows.inc：先写 numApps，再写每个 app 的参数
+    lines = ["# auto-generated incast by traffic_incast.py"]
+    for h, vec in by_host.items():
+        lines.append(f"**.host[{h}].numApps = {len(vec)}")
+    for h, vec in by_host.items():
+        for i, (tOpen, tSend, dst, bytes_) in enumerate(vec):
+            base = f"**.host[{h}].app[{i}]"
+            if compact:
+                lines += [
+                    f'{base}.connectAddress = "host[{dst}]"',
+                    f"{base}.tOpen = {tOpen:.3f}s",
+                    f"{base}.tSend = {tSend:.3f}s",
+                    f"{base}.sendBytes = {bytes_}B",
+                ]
+                continue
+            lines += [
+                f'{base}.typename = "TcpSessionApp"',
+                f"{base}.active = true",
+                f'{base}.connectAddress = "host[{dst}]"',
+                f"{base}.connectPort = 80",
+                f"{base}.tOpen = {tOpen:.3f}s",
+                f"{base}.tSend = {tSend:.3f}s",
+                f"{base}.sendBytes = {bytes_}B",
+                f"{base}.tClose = {tSend+3600:.3f}s",
+            ]
+
+    if compact:
+        # 通配行放在最后：前面若有更具体的行仍然优先（first match wins）
         lines += [
-            f'{base}.typename = "TcpSessionApp"',
-            f"{base}.active = true",
-            f'{base}.connectAddress = "host[{dst}]"',
-            f"{base}.connectPort = 80",
-            f"{base}.tOpen = {tOpen:.3f}s",
-            f"{base}.tSend = {tSend:.3f}s",
-            f"{base}.sendBytes = {bytes_}B",
-            f"{base}.tClose = {tSend+3600:.3f}s",
+            '**.host[*].app[*].typename = "TcpSessionApp"',
+            "**.host[*].app[*].active = true",
+            "**.host[*].app[*].connectPort = 80",
+            "**.host[*].app[*].tClose = this.tSend + 3600s",
         ]
+    return lines
+
+def write_incast(N=8, load=None, seed=1, out=None, compact=False, hosts=TOTAL):
+    """Write flows.inc (default sim/flows.inc) and its flow manifest; returns its path.
+
+    The text goes to a temp file renamed over `out`, so copies hard-linked to
+    the previous file (work/<case>/flows.inc) keep their content.
+    """
+    from flowmanifest import ManifestWriter
+    out = pathlib.Path(out) if out else pathlib.Path(__file__).resolve().parents[1] / "sim" / "flows.inc"
+    by_host = gen_incast(N, load, seed, hosts)
+    mw = ManifestWriter(out, hosts)
+    for h, vec in by_host.items():
+        mw.add([h] * len(vec), [v[2] for v in vec], range(len(vec)), [v[0] for v in vec], [v[1] for v in vec],
+               [v[3] for v in vec])
+    body = mw.text("\n".join(incast_lines(by_host, compact)) + "\n")
+    tmp = out.with_name(f"{out.name}.tmp{os.getpid()}")
+    tmp.write_text(body + mw.trailer() + "\n")
+    os.replace(tmp, out)
+    mw.close()
+    return out
+
+def workload_name(N, load, seed):
+    return f"incast_N{N}_L{load:g}_s{seed}" if load is not None else f"incast_N{N}_s{seed}"
+
+def _write_one(job):
+    N, load, seed, out, compact, hosts = job
+    return str(write_incast(N, load, seed, out, compact, hosts))
+
+def write_incast_many(combos, out_dir, hosts=TOTAL, compact=False, jobs=1):
+    """Write each distinct (N, load, seed) once into out_dir; returns {(N, load, seed): path}.
+
+    Invalid combinations are reported and left out of the result.
+    """
+    todo = {}
+    for N, load, seed in combos:
+        key = (int(N), None if load is None else float(load), int(seed))
+        if not 0 < key[0] < hosts:
+            print(f"[warn] N={key[0]} needs 1..{hosts - 1} senders; skipped", file=sys.stderr)
+            continue
+        todo.setdefault(key, os.path.join(out_dir, workload_name(*key) + ".inc"))
+    os.makedirs(out_dir, exist_ok=True)
+    jobs_ = [(*k, out, compact, hosts) for k, out in todo.items()]
+    if jobs > 1 and len(jobs_) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=min(jobs, len(jobs_))) as pool:
+            list(pool.map(_write_one, jobs_, chunksize=max(1, len(jobs_) // (4 * jobs))))
+    else:
+        for j in jobs_:
+            _write_one(j)
+    return todo
+
+def write_incast_grid(Ns, loads, seeds, out_dir, hosts=TOTAL, compact=False, jobs=1):
+    """write_incast_many over the product of the N, load and seed lists."""
+    return write_incast_many(itertools.product(Ns, loads, seeds), out_dir, hosts, compact, jobs)
+
+def grid_main(argv):
+    ap = argparse.ArgumentParser(description="Every (N, load, seed) incast workload in one call")
+    ap.add_argument("--N", type=int, nargs="+", default=[8])
+    ap.add_argument("--load", type=float, nargs="+", help="Target loads (default: unscaled gap)")
+    ap.add_argument("--seed", type=int, nargs="+", default=[1])
+    ap.add_argument("--out-dir", required=True)
+    ap.add_argument("--compact", action="store_true")
+    ap.add_argument("--topo", help="Port map (scripts/topo.py) for the host count")
+    ap.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1)
+    args = ap.parse_args(argv)
+    hosts = topo.load(args.topo).hosts if args.topo else TOTAL
+    paths = write_incast_grid(args.N, args.load or [None], args.seed, args.out_dir, hosts, args.compact, args.jobs)
+    print(f"[ok] {len(paths)} workloads in {args.out_dir}")
+    return 0
+
+def main(argv=None):
+    # 参数（--compact 可放在任意位置：把不变参数提到 **.host[*].app[*] 通配行）
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if "--out-dir" in argv:
+        # 多组 (N, LOAD, SEED) 一次生成
+        return grid_main(argv)
+    if "-h" in argv or "--help" in argv:
+        print(__doc__.strip())
+        return 0
+    compact = "--compact" in argv
+    argv = [a for a in argv if a != "--compact"]
+    hosts = TOTAL
+    if "--topo" in argv:
+        # 其他拓扑：主机数取自该端口映射
+        i = argv.index("--topo")
+        hosts = topo.load(argv[i + 1]).hosts
+        del argv[i:i + 2]
+    try:
+        N = int(argv[0]) if len(argv) > 0 else 8   # incast 发送端数量
+        load = float(argv[1]) if len(argv) > 1 else None  # 目标负载(0..1)，可选：用于缩放 GAP
+        seed = int(argv[2]) if len(argv) > 2 else 1
+    except ValueError as e:
+        sys.exit(f"[ERR] {e} (usage: traffic_incast.py N [LOAD] [SEED] [OUT] [--compact] [--topo PORTMAP])")
+    out = argv[3] if len(argv) > 3 else None   # 输出路径，可选：默认 sim/flows.inc
+    try:
+        out = write_incast(N, load, seed, out, compact, hosts)
+    except ValueError as e:
+        sys.exit(f"[ERR] {e}")
+    print("wrote", out)
 
-out = pathlib.Path(__file__).resolve().parents[1] / "sim" / "flows.inc"
-out.write_text("\n".join(lines))
-print("wrote", out)
+if __name__ == "__main__":
+    sys.exit(main())
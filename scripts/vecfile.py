@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Native reader for OMNeT++ result vector files (.vec + optional .vci index).
+
+- With a matching .vci index we seek straight to the data blocks of the
+  requested vectors and never touch the rest of the .vec.
+- Without an index (or with a stale one) the .vec is streamed line by line
+  once; only samples of the requested vectors are kept.
+
+Usage:
+    vf = VecFile("sim/results/incast8/omnetpp.vec")
+    for info in vf.select(module="leaf[0].ppp[2].queue", name="queueBitLength"):
+        t, v = vf.read(info)
+"""
+
+import os, re, sys, shlex
+from array import array
+from collections import namedtuple, defaultdict
+import numpy as np
+
+# key = vector id inside the file; count/vmin/vmax come from the index (None when unknown)
+VectorInfo = namedtuple("VectorInfo", "key module name columns count vmin vmax")
+
+Block = namedtuple("Block", "offset length count")
+
+
+def split_header(line):
+    # Header lines may quote module/name tokens (spaces, quotes); data lines never do.
+    if '"' in line:
+        return shlex.split(line, posix=True)
+    return line.split()
+
+
+def match_vector(info, module=None, name=None, regex=False):
+    """Substring (or regex) match on module/name, mirroring the CSV filters in the scripts."""
+    for pat, field in ((module, info.module), (name, info.name)):
+        if not pat:
+            continue
+        if regex:
+            if not re.search(pat, field):
+                return False
+        elif pat not in field:
+            return False
+    return True
+
+
+class VecFile:
+    def __init__(self, vec_path, vci_path=None):
+        self.vec_path = os.path.abspath(vec_path)
+        self.vci_path = vci_path or os.path.splitext(self.vec_path)[0] + ".vci"
+        self.vectors = {}            # key -> VectorInfo
+        self.blocks = defaultdict(list)  # key -> [Block]
+        self.indexed = self._load_index()
+        if not self.indexed:
+            self._scan_declarations()
+
+    # ---- index handling ------------------------------------------------
+
+    def _load_index(self):
+        if not os.path.exists(self.vci_path):
+            return False
+        st = os.stat(self.vec_path)
+        with open(self.vci_path, "r") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                c = line[0]
+                if c.isdigit():
+                    p = line.split()
+                    key = int(p[0])
+                    # 12 fields with event numbers (ETV), 10 without (TV)
+                    if len(p) >= 12:
+                        count, vmin, vmax = int(p[7]), float(p[8]), float(p[9])
+                    else:
+                        count, vmin, vmax = int(p[5]), float(p[6]), float(p[7])
+                    self.blocks[key].append(Block(int(p[1]), int(p[2]), count))
+                    info = self.vectors.get(key)
+                    if info is not None:
+                        self.vectors[key] = info._replace(
+                            count=(info.count or 0) + count,
+                            vmin=vmin if info.vmin is None else min(info.vmin, vmin),
+                            vmax=vmax if info.vmax is None else max(info.vmax, vmax))
+                elif line.startswith("file "):
+                    # file <size> <mtime>: refuse an index written for another .vec
+                    p = line.split()
+                    if len(p) >= 2 and int(p[1]) != st.st_size:
+                        print(f"[warn] stale index {self.vci_path}; streaming {self.vec_path}", file=sys.stderr)
+                        self.vectors.clear(); self.blocks.clear()
+                        return False
+                elif line.startswith("vector "):
+                    self._declare(line)
+        return True
+
+    def _declare(self, line):
+        p = split_header(line)
+        key = int(p[1])
+        columns = p[4] if len(p) > 4 else "TV"
+        self.vectors[key] = VectorInfo(key, p[2], p[3], columns, None, None, None)
+
+    def _scan_declarations(self):
+        with open(self.vec_path, "r") as f:
+            for line in f:
+                if line.startswith("vector "):
+                    self._declare(line)
+
+    # ---- lookup --------------------------------------------------------
+
+    def catalog(self):
+        return list(self.vectors.values())
+
+    def select(self, module=None, name=None, regex=False):
+        return [i for i in self.vectors.values() if match_vector(i, module, name, regex)]
+
+    # ---- data ----------------------------------------------------------
+
+    @staticmethod
+    def _tv_cols(columns):
+        # data line = vectorId + one field per column letter (E, T, V)
+        return 1 + columns.index("T"), 1 + columns.index("V"), 1 + len(columns)
+
+    def _parse_rows(self, text, info):
+        ti, vi, width = self._tv_cols(info.columns)
+        arr = np.array(text.split(), dtype=np.float64)
+        if arr.size % width:
+            raise ValueError(f"malformed data block for vector {info.key} in {self.vec_path}")
+        arr = arr.reshape(-1, width)
+        arr = arr[arr[:, 0] == info.key]
+        return arr[:, ti], arr[:, vi]
+
+    def read(self, info):
+        """Return (t, v) float64 arrays for one vector (VectorInfo or key)."""
+        if not isinstance(info, VectorInfo):
+            info = self.vectors[int(info)]
+        return self.read_many([info])[info.key]
+
+    def read_many(self, infos):
+        """Return {key: (t, v)} for several vectors; one streaming pass when unindexed."""
+        infos = [i if isinstance(i, VectorInfo) else self.vectors[int(i)] for i in infos]
+        if self.indexed:
+            out = {}
+            with open(self.vec_path, "rb") as f:
+                for info in infos:
+                    ts, vs = [], []
+                    for b in self.blocks.get(info.key, ()):
+                        f.seek(b.offset)
+                        t, v = self._parse_rows(f.read(b.length).decode("ascii"), info)
+                        ts.append(t); vs.append(v)
+                    out[info.key] = (np.concatenate(ts), np.concatenate(vs)) if ts \
+                        else (np.empty(0), np.empty(0))
+            return out
+        return self._stream(infos)
+
+    def _stream(self, infos):
+        want = {str(i.key): i for i in infos}
+        cols = {k: self._tv_cols(i.columns) for k, i in want.items()}
+        acc = {k: (array("d"), array("d")) for k in want}
+        with open(self.vec_path, "r") as f:
+            for line in f:
+                if not line[:1].isdigit():
+                    continue
+                p = line.split()
+                a = acc.get(p[0])
+                if a is None:
+                    continue
+                ti, vi, _ = cols[p[0]]
+                a[0].append(float(p[ti])); a[1].append(float(p[vi]))
+        return {want[k].key: (np.frombuffer(t, dtype=np.float64), np.frombuffer(v, dtype=np.float64))
+                for k, (t, v) in acc.items()}
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="List or dump vectors from an OMNeT++ .vec file")
+    ap.add_argument("vec")
+    ap.add_argument("--module")
+    ap.add_argument("--name")
+    ap.add_argument("--dump", action="store_true", help="Print time,value samples of matching vectors")
+    args = ap.parse_args()
+    vf = VecFile(args.vec)
+    print(f"[info] {len(vf.vectors)} vectors, index={'yes' if vf.indexed else 'no'}")
+    for info in vf.select(args.module, args.name):
+        if args.dump:
+            t, v = vf.read(info)
+            print(f"# {info.module} :: {info.name} ({len(t)} points)")
+            for a, b in zip(t, v):
+                print(f"{a:.9g},{b:.9g}")
+        else:
+            print(f"{info.key}\t{info.module}\t{info.name}\tcount={info.count}")
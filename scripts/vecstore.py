@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Columnar, memory-mapped vector store (one per run).
+
+Ingest once from an exported vectors CSV (wide vectime/vecvalue lists, row-wise
+samples, or `<base>:vectime` column pairs) or from a native .vec, then every
+analysis script memory-maps just the vectors it asks for.
+
+Layout of `<stem>.vstore/`:
+    meta.json   source path/size/mtime used for the freshness check
+    index.json  [{module, name, offset, count, vmin, vmax}, ...]
+    time.f64    all vector times, contiguous per vector (float64, native order)
+    value.f64   all vector values, same layout
+
+Usage:
+    python scripts/vecstore.py results/fixk_K30_L0.6_N8_sym_s1_vectors.csv
+    src = open_vectors("results/fixk_K30_L0.6_N8_sym_s1_vectors.csv")  # VecStore, VecFile or None
+"""
+
+import os, sys, json, shutil, argparse
+import numpy as np
+from vecfile import VecFile, VectorInfo, match_vector
+
+STORE_SUFFIX = ".vstore"
+STORE_VERSION = 1
+CHUNK_ROWS = 2000
+
+
+def store_path_for(source):
+    source = os.path.abspath(source)
+    if source.endswith(STORE_SUFFIX):
+        return source
+    return os.path.splitext(source)[0] + STORE_SUFFIX
+
+
+def _source_stamp(source):
+    st = os.stat(source)
+    return {"source": os.path.abspath(source), "size": st.st_size, "mtime": st.st_mtime}
+
+
+def is_fresh(store, source=None):
+    meta_path = os.path.join(store, "meta.json")
+    if not os.path.exists(meta_path):
+        return False
+    with open(meta_path) as f:
+        meta = json.load(f)
+    if meta.get("version") != STORE_VERSION:
+        return False
+    if source is None or not os.path.exists(source):
+        return True
+    stamp = _source_stamp(source)
+    return meta.get("size") == stamp["size"] and meta.get("mtime") == stamp["mtime"]
+
+
+class VecStore:
+    def __init__(self, path):
+        self.path = store_path_for(path)
+        with open(os.path.join(self.path, "index.json")) as f:
+            entries = json.load(f)
+        self.vectors = {}
+        self._span = {}
+        for key, e in enumerate(entries):
+            self.vectors[key] = VectorInfo(key, e["module"], e["name"], "TV", e["count"], e["vmin"], e["vmax"])
+            self._span[key] = (e["offset"], e["count"])
+        self._t = self._v = None
+
+    def _maps(self):
+        # mapped lazily and shared; slicing a memmap only pages in the touched range
+        if self._t is None:
+            t_path = os.path.join(self.path, "time.f64")
+            if os.path.getsize(t_path) == 0:
+                self._t = self._v = np.empty(0)
+            else:
+                self._t = np.memmap(t_path, dtype=np.float64, mode="r")
+                self._v = np.memmap(os.path.join(self.path, "value.f64"), dtype=np.float64, mode="r")
+        return self._t, self._v
+
+    def catalog(self):
+        return list(self.vectors.values())
+
+    def select(self, module=None, name=None, regex=False):
+        return [i for i in self.vectors.values() if match_vector(i, module, name, regex)]
+
+    def read(self, info):
+        key = info.key if isinstance(info, VectorInfo) else int(info)
+        off, n = self._span[key]
+        t, v = self._maps()
+        return t[off:off + n], v[off:off + n]
+
+    def read_many(self, infos):
+        out = {}
+        for i in infos:
+            key = i.key if isinstance(i, VectorInfo) else int(i)
+            out[key] = self.read(key)
+        return out
+
+
+# ---- ingest ---------------------------------------------------------------
+
+def _parse_list(cell):
+    if not isinstance(cell, str):
+        return np.empty(0)
+    s = cell.strip()
+    if s[:1] in "{[" and s[-1:] in "}]":
+        s = s[1:-1]
+    return np.array(s.replace(",", " ").replace(";", " ").split(), dtype=np.float64)
+
+
+def iter_csv_vectors(path, keep=None, pieces=False):
+    """Yield (module, name, t, v) from any of the exported CSV shapes.
+
+    keep: optional (module, name) -> bool; other vectors are dropped before
+    anything is buffered. Row-wise sample exports are put together per vector
+    in memory unless pieces=True, which yields each chunk's samples of a vector
+    as soon as they are read (a vector then comes in several pieces, in file order).
+    """
+    import pandas as pd
+    header = [c.strip() for c in pd.read_csv(path, nrows=0).columns]
+    lower = [c.lower() for c in header]
+    pairs = [c[:-len(":vectime")] for c in header if c.endswith(":vectime") and c[:-len(":vectime")] + ":vecvalue" in header]
+    if pairs:
+        # <module>.<name>:vectime / :vecvalue column pairs (cells may hold lists)
+        df = pd.read_csv(path, usecols=[f"{b}:{s}" for b in pairs for s in ("vectime", "vecvalue")], dtype=str)
+        for b in pairs:
+            mod, _, name = b.rpartition(".")
+            if keep is not None and not keep(mod, name):
+                continue
+            t = np.concatenate([_parse_list(c) for c in df[f"{b}:vectime"].dropna()] or [np.empty(0)])
+            v = np.concatenate([_parse_list(c) for c in df[f"{b}:vecvalue"].dropna()] or [np.empty(0)])
+            yield mod, name, t, v
+        return
+    if "module" not in lower or "name" not in lower:
+        raise ValueError(f"{path}: no module/name columns and no <vector>:vectime columns")
+    cols = {c.lower(): c for c in header}
+    tcol = cols.get("vectime") or cols.get("time")
+    vcol = cols.get("vecvalue") or cols.get("value")
+    if tcol is None or vcol is None:
+        raise ValueError(f"{path}: no vectime/vecvalue (or time/value) columns")
+    usecols = [cols["module"], cols["name"], tcol, vcol] + ([cols["type"]] if "type" in cols else [])
+    pending = {}
+    for chunk in pd.read_csv(path, usecols=usecols, dtype=str, chunksize=CHUNK_ROWS):
+        if "type" in cols:
+            chunk = chunk[chunk[cols["type"]] == "vector"]
+        chunk = chunk.dropna(subset=[tcol, vcol])
+        if chunk.empty:
+            continue
+        # list cells (wide CSV-R export: one row per vector) vs scalar cells (one row per sample)
+        if chunk[tcol].str.contains(r"\s", regex=True).any():
+            for mod, name, tc, vc in zip(chunk[cols["module"]], chunk[cols["name"]], chunk[tcol], chunk[vcol]):
+                if keep is None or keep(mod, name):
+                    yield mod, name, _parse_list(tc), _parse_list(vc)
+        else:
+            t = pd.to_numeric(chunk[tcol], errors="coerce").to_numpy()
+            v = pd.to_numeric(chunk[vcol], errors="coerce").to_numpy()
+            for (mod, name), idx in chunk.groupby([cols["module"], cols["name"]], sort=False).indices.items():
+                if keep is not None and not keep(mod, name):
+                    continue
+                if pieces:
+                    yield mod, name, t[idx], v[idx]
+                else:
+                    pending.setdefault((mod, name), []).append((t[idx], v[idx]))
+    for (mod, name), parts in pending.items():
+        yield mod, name, np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
+
+
+def iter_vec_vectors(path):
+    vf = VecFile(path)
+    infos = vf.catalog()
+    if vf.indexed:
+        # one vector at a time: memory bounded by the largest vector
+        for info in infos:
+            t, v = vf.read(info)
+            yield info.module, info.name, t, v
+    else:
+        data = vf.read_many(infos)
+        for info in infos:
+            t, v = data[info.key]
+            yield info.module, info.name, t, v
+
+
+def _map(path):
+    # np.memmap refuses empty files
+    return np.memmap(path, dtype=np.float64, mode="r") if os.path.getsize(path) else np.empty(0)
+
+
+def _spill(it, tmp):
+    """Write (module, name, t, v) pieces to time.f64/value.f64 in arrival order.
+
+    Returns {(module, name): [(offset, count), ...]} in order of first appearance.
+    """
+    segs = {}
+    offset = 0
+    with open(os.path.join(tmp, "time.f64"), "wb") as ft, open(os.path.join(tmp, "value.f64"), "wb") as fv:
+        for mod, name, t, v in it:
+            n = min(t.size, v.size)
+            ft.write(np.ascontiguousarray(t[:n], dtype=np.float64).tobytes())
+            fv.write(np.ascontiguousarray(v[:n], dtype=np.float64).tobytes())
+            segs.setdefault((str(mod), str(name)), []).append((offset, int(n)))
+            offset += n
+    return segs
+
+
+def _compact(tmp, segs):
+    """Rewrite the spilled columns so every vector is contiguous; one vector in memory at a time."""
+    for col in ("time.f64", "value.f64"):
+        os.replace(os.path.join(tmp, col), os.path.join(tmp, col + ".raw"))
+    raw_t, raw_v = _map(os.path.join(tmp, "time.f64.raw")), _map(os.path.join(tmp, "value.f64.raw"))
+    with open(os.path.join(tmp, "time.f64"), "wb") as ft, open(os.path.join(tmp, "value.f64"), "wb") as fv:
+        for parts in segs.values():
+            for col, f in ((raw_t, ft), (raw_v, fv)):
+                f.write(np.concatenate([col[o:o + n] for o, n in parts]).tobytes())
+    del raw_t, raw_v
+    for col in ("time.f64", "value.f64"):
+        os.remove(os.path.join(tmp, col + ".raw"))
+
+
+def ingest(source, store=None):
+    """Build (or rebuild) the store for `source`; returns the store path.
+
+    Row-wise CSV chunks are spilled to disk as they are read, then vectors split
+    across chunks are made contiguous: memory is bounded by the largest vector,
+    not by the export.
+    """
+    store = store or store_path_for(source)
+    tmp = store + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    it = iter_vec_vectors(source) if source.endswith(".vec") else iter_csv_vectors(source, pieces=True)
+    segs = _spill(it, tmp)
+    if any(len(parts) > 1 for parts in segs.values()):
+        _compact(tmp, segs)
+    index = []
+    offset = 0
+    vals = _map(os.path.join(tmp, "value.f64"))
+    for (mod, name), parts in segs.items():
+        n = sum(c for _, c in parts)
+        v = vals[offset:offset + n]
+        index.append({"module": mod, "name": name, "offset": offset, "count": n,
+                      "vmin": float(v.min()) if n else None, "vmax": float(v.max()) if n else None})
+        offset += n
+    del vals
+    with open(os.path.join(tmp, "index.json"), "w") as f:
+        json.dump(index, f)
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump({"version": STORE_VERSION, **_source_stamp(source)}, f)
+    shutil.rmtree(store, ignore_errors=True)
+    os.replace(tmp, store)
+    return store
+
+
+def open_vectors(path):
+    """Columnar source for `path` if one is available without parsing text.
+
+    - a .vstore directory, or a CSV/.vec with a fresh sibling store -> VecStore
+    - a .vec without store -> VecFile (indexed seek / streaming)
+    - otherwise None: caller falls back to its CSV code path
+    """
+    path = os.path.abspath(path)
+    store = store_path_for(path)
+    if os.path.isdir(store) and is_fresh(store, None if path.endswith(STORE_SUFFIX) else path):
+        return VecStore(store)
+    if path.endswith(".vec"):
+        return VecFile(path)
+    return None
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Build columnar vector stores from exported CSVs or .vec files")
+    ap.add_argument("sources", nargs="+", help="vectors CSV or .vec paths")
+    ap.add_argument("--force", action="store_true", help="Rebuild even if the store is up to date")
+    args = ap.parse_args()
+    for src in args.sources:
+        if not os.path.isfile(src):
+            sys.exit(f"[ERR] source not found: {src}")
+        store = store_path_for(src)
+        if not args.force and is_fresh(store, src):
+            print(f"[skip] {store} up to date")
+            continue
+        ingest(src, store)
+        print(f"[ok] wrote {store} ({len(VecStore(store).vectors)} vectors)")
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Empirical flow-size workloads into flows.inc.
+
+Flow sizes follow an empirical CDF: a built-in one, or your own CSV with
+columns (size_bytes, cdf), comma or whitespace separated. Built-ins:
+- websearch:     DCTCP web search (Alizadeh et al., as tabulated in pFabric);
+- datamining:    VL2 data mining (Greenberg et al., as tabulated in pFabric);
+- cachefollower: Facebook cache follower, approximate shape after Roy et al. (SIGCOMM'15).
+The CDF is piecewise linear between its points. A batch of sizes is one
+searchsorted of uniform draws on the cumulative column plus a linear
+interpolation. Flows arrive as a Poisson stream over uniform (src, dst != src)
+pairs at the rate that gives the target load on every host link:
+    rate = load * LINK_BPS * hosts / (8 * mean size)
+With `exact` (default), the gaps of each batch (BATCH flows) are rescaled so the
+batch's bytes over its time span match the target exactly rather than on
+average. Only the last batch, cut at --duration, is off by sampling noise.
+Batches go through traffic.write_inc_streaming (same flows.inc format, --compact).
+
+The written flows.inc and its flow manifest (scripts/flowmanifest.py) are cached
+in the result cache (scripts/resultcache.py), keyed on the CDF table, the generator
+arguments and the generator/writer code. Asking for the same workload again restores
+both files instead of regenerating them.
+
+Usage:
+    python scripts/workload.py websearch --load 0.6 --duration 2 --seed 1 --out sim/flows.inc
+    python scripts/workload.py my_cdf.csv --load 0.8 --flows 2000000 --compact --out /tmp/flows.inc
+    python scripts/workload.py --list
+"""
+
+import os, sys, time, argparse
+import numpy as np
+import topo
+from traffic import write_inc_streaming, BATCH
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+LINK_BPS = 10e9     # EthChan default datarate
+PKT = 1460          # pFabric tables are in 1460-byte packets
+
+# (size, cdf) points
+BUILTIN = {
+    "websearch": [(6 * PKT, 0.0), (6 * PKT, 0.15), (13 * PKT, 0.2), (19 * PKT, 0.3), (33 * PKT, 0.4),
+                  (53 * PKT, 0.53), (133 * PKT, 0.6), (667 * PKT, 0.7), (1333 * PKT, 0.8), (3333 * PKT, 0.9),
+                  (6667 * PKT, 0.97), (20000 * PKT, 1.0)],
+    "datamining": [(1 * PKT, 0.0), (1 * PKT, 0.5), (2 * PKT, 0.6), (3 * PKT, 0.7), (7 * PKT, 0.8),
+                   (267 * PKT, 0.9), (2107 * PKT, 0.95), (66667 * PKT, 0.99), (666667 * PKT, 1.0)],
+    "cachefollower": [(70, 0.0), (150, 0.1), (300, 0.2), (700, 0.3), (1500, 0.4), (3000, 0.5), (10000, 0.6),
+                      (30000, 0.7), (100000, 0.8), (300000, 0.9), (1000000, 0.95), (3000000, 0.98),
+                      (10000000, 1.0)],
+}
+
+
+class SizeCDF:
+    """Piecewise-linear empirical CDF with vectorized inverse sampling."""
+
+    def __init__(self, points, name="cdf"):
+        size = np.asarray([p[0] for p in points], dtype=np.float64)
+        cdf = np.asarray([p[1] for p in points], dtype=np.float64)
+        if len(size) < 2 or np.any(np.diff(size) < 0) or np.any(np.diff(cdf) < 0) or size[0] < 1:
+            raise ValueError(f"{name}: sizes and cdf must be non-decreasing, sizes >= 1, at least 2 points")
+        if not np.isclose(cdf[-1], 1.0) or cdf[0] < 0:
+            raise ValueError(f"{name}: cdf must end at 1 (got {cdf[-1]:g})")
+        cdf = cdf / cdf[-1]
+        if cdf[0] > 0:
+            # mass at the smallest size
+            size, cdf = np.concatenate(([size[0]], size)), np.concatenate(([0.0], cdf))
+        self.name, self.size, self.cdf = name, size, cdf
+        self.mean = float(np.sum(np.diff(cdf) * (size[1:] + size[:-1]) / 2.0))
+
+    def sample(self, u):
+        """Sizes in bytes for uniform draws u in [0, 1)."""
+        i = np.clip(np.searchsorted(self.cdf, u, side="right"), 1, len(self.cdf) - 1)
+        lo, hi = self.cdf[i - 1], self.cdf[i]
+        frac = np.where(hi > lo, (u - lo) / np.where(hi > lo, hi - lo, 1.0), 0.0)
+        return np.maximum(np.rint(self.size[i - 1] + frac * (self.size[i] - self.size[i - 1])), 1).astype(np.int64)
+
+    def table(self):
+        return [[float(s), float(c)] for s, c in zip(self.size, self.cdf)]
+
+
+_CDFS = {}
+
+
+def load_cdf(spec):
+    """SizeCDF of a built-in name or a (size_bytes, cdf) CSV; parsed once per process."""
+    if spec not in _CDFS:
+        if spec in BUILTIN:
+            _CDFS[spec] = SizeCDF(BUILTIN[spec], spec)
+        elif os.path.isfile(spec):
+            import re
+            pts = []
+            with open(spec) as f:
+                for line in f:
+                    line = line.split("#", 1)[0].strip()
+                    if not line:
+                        continue
+                    cols = re.split(r"[,\s]+", line)
+                    try:
+                        pts.append((float(cols[0]), float(cols[1])))
+                    except (ValueError, IndexError):
+                        if pts:
+                            raise ValueError(f"{spec}: bad line {line!r}")
+                        # header
+            _CDFS[spec] = SizeCDF(pts, os.path.basename(spec))
+        else:
+            raise ValueError(f"unknown CDF {spec!r}: not one of {', '.join(BUILTIN)} and not a file")
+    return _CDFS[spec]
+
+
+def arrival_rate(cdf, load, hosts, link_bps=LINK_BPS):
+    """Fabric-wide flow arrivals per second for `load` on every host link."""
+    return load * link_bps * hosts / (8.0 * cdf.mean)
+
+
+def gen_cdf_flows(cdf, load, duration, total_hosts, seed=1, batch=BATCH, link_bps=LINK_BPS, exact=True):
+    """Yield (t, src, dst, size) arrays in start-time order, like traffic.gen_flows_batched."""
+    if not 0 < load <= 1:
+        raise ValueError(f"load must be in (0, 1], got {load}")
+    if total_hosts < 2:
+        raise ValueError("need at least 2 hosts")
+    rng = np.random.default_rng(seed)
+    gap = 1.0 / arrival_rate(cdf, load, total_hosts, link_bps)
+    byte_rate = load * link_bps * total_hosts / 8.0
+    t0 = 0.0
+    while t0 < duration:
+        size = cdf.sample(rng.random(batch))
+        ia = rng.exponential(gap, batch)
+        if exact:
+            # this batch's bytes over its span hit the target load exactly
+            ia *= size.sum() / byte_rate / ia.sum()
+        t = t0 + np.concatenate(([0.0], np.cumsum(ia[:-1])))
+        t0 = t[-1] + ia[-1]
+        n = int(np.searchsorted(t, duration))
+        s = rng.integers(0, total_hosts, n)
+        d = rng.integers(0, total_hosts - 1, n)
+        d += d >= s
+        yield t[:n], s, d, size[:n]
+
+
+def write_workload(spec, load, duration, out, hosts=None, seed=1, compact=False, exact=True, cache=None):
+    """Write flows.inc for a CDF workload; returns (flows or None when restored from cache, cached)."""
+    from resultcache import digest, sha256_file
+    from flowmanifest import manifest_path_for, FILES as MANIFEST_FILES
+    cdf = load_cdf(spec)
+    hosts = hosts or topo.load().hosts
+    key = digest({"workload": cdf.table(), "load": load, "duration": duration, "hosts": hosts, "seed": seed,
+                  "compact": compact, "exact": exact, "batch": BATCH,
+                  "code": [sha256_file(os.path.join(os.path.dirname(os.path.abspath(__file__)), f))
+                           for f in ("workload.py", "traffic.py", "flowmanifest.py")]})
+    # flows.inc plus its flow manifest, restored together
+    mdir = manifest_path_for(out)
+    files = {"flows.inc": out, **{f"manifest.{f}": os.path.join(mdir, f) for f in MANIFEST_FILES}}
+    if cache is not None and cache.get(key, files):
+        return None, True
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    n = write_inc_streaming(gen_cdf_flows(cdf, load, duration, hosts, seed, exact=exact), out, hosts, compact)
+    if cache is not None:
+        cache.put(key, files, info={"workload": cdf.name, "load": load, "duration": duration,
+                                                 "hosts": hosts, "seed": seed, "flows": n})
+    return n, False
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Empirical flow-size CDF workload into flows.inc")
+    ap.add_argument("cdf", nargs="?", help=f"Built-in ({', '.join(BUILTIN)}) or CSV of (size_bytes, cdf)")
+    ap.add_argument("--load", type=float, default=0.6, help="Target load on every host link (default 0.6)")
+    ap.add_argument("--duration", type=float, help="Seconds of arrivals (default 1)")
+    ap.add_argument("--flows", type=int, help="About this many flows instead of --duration")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--topo", help="Port map (scripts/topo.py) for the host count")
+    ap.add_argument("--out", default=os.path.join(ROOT_DIR, "sim", "flows.inc"))
+    ap.add_argument("--compact", action="store_true", help="Hoist invariant app parameters into wildcards")
+    ap.add_argument("--poisson", action="store_true", help="Plain Poisson gaps (load met on average, not per batch)")
+    ap.add_argument("--no-cache", action="store_true")
+    ap.add_argument("--list", action="store_true", help="Print the built-in CDFs and exit")
+    args = ap.parse_args(argv)
+
+    if args.list:
+        for name in BUILTIN:
+            c = load_cdf(name)
+            print(f"{name:>14}: mean {c.mean / 1e3:9.1f} KB, max {c.size[-1] / 1e6:7.2f} MB")
+        return 0
+    if not args.cdf:
+        ap.error("a CDF name or file is required")
+    try:
+        cdf = load_cdf(args.cdf)
+    except ValueError as e:
+        sys.exit(f"[ERR] {e}")
+    hosts = topo.load(args.topo).hosts
+    duration = args.duration if args.duration is not None else \
+        (args.flows / arrival_rate(cdf, args.load, hosts) if args.flows else 1.0)
+    cache = None
+    if not args.no_cache:
+        from resultcache import ResultCache
+        cache = ResultCache()
+    t0 = time.perf_counter()
+    try:
+        n, cached = write_workload(args.cdf, args.load, duration, args.out, hosts, args.seed, args.compact,
+                                   not args.poisson, cache)
+    except ValueError as e:
+        sys.exit(f"[ERR] {e}")
+    dt = time.perf_counter() - t0
+    if cached:
+        print(f"[ok] {args.out} restored from cache ({dt:.2f}s)")
+    else:
+        print(f"[ok] wrote {args.out}: {n} flows over {duration:g}s, {cdf.name} (mean {cdf.mean / 1e3:.1f} KB), "
+              f"load {args.load:g} on {hosts} hosts ({dt:.2f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
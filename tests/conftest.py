@@ -0,0 +1,5 @@
+import os, sys
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(ROOT_DIR, "scripts"))
+os.environ.setdefault("MPLBACKEND", "Agg")
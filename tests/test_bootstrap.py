@@ -0,0 +1,27 @@
+import catalog
+from bootstrap import flows_from_catalog
+from fct_engine import parse_send_map
+from traffic_incast import write_incast
+
+
+def test_catalog_keeps_the_workload(tmp_path):
+    # a run_grid.sh run: cataloged by its export, with no grid work dir
+    inc = str(write_incast(4, 0.6, 1, tmp_path / "flows" / "fixk_K30_L0.6_N4_sym_s1.inc"))
+    send = parse_send_map(inc)
+    rows = ["run,type,module,name,attrname,attrvalue,vectime,vecvalue"]
+    for j, ((h, a), need) in enumerate(sorted(send.items()), 1):
+        rows.append(f"r,vector,Net.host[{h}].app[{a}],rcvdBytes:vector,,,{0.01 * j:.6f},1")
+        rows.append(f"r,vector,Net.host[{h}].app[{a}],rcvdBytes:vector,,,{0.01 * j + 0.002:.6f},{need}")
+    vec_csv = tmp_path / "results" / "fixk_K30_L0.6_N4_sym_s1_vectors.csv"
+    vec_csv.parent.mkdir()
+    vec_csv.write_text("\n".join(rows) + "\n")
+
+    db = str(tmp_path / "catalog.sqlite")
+    conn = catalog.connect(db)
+    row = catalog.add_vectors(conn, str(vec_csv), inc)
+    conn.close()
+    assert row["flows_inc"] == inc and row["incomplete"] == 0
+
+    flows = flows_from_catalog(db)
+    assert len(flows) == len(send)
+    assert flows[["K", "N", "scenario", "seed"]].drop_duplicates().values.tolist() == [[30, 4, "sym", 1]]
@@ -0,0 +1,22 @@
+import os, sys, subprocess
+import pytest
+
+SCRIPTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts")
+PROBE = """
+import runpy, sys
+sys.argv = [sys.argv[1], "--help"]
+try:
+    runpy.run_path(sys.argv[0], run_name="__main__")
+except SystemExit as e:
+    assert not e.code, e.code
+print(sorted(m for m in ("numpy", "pandas", "matplotlib") if m in sys.modules))
+"""
+
+
+@pytest.mark.parametrize("script", ["catalog.py", "grid.py", "pipeline.py", "plot_sanity.py", "queue_stats.py",
+                                    "scalars.py", "traffic.py", "traffic_incast.py"])
+def test_help_skips_heavy_imports(script):
+    r = subprocess.run([sys.executable, "-c", PROBE, os.path.join(SCRIPTS, script)],
+                       capture_output=True, text=True, cwd=SCRIPTS)
+    assert r.returncode == 0, r.stderr
+    assert r.stdout.strip().splitlines()[-1] == "[]"
@@ -0,0 +1,42 @@
+import pytest
+from elog_fct import iter_lines, iter_entries, parse_range, byte_ranges, track
+
+
+def write_elog(path, events=100, big_block=0):
+    """Synthetic eventlog: one sender app, one receiver app, `events` deliveries."""
+    lines = ['MC id 1 c omnetpp::cModule t SmallLeafSpine n SmallLeafSpine',
+             'MC id 3 c StandardHost t inet.node.inet.StandardHost n "host[1]" pid 1',
+             'MC id 2 c TcpSessionApp t inet.applications.tcpapp.TcpSessionApp n "app[0]" pid 3',
+             'MC id 5 c StandardHost t inet.node.inet.StandardHost n "host[0]" pid 1',
+             'MC id 4 c TcpSinkApp t inet.applications.tcpapp.TcpSinkApp n "app[0]" pid 5']
+    for e in range(events):
+        msg = 1000 + e
+        lines.append(f"E # {2 * e + 1} t {e * 1e-3:.6f} m 2 ce 0 msg -1")
+        lines.append(f'BS id {msg} tid {msg} c cPacket n "data" l 8000')
+        lines += [f"- filler {k}" for k in range(big_block if e == events // 2 else 0)]
+        lines.append(f"ES t {e * 1e-3:.6f}")
+        lines.append(f"E # {2 * e + 2} t {e * 1e-3 + 5e-4:.6f} m 4 ce {2 * e + 1} msg {msg}")
+        lines.append(f"DM id {msg}")
+    path.write_text("\n".join(lines) + "\n")
+    return path
+
+
+@pytest.mark.parametrize("big_block", [0, 40])
+@pytest.mark.parametrize("chunk", [7, 30, 500, 4096])
+def test_ranges_cover_each_line_once(tmp_path, chunk, big_block):
+    path = write_elog(tmp_path / "run.elog", big_block=big_block)
+    serial = list(iter_lines(str(path)))
+    parallel = [line for _, s, e in byte_ranges(str(path), chunk) for line in iter_lines(str(path), s, e)]
+    assert parallel == serial
+    entries = [x for r in byte_ranges(str(path), chunk) for x in parse_range(r)]
+    assert entries == list(iter_entries(iter_lines(str(path))))
+
+
+@pytest.mark.parametrize("chunk", [7, 30, 500])
+def test_parallel_track_matches_serial(tmp_path, chunk):
+    path = write_elog(tmp_path / "run.elog", big_block=40)
+    send_map = {(1, 0): 100 * 1000}
+    serial = track(str(path), send_map).table()
+    assert len(serial) == 1 and serial["complete"].all() and serial["bytes_rcvd"].iloc[0] == 100 * 1000
+    parallel = track(str(path), send_map, jobs=2, chunk=chunk).table()
+    assert serial.equals(parallel)
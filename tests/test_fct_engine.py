@@ -0,0 +1,41 @@
+import numpy as np
+from fct_engine import fct_engine
+
+
+def vectors():
+    # host[0].app[0] receives 3000 B, host[0].app[1] 1000 B (running totals)
+    t = np.array([0.001, 0.002, 0.003])
+    yield 0, 0, "rcvdBytes:vector", t, np.array([1000.0, 2000.0, 3000.0])
+    yield 0, 1, "rcvdPk:vector(packetBytes)", t[:1], np.array([1000.0])
+
+
+def test_send_bytes_decide_completion():
+    df = fct_engine(vectors(), {(0, 0): 3000, (0, 1): 2000}).set_index("app")
+    assert df.loc[0, "complete"] and np.isclose(df.loc[0, "t_end"], 0.003)
+    assert not df.loc[1, "complete"] and df.loc[1, "residual_bytes"] == 1000
+
+
+def test_missing_send_bytes_is_incomplete():
+    df = fct_engine(vectors(), {(0, 0): 2000}).set_index("app")
+    assert df.loc[0, "complete"] and np.isclose(df.loc[0, "t_end"], 0.002)
+    assert not df.loc[1, "complete"]
+    assert np.isnan(df.loc[1, "bytes_need"]) and np.isnan(df.loc[1, "fct_s"])
+    assert not fct_engine(vectors())["complete"].any()
+
+
+def test_complete_at_last_byte():
+    df = fct_engine(vectors(), None, complete_at_last_byte=True).set_index("app")
+    assert df["complete"].all()
+    assert df.loc[0, "bytes_need"] == 3000 and np.isclose(df.loc[0, "t_end"], 0.003)
+
+
+def test_zero_byte_flow_after_a_non_empty_one():
+    t = np.array([0.001, 0.002, 0.003])
+    vecs = [(0, 0, "rcvdBytes:vector", t, np.array([1000.0, 2000.0, 3000.0])),
+            (0, 1, "rcvdBytes:vector", t + 0.01, np.array([0.0, 0.0, 0.0])),
+            (0, 2, "rcvdBytes:vector", t + 0.02, np.array([0.0, 500.0, 500.0]))]
+    df = fct_engine(iter(vecs), {(0, 0): 3000, (0, 1): 0, (0, 2): 0}).set_index("app")
+    assert df.loc[0, "complete"] and np.isclose(df.loc[0, "t_end"], 0.003)
+    # nothing received: never started, and no t_end borrowed from app[0]
+    assert not df.loc[1, "complete"] and np.isnan(df.loc[1, "t_end"])
+    assert df.loc[2, "complete"] and np.isclose(df.loc[2, "t_end"], 0.022) and df.loc[2, "fct_s"] == 0.0
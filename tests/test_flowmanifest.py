@@ -0,0 +1,41 @@
+import os
+import numpy as np
+from flowmanifest import FlowManifest, for_inc, manifest_path_for
+from fct_engine import load_send_map, parse_send_map
+from traffic_incast import write_incast
+from traffic import write_inc_streaming, gen_flows_batched
+
+
+def test_manifest_matches_text(tmp_path):
+    inc = str(write_incast(8, 0.6, 1, tmp_path / "flows.inc"))
+    m = for_inc(inc)
+    assert isinstance(m, FlowManifest)
+    assert dict(m) == parse_send_map(inc)
+    # second load goes through the verified stamp
+    assert os.path.exists(os.path.join(manifest_path_for(inc), "verified.json"))
+    assert isinstance(for_inc(inc), FlowManifest)
+
+
+def test_streaming_writer(tmp_path):
+    inc = str(tmp_path / "flows.inc")
+    n = write_inc_streaming(gen_flows_batched(0.6, 0.5, 12, seed=3, batch=64), inc, 12, compact=True)
+    m = load_send_map(inc)
+    assert isinstance(m, FlowManifest) and len(m) == n
+    ref = parse_send_map(inc)
+    keys = list(ref)
+    got = m.send_bytes([k[0] for k in keys], [k[1] for k in keys])
+    assert np.array_equal(got, [ref[k] for k in keys])
+
+
+def test_same_size_edit_is_stale(tmp_path):
+    inc = str(write_incast(8, 0.6, 1, tmp_path / "flows.inc"))
+    assert for_inc(inc) is not None
+    text = open(inc).read()
+    i = text.index("sendBytes = 524288B")
+    edited = text[:i] + "sendBytes = 524289B" + text[i + len("sendBytes = 524288B"):]
+    assert len(edited) == len(text)
+    with open(inc, "w") as f:
+        f.write(edited)
+    assert for_inc(inc) is None
+    send = load_send_map(inc)
+    assert not isinstance(send, FlowManifest) and 524289 in send.values()
@@ -0,0 +1,30 @@
+import numpy as np
+import fluid
+
+
+def one_flow(src):
+    return (np.array([src]), np.array([0]), np.array([0.01]), np.array([512 * 1024.0]))
+
+
+def test_asym_uplink_binds():
+    # the first cross-leaf flow of a leaf takes spine[0], the throttled uplink on ASYM_LEAF
+    src = fluid.ASYM_LEAF * fluid.HOSTS_PER_LEAF
+    cases = [{"K": 30, "scenario": s} for s in ("sym", "asym")]
+    pred, _, _ = fluid.predict(cases, [one_flow(src)] * 2)
+    sym, asym = pred["p99_ms"]
+    assert asym >= sym and asym > 1.5 * sym
+    # a sender on another leaf does not cross the asym uplink
+    pred, _, _ = fluid.predict(cases, [one_flow(fluid.HOSTS_PER_LEAF)] * 2)
+    assert np.isclose(*pred["p99_ms"])
+
+
+def test_incast_scenarios_and_shortlist(tmp_path):
+    cache = {"_dir": str(tmp_path)}
+    cases = [{"K": K, "L": "0.6", "N": 8, "seed": s, "scenario": scen}
+             for K in (10, 30, 60, 120) for s in (1, 2) for scen in ("sym", "asym")]
+    pred, _, _ = fluid.predict(cases, [fluid.incast_flows(8, "0.6", c["seed"], cache) for c in cases])
+    by = pred.set_index(["K", "seed", "scenario"])
+    sym, asym = by.xs("sym", level="scenario"), by.xs("asym", level="scenario")
+    assert (asym["p99_ms"] >= sym["p99_ms"] - 1e-9).all() and (asym["p95_ms"] > sym["p95_ms"]).any()
+    ranked = fluid.rank(pred)
+    assert (ranked.groupby("scenario")["shortlist"].sum() < 4).all()
@@ -0,0 +1,131 @@
+import sys, json, argparse
+import pytest
+import grid, adaptive_k
+
+# Stand-ins for opp_run / opp_scavetool. The simulator reads the case's flows.inc and
+# lets every configured app receive its sendBytes, finishing after a K-dependent
+# delay with a knee at K=20; each call is appended to $STUB_CALLS.
+OPP_RUN = r'''
+import os, re, sys
+args = sys.argv[1:]
+res = next(a.split("=", 1)[1] for a in args if a.startswith("--result-dir="))
+cfg = args[args.index("-c") + 1]
+K = int(next((a.rsplit("=", 1)[1] for a in args if ".minth=" in a), cfg.rsplit("_k", 1)[1]))
+with open(os.environ["STUB_CALLS"], "a") as f:
+    f.write(os.path.basename(os.getcwd()) + "\n")
+apps = re.findall(r"host\[(\d+)\]\.app\[(\d+)\]\.sendBytes\s*=\s*(\d+)B", open("flows.inc").read())
+os.makedirs(res, exist_ok=True)
+fct = (1.0 + (20.0 / K) ** 2 + K / 20.0) * 1e-3
+with open(os.path.join(res, "omnetpp.vec"), "w") as f:
+    f.write("version 2\n")
+    f.write("vector 0 Net.leaf[0].ppp[2].queue queueBitLength:vector ETV\n")
+    for i in range(5):
+        f.write(f"0\t{i}\t{i * 1e-3:.6f}\t{i * 8 * 1460 * K / 4:.1f}\n")
+    for j, (h, a, need) in enumerate(apps[:20], 1):
+        f.write(f"vector {j} Net.host[{h}].app[{a}] rcvdBytes:vector ETV\n")
+        t0 = 0.01 * j
+        f.write(f"{j}\t1\t{t0:.6f}\t1\n{j}\t2\t{t0 + fct * (1 + j / 100):.6f}\t{need}\n")
+open(os.path.join(res, "omnetpp.vci"), "w").write("version 2\n")
+open(os.path.join(res, "omnetpp.sca"), "w").write(
+    "version 2\nrun x\nscalar Net.leaf[0].ppp[2].queue packetDropped:count 3\n")
+print("** Event #100   t=1   Elapsed: 0.1s (0m 00s)  100% completed  ev/sec=1000")
+'''
+
+SCAVETOOL = r'''
+import sys
+src, out = sys.argv[2], sys.argv[sys.argv.index("-o") + 1]
+rows = []
+if src.endswith(".vec"):
+    rows.append("run,type,module,name,attrname,attrvalue,vectime,vecvalue")
+    names = {}
+    for line in open(src):
+        p = line.split()
+        if p[0] == "vector":
+            names[p[1]] = (p[2], p[3])
+        elif p[0] in names:
+            rows.append(f"r,vector,{names[p[0]][0]},{names[p[0]][1]},,,{p[2]},{p[3]}")
+else:
+    rows += ["run,type,module,name,attrname,attrvalue,value",
+             "r,scalar,Net.leaf[0].ppp[2].queue,packetDropped:count,,,3"]
+open(out, "w").write("\n".join(rows) + "\n")
+'''
+
+
+@pytest.fixture
+def stubs(tmp_path, monkeypatch):
+    for name, code in (("opp_run", OPP_RUN), ("opp_scavetool", SCAVETOOL)):
+        p = tmp_path / "bin" / name
+        p.parent.mkdir(exist_ok=True)
+        p.write_text(f"#!{sys.executable}\n{code}")
+        p.chmod(0o755)
+    monkeypatch.setenv("OMNETPP_BIN", str(tmp_path / "bin"))
+    monkeypatch.setenv("SCAVE_BIN", str(tmp_path / "bin"))
+    monkeypatch.setenv("STUB_CALLS", str(tmp_path / "calls.txt"))
+    for var in ("INET_NED", "OPP_LIBS", "INET_LIB"):
+        monkeypatch.delenv(var, raising=False)
+    monkeypatch.setattr(grid, "RES_DIR", str(tmp_path / "results"))
+    monkeypatch.setattr(grid, "FIG_DIR", str(tmp_path / "figs"))
+
+    def calls():
+        p = tmp_path / "calls.txt"
+        return p.read_text().split() if p.exists() else []
+    return calls
+
+
+def run_grid(tmp_path, monkeypatch, *extra):
+    argv = ["grid.py", "--Ks", "30 60", "--Ls", "0.6", "--Ns", "8 16", "--Seeds", "1", "--Scenarios", "sym",
+            "-j", "1", "--no-plot", "--work-dir", str(tmp_path / "work"), "--cache-dir", str(tmp_path / "cache"),
+            "--catalog", str(tmp_path / "catalog.sqlite"), *extra]
+    monkeypatch.setattr(sys, "argv", argv)
+    assert grid.main() == 0
+    with open(tmp_path / "work" / "manifest.json") as f:
+        return json.load(f)
+
+
+def test_fit_cases_drops_n_beyond_hosts(capsys):
+    cases = grid.build_cases({"Ks": ["30"], "Ls": ["0.6"], "Ns": ["8", "16"], "Seeds": ["1"], "Scenarios": ["sym"]})
+    assert [c["N"] for c in grid.fit_cases(cases, 12)] == [8]
+    assert "N=16" in capsys.readouterr().err
+
+
+def test_resume_and_cache_hits(tmp_path, monkeypatch, stubs):
+    manifest = run_grid(tmp_path, monkeypatch)
+    assert sorted(manifest) == ["fixk_K30_L0.6_N8_sym_s1", "fixk_K60_L0.6_N8_sym_s1"]
+    assert all(r["status"] == "done" and not r["cached"] for r in manifest.values())
+    assert all(r["metrics"]["p99_ms"] is not None for r in manifest.values())
+    assert len(stubs()) == 2
+
+    # finished cases are skipped; an interrupted one resumes from the cache
+    manifest["fixk_K60_L0.6_N8_sym_s1"]["status"] = "running"
+    grid.save_manifest(str(tmp_path / "work" / "manifest.json"), manifest)
+    manifest = run_grid(tmp_path, monkeypatch)
+    assert manifest["fixk_K60_L0.6_N8_sym_s1"]["cached"] and not manifest["fixk_K30_L0.6_N8_sym_s1"]["cached"]
+    assert len(stubs()) == 2
+
+    # --force restores both from the cache; a changed workload simulates again
+    manifest = run_grid(tmp_path, monkeypatch, "--force")
+    assert all(r["cached"] for r in manifest.values()) and len(stubs()) == 2
+    manifest = run_grid(tmp_path, monkeypatch, "--force", "--Seeds", "2")
+    assert "fixk_K30_L0.6_N8_sym_s2" in manifest and len(stubs()) == 4
+
+
+def test_adaptive_sweep_finds_knee():
+    coarse, seeds = [10, 30, 60, 120], [1, 2, 3]
+    runs, stats = adaptive_k.sweep(lambda cases: [adaptive_k.stub_p99(c) for c in cases],
+                                   "0.6", 8, "sym", coarse, seeds, k_tol=5, max_runs=60)
+    best = stats["median"].idxmin()
+    assert 20 <= best <= 45 and len(runs) < (120 - 10) // 5 * len(seeds)
+    assert set(coarse) <= set(stats.index) and len(stats) > len(coarse)
+
+
+def test_adaptive_grid_evaluator(tmp_path, monkeypatch, stubs):
+    args = argparse.Namespace(N=8, jobs=1, work_dir=str(tmp_path / "work"), no_plot=True, no_cache=False,
+                              cache_dir=str(tmp_path / "cache"), no_catalog=True, catalog=None)
+    evaluate = adaptive_k.grid_evaluator(args)
+    runs, stats = adaptive_k.sweep(evaluate, "0.6", 8, "sym", [5, 20, 80], [1], k_tol=4, max_runs=8)
+    assert 10 <= stats["median"].idxmin() <= 40
+    assert len(stubs()) == len(runs) <= 8
+    # K values already in the manifest are not simulated again
+    cases = [{"K": int(k), "L": "0.6", "N": 8, "seed": 1, "scenario": "sym"} for k in stats.index]
+    assert evaluate(cases) == pytest.approx(list(stats["median"]))
+    assert len(stubs()) == len(runs)
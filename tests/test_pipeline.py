@@ -0,0 +1,11 @@
+import plot_sanity, pipeline
+from queue_stats import MSS
+
+
+def test_plot_step_k_in_packets(monkeypatch):
+    seen = {}
+    monkeypatch.setattr(plot_sanity, "sanity_plot", lambda *a, **kw: seen.update(args=a, kw=kw))
+    pipeline.plot_step("x_vectors.csv", "x.png", 30)
+    k, k_unit, mss = seen["args"][4:7]
+    assert (k, k_unit, mss) == (30.0, "packets", MSS) and seen["kw"]["y_unit"] == "KB"
+    assert plot_sanity.k_to_target_unit(k, k_unit, mss, "KB") == 30 * 1460 / 1024
@@ -0,0 +1,12 @@
+import numpy as np
+from queue_stats import queue_table, MSS
+
+
+def test_byte_queue_threshold_uses_tcp_mss():
+    # queueBitLength just above / below K=30 packets of the ini's 1460-byte MSS
+    assert MSS == 1460
+    t = np.array([0.0, 1.0, 2.0])
+    v = np.array([30 * 1460 * 8 + 8, 30 * 1460 * 8 - 8, 0.0])
+    row = queue_table([("Net.leaf[0].ppp[0].queue", "queueBitLength:vector", t, v)], k=30, t_end=3.0).iloc[0]
+    assert row["unit"] == "B" and row["k"] == 30 * 1460
+    assert np.isclose(row["frac_above_k"], 1 / 3) and row["bursts"] == 1
@@ -0,0 +1,38 @@
+import os, sys
+import numpy as np
+from conftest import ROOT_DIR
+
+sys.path.insert(0, os.path.join(ROOT_DIR, "analysis"))
+import render_figures
+from queue_stats import MSS
+from vecstore import ingest
+
+QUEUE = "Net.leaf[0].ppp[2].queue"
+
+
+def write_run(path, scale=1):
+    rows = ["run,type,module,name,attrname,attrvalue,vectime,vecvalue"]
+    for i in range(20):
+        rows.append(f"r,vector,{QUEUE},queueBitLength:vector,,,{i * 1e-3:.6f},{i * 8 * 1460 * scale}")
+    path.write_text("\n".join(rows) + "\n")
+    return ingest(str(path))
+
+
+def k_lines(kind):
+    _, axes = render_figures._FIGS[kind]
+    return [float(l.get_ydata()[0]) for ax in axes for l in ax.get_lines() if l.get_linestyle() == "--"]
+
+
+def test_k_line_is_packets_of_mss(tmp_path):
+    # K is a packet count: the line sits at K * MSS bytes on the KB axis
+    src = write_run(tmp_path / "fixk_K30_L0.6_N8_sym_s1_vectors.csv")
+    out, err, _ = render_figures.render({"kind": "sanity", "out": str(tmp_path / "s.png"), "source": src,
+                                         "module": QUEUE, "name": "queueBitLength", "k": 30.0})
+    assert err is None and os.path.exists(out)
+    assert np.allclose(k_lines("sanity"), 30 * MSS / 1024)
+
+    asym = write_run(tmp_path / "fixk_K30_L0.6_N8_asym_s1_vectors.csv", 2)
+    out, err, _ = render_figures.render({"kind": "compare", "out": str(tmp_path / "c.png"), "sym": src,
+                                         "asym": asym, "module": QUEUE, "name": "queueBitLength", "k": 30.0})
+    assert err is None and os.path.exists(out)
+    assert np.allclose(k_lines("compare"), [30 * MSS / 1024] * 2)
@@ -0,0 +1,52 @@
+import os, time, threading
+from resultcache import ResultCache
+
+
+def put_file(cache, tmp_path, key, size):
+    src = tmp_path / f"{key}.bin"
+    src.write_bytes(b"x" * size)
+    return cache.put(key, {"a.bin": str(src)})
+
+
+def test_put_get_roundtrip(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"))
+    put_file(cache, tmp_path, "k1", 100)
+    dest = tmp_path / "out" / "a.bin"
+    assert cache.get("k1", {"a.bin": str(dest)}, verify=True)
+    assert dest.read_bytes() == b"x" * 100
+    assert not cache.get("k2", {"a.bin": str(dest)})
+
+
+def test_gc_evicts_lru_only_when_asked(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"), max_bytes=250, auto_gc=False)
+    for i, key in enumerate(("old", "mid", "new")):
+        put_file(cache, tmp_path, key, 100)
+        os.utime(os.path.join(cache.objects, key, "entry.json"), (i, i))
+    assert len(cache.entries()) == 3
+    assert cache.gc() == ["old"]
+    assert sorted(k for _, _, k in cache.entries()) == ["mid", "new"]
+
+
+def test_entries_skip_vanished(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"))
+    put_file(cache, tmp_path, "k1", 10)
+    os.makedirs(os.path.join(cache.objects, "gone"))
+    with open(os.path.join(cache.objects, "half"), "w") as f:
+        f.write("not a dir")
+    os.makedirs(os.path.join(cache.objects, "torn"))
+    with open(os.path.join(cache.objects, "torn", "entry.json"), "w") as f:
+        f.write('{"files": ')
+    assert [k for _, _, k in cache.entries()] == ["k1"]
+
+
+def test_gc_waits_for_readers(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"), max_bytes=0, auto_gc=False)
+    put_file(cache, tmp_path, "k1", 10)
+    done = []
+    with cache._lock():
+        t = threading.Thread(target=lambda: done.append(cache.gc()))
+        t.start()
+        time.sleep(0.2)
+        assert not done and os.path.isdir(os.path.join(cache.objects, "k1"))
+    t.join(5)
+    assert done == [["k1"]]
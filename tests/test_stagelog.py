@@ -0,0 +1,22 @@
+import time
+import stagelog
+
+
+def test_timer_measures_the_stage():
+    with stagelog.Timer():
+        big = b"x" * (300 << 20)
+        del big
+    with stagelog.Timer() as tm:
+        end = time.process_time() + 0.2
+        while time.process_time() < end:
+            pass
+        block = b"x" * (60 << 20)
+        del block
+    u = tm.usage
+    assert u["wall_s"] >= 0.2 and u["cpu_user_s"] + u["cpu_sys_s"] >= 0.15
+    assert u["cpu_sys_s"] >= 0.0
+    if u.get("rss_cumulative"):
+        assert u["peak_rss_mb"] >= 300
+    else:
+        # the 300 MB of the earlier stage is not charged to this one
+        assert 60 <= u["peak_rss_mb"] < 300
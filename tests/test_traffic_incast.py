@@ -0,0 +1,19 @@
+from flowmanifest import for_inc, link_inc
+from traffic_incast import write_incast, write_incast_many
+
+
+def test_rewrite_keeps_hard_linked_copies(tmp_path):
+    src = write_incast(8, 0.6, 1, tmp_path / "workloads" / "w.inc")
+    case = tmp_path / "work" / "case" / "flows.inc"
+    link_inc(str(src), str(case))
+    before = case.read_text()
+    write_incast(8, 0.6, 2, src)
+    assert case.read_text() == before != src.read_text()
+    assert for_inc(str(case)) is not None and for_inc(str(src)) is not None
+
+
+def test_grid_workload_matches_single(tmp_path):
+    paths = write_incast_many([(8, 0.6, 1), (4, 0.3, 2), (8, 0.6, 1), (16, 0.6, 1)], tmp_path, hosts=12)
+    assert sorted(paths) == [(4, 0.3, 2), (8, 0.6, 1)]
+    single = write_incast(8, 0.6, 1, tmp_path / "single.inc", hosts=12)
+    assert open(paths[(8, 0.6, 1)]).read() == single.read_text()
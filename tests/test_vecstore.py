@@ -0,0 +1,47 @@
+import numpy as np
+import vecstore
+from vecstore import ingest, iter_csv_vectors, VecStore
+
+
+def write_rowwise(path, n=500):
+    """Row-wise export: two queue vectors and one app vector, samples interleaved."""
+    rows = ["run,type,module,name,attrname,attrvalue,vectime,vecvalue"]
+    vecs = {}
+    for i in range(n):
+        for mod, name, val in (("Net.leaf[0].ppp[0].queue", "queueLength:vector", i % 7),
+                               ("Net.leaf[1].ppp[2].queue", "queueLength:vector", i % 5),
+                               ("Net.host[0].app[0]", "rcvdBytes:vector", 1000 * i)):
+            if mod.endswith("app[0]") and i % 3:
+                continue
+            t = round(i * 1e-3, 6)
+            rows.append(f"r,vector,{mod},{name},,,{t},{val}")
+            vecs.setdefault((mod, name), ([], []))
+            vecs[(mod, name)][0].append(t)
+            vecs[(mod, name)][1].append(val)
+    path.write_text("\n".join(rows) + "\n")
+    return {k: (np.array(t), np.array(v, dtype=float)) for k, (t, v) in vecs.items()}
+
+
+def test_rowwise_pieces_are_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(vecstore, "CHUNK_ROWS", 64)
+    ref = write_rowwise(tmp_path / "x_vectors.csv")
+    pieces = list(iter_csv_vectors(str(tmp_path / "x_vectors.csv"), pieces=True))
+    assert len(pieces) > len(ref) and max(len(p[2]) for p in pieces) <= 64
+    whole = {(m, n): (t, v) for m, n, t, v in iter_csv_vectors(str(tmp_path / "x_vectors.csv"))}
+    assert whole.keys() == ref.keys()
+    for k, (t, v) in ref.items():
+        assert np.array_equal(whole[k][0], t) and np.array_equal(whole[k][1], v)
+    kept = [m for m, *_ in iter_csv_vectors(str(tmp_path / "x_vectors.csv"), lambda m, n: "app" in m)]
+    assert kept == ["Net.host[0].app[0]"]
+
+
+def test_ingest_makes_vectors_contiguous(tmp_path, monkeypatch):
+    monkeypatch.setattr(vecstore, "CHUNK_ROWS", 64)
+    ref = write_rowwise(tmp_path / "x_vectors.csv")
+    store = VecStore(ingest(str(tmp_path / "x_vectors.csv")))
+    got = {(i.module, i.name): store.read(i) for i in store.catalog()}
+    assert got.keys() == ref.keys()
+    for k, (t, v) in ref.items():
+        assert np.array_equal(got[k][0], t) and np.array_equal(got[k][1], v)
+    info = store.select("leaf[1]", "queueLength")[0]
+    assert (info.vmin, info.vmax, info.count) == (0, 4, 500)